@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""cmdcraft benchmark suite.
+
+Measure the interpreter hot paths over synthetic registries and option sets, and
+compare the results against a stored baseline to catch performance regressions.
+
+Usage:
+    python3 benchmarks/bench.py [--quick] [--filter=TEXT] [--save=FILE]
+                                [--compare=FILE] [--threshold=RATIO]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+from collections.abc import Callable
+
+from prompt_toolkit.completion import CompleteEvent
+from prompt_toolkit.document import Document
+
+from cmdcraft import BasePrompter, __version__
+from cmdcraft.command import Command
+from cmdcraft.completer import CommandCompleter, RegistryCompleter
+from cmdcraft.input import Input
+from cmdcraft.registry import CommandRegistry
+
+# A benchmark receives a size and returns a runner, which executes the measured
+# operation a given number of loops and returns the elapsed time in nanoseconds.
+Runner = Callable[[int], int]
+
+REGISTRY_SIZES = (10, 1000, 50000)
+OPTION_SIZES = (1000, 100000, 1000000)
+LINE = 'deploy web-01 "release candidate" --retries=3 --tag=v1.2.3 --force=true'
+
+_CASES: list[tuple[str, tuple[int, ...], Callable[[int], Runner]]] = []
+
+
+def case(name: str, sizes: tuple[int, ...] = (0,)) -> Callable:
+    """Register a benchmark case.
+
+    Args:
+        name (str): Case name.
+        sizes (tuple[int, ...], optional): Sizes the case is measured with.
+            Defaults to a single unsized run.
+
+    Returns:
+        Callable: Decorator.
+
+    """
+
+    def decorator(setup: Callable[[int], Runner]) -> Callable[[int], Runner]:
+        _CASES.append((name, sizes, setup))
+        return setup
+
+    return decorator
+
+
+def sync_runner(func: Callable[[], any]) -> Runner:
+    """Build a runner from a synchronous callable."""
+
+    def run(loops: int) -> int:
+        start = time.perf_counter_ns()
+        for _ in range(loops):
+            func()
+        return time.perf_counter_ns() - start
+
+    return run
+
+
+def async_runner(func: Callable[[], any]) -> Runner:
+    """Build a runner from a coroutine function, awaited on a single event loop."""
+    loop = asyncio.new_event_loop()
+
+    async def batch(loops: int) -> int:
+        start = time.perf_counter_ns()
+        for _ in range(loops):
+            await func()
+        return time.perf_counter_ns() - start
+
+    def run(loops: int) -> int:
+        return loop.run_until_complete(batch(loops))
+
+    return run
+
+
+async def target(
+    host: str, count: int, *, retries: int = 0, tag: str = "", force: bool = False
+) -> None:
+    """Benchmark command."""
+
+
+class _Prompter(BasePrompter):
+    """Prompter discarding its output."""
+
+    def write(self, *args) -> None:
+        """Discard output."""
+
+
+def _registry(size: int) -> CommandRegistry:
+    """Build a registry of synthetic commands."""
+    registry = CommandRegistry()
+    for i in range(size):
+        cmd = Command(target, f"cmd{i:06d}")
+        cmd.process()
+        registry.add(cmd)
+    return registry
+
+
+def _options(size: int) -> list[str]:
+    """Build a list of synthetic options."""
+    return [f"host-{i:07d}.zone{i % 97}" for i in range(size)]
+
+
+def _option_command(size: int) -> Command:
+    """Build a command with synthetic options on its first parameter."""
+    cmd = Command(target, "target")
+    cmd.process()
+    options = _options(size)
+    cmd.parameter("host").set_dynamic_options(lambda: options, ttl=3600)
+    return cmd
+
+
+@case("input.tokenize")
+def bench_tokenize(_: int) -> Runner:
+    """Tokenize a full command line."""
+    return sync_runner(lambda: Input.tokenize(LINE))
+
+
+@case("input.process.keystroke")
+def bench_process(_: int) -> Runner:
+    """Process a command line incrementally, one keystroke at a time."""
+    input = Input()
+
+    def run() -> None:
+        for i in range(1, len(LINE) + 1):
+            input.update(LINE[:i])
+            input.process()
+
+    return sync_runner(run)
+
+
+@case("completer.command", REGISTRY_SIZES)
+def bench_complete_command(size: int) -> Runner:
+    """Complete a command name prefix."""
+    completer = RegistryCompleter(_registry(size))
+    document = Document("cmd00")
+    event = CompleteEvent()
+    return sync_runner(lambda: list(completer.get_completions(document, event)))
+
+
+@case("completer.option.prefix", OPTION_SIZES)
+def bench_complete_prefix(size: int) -> Runner:
+    """Complete a parameter value by prefix."""
+    completer = CommandCompleter(_option_command(size))
+    document = Document("host-00001")
+    event = CompleteEvent()
+    return sync_runner(lambda: list(completer.get_completions(document, event)))
+
+
+@case("completer.option.fuzzy", OPTION_SIZES)
+def bench_complete_fuzzy(size: int) -> Runner:
+    """Complete a parameter value by fuzzy matching."""
+    completer = CommandCompleter(_option_command(size))
+    document = Document("z96h")
+    event = CompleteEvent()
+    return sync_runner(lambda: list(completer.get_completions(document, event)))
+
+
+@case("command.process")
+def bench_command_process(_: int) -> Runner:
+    """Process a callable signature."""
+    return sync_runner(lambda: Command(target).process())
+
+
+@case("command.eval")
+def bench_command_eval(_: int) -> Runner:
+    """Bind and call a command."""
+    cmd = Command(target)
+    cmd.process()
+    args = Input.tokenize("web-01 3 --retries=3 --tag=v1.2.3 --force=true")
+    return async_runner(lambda: cmd.eval(*args))
+
+
+@case("prompter.interpret", REGISTRY_SIZES)
+def bench_interpret(size: int) -> Runner:
+    """Interpret a command line end to end."""
+    prompter = _Prompter()
+    for i in range(size):
+        prompter.register_command(target, f"cmd{i:06d}")
+    cmdline = f"cmd{size // 2:06d} web-01 3 --retries=3 --force=true"
+    return async_runner(lambda: prompter.interpret(cmdline))
+
+
+def measure(runner: Runner, repeat: int, min_time: float) -> list[float]:
+    """Measure a runner.
+
+    The number of loops is calibrated so each repetition takes at least `min_time`.
+
+    Args:
+        runner (Runner): Benchmark runner.
+        repeat (int): Number of repetitions.
+        min_time (float): Minimum time of a repetition, in seconds.
+
+    Returns:
+        list[float]: Time per loop of each repetition, in nanoseconds.
+
+    """
+    loops = 1
+    while True:
+        elapsed = runner(loops)
+        if elapsed >= min_time * 1e9 or loops >= 1 << 24:
+            break
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(min_time * 1e9 / elapsed)))
+    return [elapsed / loops] + [runner(loops) / loops for _ in range(repeat - 1)]
+
+
+def _format(ns: float) -> str:
+    """Format a duration."""
+    for unit, scale in (("s", 1e9), ("ms", 1e6), ("us", 1e3)):
+        if ns >= scale:
+            return f"{ns / scale:8.2f}{unit:>2}"
+    return f"{ns:8.0f}ns"
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the benchmark suite.
+
+    Args:
+        argv (list[str] | None, optional): Command line arguments. Defaults to
+            `sys.argv`.
+
+    Returns:
+        int: 1 if a regression was found against the baseline, 0 otherwise.
+
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="skip largest sizes")
+    parser.add_argument("--filter", default="", help="run cases containing text")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions")
+    parser.add_argument("--min-time", type=float, default=0.1, help="seconds")
+    parser.add_argument("--save", help="save results as baseline file")
+    parser.add_argument("--compare", help="compare results with baseline file")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25, help="allowed slowdown ratio"
+    )
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    regressions = []
+    for name, sizes, setup in _CASES:
+        if args.filter not in name:
+            continue
+        for size in sizes[:-1] if args.quick and len(sizes) > 1 else sizes:
+            key = f"{name}[{size}]" if size else name
+            times = measure(setup(size), args.repeat, args.min_time)
+            best = results[key] = min(times)
+            line = f"{key:<36} {_format(best)} {_format(statistics.median(times))}"
+            if key in baseline:
+                ratio = best / baseline[key]
+                line += f" {ratio:6.2f}x"
+                if ratio > 1 + args.threshold:
+                    line += " REGRESSION"
+                    regressions.append(key)
+            print(line, flush=True)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            data = {
+                "version": __version__,
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            }
+            json.dump(data, f, indent=2)
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
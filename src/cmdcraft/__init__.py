@@ -4,12 +4,22 @@
 from __future__ import annotations
 
 from .base import BasePrompter
-from .prompter import Prompter
+from .headless import HeadlessPrompter
 
 __version__ = "0.0.6"
 
 __all__ = [
     "BasePrompter",
+    "HeadlessPrompter",
     "Prompter",
     "__version__",
 ]
+
+
+def __getattr__(name: str) -> any:
+    """Import `prompt_toolkit` based classes on first use."""
+    if name == "Prompter":
+        from .prompter import Prompter
+
+        return Prompter
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Headless cmdcraft interpreter entry point."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib
+import sys
+
+from .headless import HeadlessPrompter
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run commands from a file or stdin.
+
+    Args:
+        argv (list[str] | None, optional): Command line arguments. Defaults to None.
+
+    Returns:
+        int: Exit status, 1 if any command failed.
+
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m cmdcraft", description="Run cmdcraft commands headless."
+    )
+    parser.add_argument(
+        "file", nargs="?", help="Command file. Defaults to the standard input."
+    )
+    parser.add_argument(
+        "--stop-on-error",
+        action="store_true",
+        help="Stop on the first failed command.",
+    )
+    parser.add_argument(
+        "-m",
+        "--module",
+        action="append",
+        default=[],
+        help="Register the public functions of a module as commands.",
+    )
+    args = parser.parse_args(argv)
+    modules = [importlib.import_module(x) for x in args.module]
+
+    async def run(input) -> int:
+        prompter = HeadlessPrompter(input, stop_on_error=args.stop_on_error)
+        for module in modules:
+            prompter.register_module(module)
+        await prompter.run()
+        return 1 if prompter.failures else 0
+
+    if args.file is None:
+        return asyncio.run(run(sys.stdin))
+    with open(args.file, encoding="utf-8") as f:
+        return asyncio.run(run(f))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
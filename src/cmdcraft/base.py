@@ -2,12 +2,87 @@
 """Base interpreter class."""
 
 import asyncio
+import contextvars
+import functools
+import inspect
+import io
 import os
-from abc import ABCMeta, abstractmethod
+import re
+import shlex
+import signal
+import time
+from abc import ABCMeta
+from collections import deque
+from collections.abc import AsyncIterable, AsyncIterator, Awaitable, Callable
+from concurrent.futures import Executor, ThreadPoolExecutor
 from inspect import cleandoc
+from typing import TYPE_CHECKING
 
 from .command import Command
-from .input import Input
+from .history import CommandHistory
+from .input import Input, InputState
+from .jobs import JobTable
+from .metrics import Metrics
+from .output import OutputWriter
+from .pipes import Pipe
+from .registry import CommandRegistry
+from .routine import Routine, RoutineLine
+from .signatures import SignatureCache
+
+if TYPE_CHECKING:
+    # Imported on first use, as it imports multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+# Output sink of the current context, used to redirect commands output
+_output_sink: contextvars.ContextVar[Callable | None] = contextvars.ContextVar(
+    "cmdcraft_output_sink", default=None
+)
+
+# Output sink of jobs spawned from the current context, when it captures output
+_job_sink: contextvars.ContextVar[Callable | None] = contextvars.ContextVar(
+    "cmdcraft_job_sink"
+)
+
+# Command history of the current session, when not the interpreter one
+_session_history: contextvars.ContextVar[CommandHistory | None] = (
+    contextvars.ContextVar("cmdcraft_session_history", default=None)
+)
+
+# Callable ending the current session, when not the interpreter one
+_session_close: contextvars.ContextVar[Callable | None] = contextvars.ContextVar(
+    "cmdcraft_session_close", default=None
+)
+
+
+class _Expired(Exception):
+    """Raised when the deadline of a command expires."""
+
+
+async def _deadline(aw: Awaitable, timeout: float | None) -> None:
+    """Await within a time limit, cancelling the awaitable when it expires.
+
+    Unlike `asyncio.wait_for`, an expired deadline is told apart from a
+    `TimeoutError` raised by the awaitable itself.
+
+    Raises:
+        _Expired: If the time limit expired.
+
+    """
+    if timeout is None:
+        await aw
+        return
+    task = asyncio.ensure_future(aw)
+    try:
+        done, _ = await asyncio.wait({task}, timeout=timeout)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    if not done:
+        task.cancel()
+        await asyncio.wait({task})
+        if task.cancelled():
+            raise _Expired
+    task.result()
 
 
 class BasePrompter(metaclass=ABCMeta):
@@ -17,26 +92,91 @@ class BasePrompter(metaclass=ABCMeta):
     interpreter.
     """
 
-    def __init__(self) -> None:
-        """Command Set initializer."""
-        self._commands: dict[str, Command] = {}
+    def __init__(
+        self,
+        max_jobs: int = 8,
+        history_size: int = 1000,
+        history_file: str | None = None,
+        output_buffer: int = 0,
+        output_policy: str = "block",
+        max_workers: int | None = None,
+        signature_cache: str | None = None,
+        pipe_buffer: int = 64,
+        output_interval: float = 0.05,
+    ) -> None:
+        """Command Set initializer.
+
+        Args:
+            max_jobs (int, optional): Maximum number of background jobs running
+                concurrently. Defaults to 8.
+            history_size (int, optional): Maximum number of commands kept in
+                history. Defaults to 1000.
+            history_file (str | None, optional): File where the command history is
+                persisted. Defaults to None.
+            output_buffer (int, optional): Maximum number of output lines waiting
+                to be written. If positive, output is written in batches from a
+                separate thread. Defaults to 0 (written immediately).
+            output_policy (str, optional): What to do when the output buffer is
+                full, one of `OutputWriter.POLICIES`. Defaults to "block", so no
+                output is lost; the event loop is never blocked, but buffered lines
+                may exceed the limit until written. The drop policies bound memory
+                instead, discarding output while the terminal falls behind.
+            max_workers (int | None, optional): Maximum number of threads, and of
+                processes, running synchronous commands. Defaults to None (as
+                `concurrent.futures` defaults).
+            signature_cache (str | None, optional): File where processed command
+                signatures are cached between launches. Defaults to None (no
+                cache).
+            pipe_buffer (int, optional): Maximum number of items buffered between
+                two pipeline stages. Defaults to 64.
+            output_interval (float, optional): Minimum time between outputs of
+                async generator commands, in seconds; items produced meanwhile are
+                output together. Defaults to 0.05 (0 outputs each item).
+
+        """
+        self._commands: CommandRegistry = CommandRegistry()
+        self._jobs: JobTable = JobTable(max_jobs)
+        self._metrics: Metrics = Metrics()
+        self._signatures: SignatureCache | None = None
+        if signature_cache is not None:
+            self._signatures = SignatureCache(signature_cache)
+        self._max_workers = max_workers
+        self._pipe_buffer = pipe_buffer
+        self._output_interval = output_interval
+        self._thread_pool: ThreadPoolExecutor | None = None
+        self._process_pool: ProcessPoolExecutor | None = None
+        self._writer: OutputWriter | None = None
+        if output_buffer > 0:
+            self._writer = OutputWriter(self._write_batch, output_buffer, output_policy)
         # Register default commands
         self.register_command(self.clear)
+        self.register_command(self.count)
+        self.register_command(self.fg)
+        self.register_command(self.fg, "await")
+        self.register_command(self.foreach, raw=True)
+        self.register_command(self.grep)
+        self.register_command(self.head)
         self.register_command(self.history)
+        self.register_command(self.jobs)
+        self.register_command(self.kill)
         self.register_command(self.load)
+        self.register_command(self.profile, raw=True)
         self.register_command(self.quit)
         self.register_command(self.save)
+        self.register_command(self.spawn, raw=True)
+        self.register_command(self.stats)
         self.register_command(self.wait)
 
         # Register help command
         help = self.register_command(self.help)
 
         def get_funcs() -> list[str]:
+            # Copied at once, as it may run off the loop thread
             return list(self._commands)
 
         help.parameter("command").set_dynamic_options(get_funcs)
 
-        self._history = []
+        self._history: CommandHistory = CommandHistory(history_size, history_file)
         self._is_running: bool = False
         self._is_init: bool = False
 
@@ -44,9 +184,50 @@ class BasePrompter(metaclass=ABCMeta):
         """Init the interpreter object."""
         self._is_init = True
 
-    @abstractmethod
     def output(self, *args) -> None:
-        """Output command."""
+        """Output command.
+
+        The output is sent to the sink of the current context, if any, so it can be
+        captured per command. Otherwise, it is written to the interpreter terminal,
+        through the output buffer if enabled and not closed.
+        """
+        sink = _output_sink.get()
+        if sink is not None:
+            sink(*args)
+        elif self._writer is not None and not self._writer.closed:
+            self._writer.write(" ".join(str(x) for x in args))
+        else:
+            self.write(*args)
+
+    async def flush(self) -> None:
+        """Wait until the buffered output is written."""
+        if self._writer is not None:
+            await self._writer.drain()
+
+    async def wait_output(self) -> None:
+        """Wait until the output buffer has room, without blocking the loop."""
+        if self._writer is not None:
+            await self._writer.wait_room()
+
+    async def close_output(self) -> None:
+        """Write the buffered output and stop the writer thread.
+
+        Output written afterwards goes directly to the terminal.
+        """
+        if self._writer is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._writer.close)
+
+    def _write_batch(self, lines: list[str]) -> None:
+        """Write a batch of buffered output lines."""
+        self.write("\n".join(lines))
+
+    def write(self, *args) -> None:
+        """Write output to the interpreter terminal.
+
+        With an output buffer, this is called from the writer thread, with a batch
+        of lines at once. Defaults to printing on standard output.
+        """
+        print(*args)
 
     async def run(self) -> None:
         """Run Prompter main loop."""
@@ -63,51 +244,512 @@ class BasePrompter(metaclass=ABCMeta):
         """
         return self._is_running
 
-    def register_command(self, command: callable, alias: str | None = None) -> Command:
+    def register_command(
+        self,
+        command: callable,
+        alias: str | None = None,
+        raw: bool = False,
+        executor: str | Executor = "thread",
+        timeout: float | None = None,
+        lazy: bool = False,
+    ) -> Command:
         """Register a command into the interpreter.
 
+        Synchronous callables run in an executor, so they don't block the
+        interpreter. Use the process pool for CPU bound commands, whose callable and
+        arguments must be picklable.
+
         Args:
             command (callable): Callable.
             alias (str | None, optional): Command alias. Defaults to None.
+            raw (bool, optional): Pass the input tokens to the callable as is.
+                Defaults to False.
+            executor (str | Executor, optional): Executor of synchronous callables:
+                "thread" or "process" for the interpreter pools, or an executor.
+                Defaults to "thread".
+            timeout (float | None, optional): Time limit of each call, in seconds,
+                after which the command is cancelled. Defaults to None (no limit).
+            lazy (bool, optional): Defer processing the callable signature until
+                the command is first used. Defaults to False.
+
+        Returns:
+            Command: The registered command.
+
+        Raises:
+            ValueError: If the executor is unknown.
 
         """
-        m = Command(command, alias)
-        self._commands[m.alias] = m
-        m.process()
+        # Pools are looked up on each call, as they are discarded on `quit`
+        if executor == "thread":
+            executor = functools.partial(getattr, self, "thread_pool")
+        elif executor == "process":
+            executor = functools.partial(getattr, self, "process_pool")
+        elif not isinstance(executor, Executor):
+            raise ValueError(f"Unknown executor: {executor}")
+        m = Command(command, alias, raw, executor, timeout, self._signatures)
+        if not lazy:
+            m.process()
+        self._commands.add(m)
         return m
 
+    def register_object(self, obj: any, prefix: str = "", **kwargs) -> list[Command]:
+        """Register the public methods of an object as commands.
+
+        Methods are registered lazily unless `lazy=False` is given, so their
+        signatures are only processed when each command is first completed or
+        called. Instance methods need an instance to be bound to, so only static
+        and class methods of a class are registered.
+
+        Args:
+            obj (any): Object, like a service instance or class.
+            prefix (str, optional): Prefix of the command aliases. Defaults to "".
+            kwargs: Arguments forwarded to `register_command`.
+
+        Returns:
+            list[Command]: The registered commands.
+
+        """
+        kwargs.setdefault("lazy", True)
+        commands = []
+        is_class = inspect.isclass(obj)
+        for name in dir(obj):
+            if name.startswith("_"):
+                continue
+            # Check statically, so properties are not evaluated
+            attr = inspect.getattr_static(obj, name)
+            if isinstance(attr, (staticmethod, classmethod)) or (
+                inspect.isroutine(attr) and not is_class
+            ):
+                cb = getattr(obj, name)
+                cmd = self.register_command(cb, prefix + name, **kwargs)
+                commands.append(cmd)
+        return commands
+
+    def register_module(self, module: any, prefix: str = "", **kwargs) -> list[Command]:
+        """Register the public functions of a module as commands.
+
+        The functions listed in the module `__all__` are registered, or otherwise
+        the public functions defined in the module (not imported into it).
+        Functions are registered lazily, as `register_object`.
+
+        Args:
+            module (any): Module object.
+            prefix (str, optional): Prefix of the command aliases. Defaults to "".
+            kwargs: Arguments forwarded to `register_command`.
+
+        Returns:
+            list[Command]: The registered commands.
+
+        """
+        names = getattr(module, "__all__", None)
+        if names is None:
+            names = [
+                k
+                for k, v in vars(module).items()
+                if not k.startswith("_")
+                and inspect.isfunction(v)
+                and v.__module__ == module.__name__
+            ]
+        kwargs.setdefault("lazy", True)
+        commands = []
+        for name in names:
+            cb = getattr(module, name)
+            if callable(cb) and not inspect.isclass(cb):
+                cmd = self.register_command(cb, prefix + name, **kwargs)
+                commands.append(cmd)
+        return commands
+
+    def unregister_command(self, alias: str) -> Command:
+        """Unregister a command from the interpreter.
+
+        Args:
+            alias (str): Command alias.
+
+        Returns:
+            Command: The unregistered command.
+
+        Raises:
+            KeyError: If there is no command registered with given alias.
+
+        """
+        return self._commands.remove(alias)
+
     @property
-    def commands(self) -> dict:
+    def metrics(self) -> Metrics:
+        """Return the interpreter metrics.
+
+        Returns:
+            Metrics: Execution and completion statistics.
+
+        """
+        return self._metrics
+
+    def save_signatures(self) -> None:
+        """Save the processed command signatures into the signature cache, if any.
+
+        This is done on `quit`, and may be called after registering commands.
+        """
+        if self._signatures is not None:
+            self._signatures.save()
+
+    @property
+    def thread_pool(self) -> ThreadPoolExecutor:
+        """Return the thread pool running synchronous commands.
+
+        The pool is created on first use.
+        """
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                self._max_workers, thread_name_prefix="cmdcraft"
+            )
+        return self._thread_pool
+
+    @property
+    def process_pool(self) -> "ProcessPoolExecutor":
+        """Return the process pool running CPU bound synchronous commands.
+
+        The pool is created on first use.
+        """
+        if self._process_pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+
+            self._process_pool = ProcessPoolExecutor(self._max_workers)
+        return self._process_pool
+
+    def _shutdown_pools(self) -> None:
+        """Shut the thread and process pools down, without waiting.
+
+        Queued calls are cancelled. The pools are created again on next use, even
+        by the commands already registered.
+        """
+        for pool in (self._thread_pool, self._process_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._thread_pool = self._process_pool = None
+
+    @property
+    def command_history(self) -> CommandHistory:
+        """Return the command history of the current session.
+
+        Returns:
+            CommandHistory: History of the current session, like a server
+            connection, or the interpreter history otherwise.
+
+        """
+        history = _session_history.get()
+        return self._history if history is None else history
+
+    @property
+    def commands(self) -> CommandRegistry:
         """Return the available commands.
 
         Returns:
-            dict: Commands dictionary.
+            CommandRegistry: Commands registry.
 
         """
         return self._commands
 
-    async def interpret(self, cmdline: str) -> None:
+    async def interpret(self, cmdline: str) -> bool:
         """Interpret user input.
 
         This method is used to parse input commands, handling eventual failures
         and raised exceptions.
 
+        A trailing `&` runs the command in background, as a job. Commands separated
+        by `|` run as a pipeline.
+
         Args:
             cmdline (str): Input command as single string line.
 
+        Returns:
+            bool: False if the command failed, True otherwise.
+
         """
         try:
             input = Input(cmdline)
             input.process()
-            if len(input.tokens) < 1:
-                return
-            cmd = self._commands.get(input.tokens[0], None)
-            await cmd.eval(*input.tokens[1:])
+        except Exception as e:
+            self.output(e)
+            return False
+        if input.state == InputState.TYPING_STRING:
+            self.output("Unterminated quote or escape")
+            return False
+        stages = input.stages
+        if len(stages) > 1:
+            if input.background:
+                display = " | ".join(shlex.join(x) for x in stages)
+                self._start_job(display, self._pipeline(stages))
+                return True
+            return await self._pipeline(stages)
+        tokens = stages[0]
+        if input.background:
+            if tokens:
+                self._spawn(tokens)
+            return True
+        return await self._execute(tokens)
+
+    async def interrupt(self, cmdline: str) -> bool:
+        """Interpret user input, allowing to interrupt it.
+
+        The command runs in its own task, which is cancelled on Ctrl-C (SIGINT)
+        instead of interrupting the whole program. Cancellation is cooperative: the
+        command gets a `CancelledError` where it awaits. Synchronous commands are
+        abandoned in their worker.
+
+        Args:
+            cmdline (str): Input command as single string line.
+
+        Returns:
+            bool: False if the command failed or was cancelled, True otherwise.
+
+        """
+        task = asyncio.ensure_future(self.interpret(cmdline))
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGINT, task.cancel)
+        except (NotImplementedError, RuntimeError, ValueError):
+            # No signal support (Windows) or not on the main thread
+            return await task
+        try:
+            await asyncio.wait([task])
+        finally:
+            loop.remove_signal_handler(signal.SIGINT)
+        if task.cancelled():
+            self.output("Cancelled")
+            return False
+        return task.result()
+
+    def _split_timeout(
+        self, cmd: Command, args: list[str]
+    ) -> tuple[list[str], float | None]:
+        """Split the `--timeout=` meta option from the command arguments.
+
+        The option is left to the command if it has a parameter with this name, or
+        if it is raw. A timeout of 0 disables the command registered timeout.
+        """
+        timeout = cmd.timeout
+        if cmd.raw or "timeout" in cmd.parameters or "--timeout" not in "".join(args):
+            return args, timeout
+        rest = []
+        for i, arg in enumerate(args):
+            if arg == "--":
+                rest.extend(args[i:])
+                break
+            if arg.startswith("--timeout="):
+                timeout = float(arg[10:]) or None
+            else:
+                rest.append(arg)
+        return rest, timeout
+
+    async def _execute(self, tokens: list[str]) -> bool:
+        """Execute a tokenized command, handling eventual failures.
+
+        Args:
+            tokens (list[str]): Command name followed by its arguments.
+
+        Returns:
+            bool: False if the command failed, True otherwise.
+
+        """
+        if len(tokens) < 1:
+            return True
+        cmd = self._resolve_command(tokens[0])
+        if cmd is None:
+            return False
+        ok = False
+        timeout = None
+        start = time.perf_counter_ns()
+        try:
+            args, timeout = self._split_timeout(cmd, tokens[1:])
+            await _deadline(self._drain(cmd.eval(*args), None), timeout)
+            ok = True
+        except _Expired:
+            self.output(f"Timed out after {timeout}s")
         except TypeError as e:
-            await self.help(cmd)
+            await self.help(cmd.alias)
             self.output(e)
         except Exception as e:
-            self.output(e)
+            self.output(str(e) or type(e).__name__)
+        finally:
+            self._metrics.record(cmd.alias, time.perf_counter_ns() - start, not ok)
+        return ok
+
+    def _resolve_command(self, name: str) -> Command | None:
+        """Resolve a command name, reporting unknown and ambiguous names."""
+        cmd = self._commands.resolve(name)
+        if cmd is None:
+            matches = self._commands.complete(name, 5)
+            if len(matches) > 1:
+                self.output(f"Ambiguous command: {name} ({', '.join(matches)})")
+            else:
+                self.output(f"Unknown command: {name}")
+        return cmd
+
+    async def _pipeline(self, stages: list[list[str]]) -> bool:
+        """Execute a pipeline, handling eventual failures.
+
+        Each stage runs on its own task, and streams its items to the next one
+        through a bounded pipe. Items of the last stage are output. When a stage
+        ends, the previous ones are cancelled, and a failure cancels every stage.
+
+        Args:
+            stages (list[list[str]]): Tokens of each stage.
+
+        Returns:
+            bool: False if any stage failed, True otherwise.
+
+        """
+        commands = []
+        for i, tokens in enumerate(stages):
+            if not tokens:
+                self.output("Empty pipeline stage")
+                return False
+            cmd = self._resolve_command(tokens[0])
+            if cmd is None:
+                return False
+            if i < len(stages) - 1 and not cmd.is_generator:
+                self.output(f"{cmd.alias}: does not produce a stream")
+                return False
+            if i > 0 and (
+                cmd.stream_parameter is None or not (cmd.is_async or cmd.is_generator)
+            ):
+                self.output(f"{cmd.alias}: does not accept a stream")
+                return False
+            commands.append(cmd)
+
+        pipes = [Pipe(self._pipe_buffer) for _ in stages[1:]]
+        tasks = []
+        for i, (cmd, tokens) in enumerate(zip(commands, stages)):
+            source = pipes[i - 1] if i > 0 else None
+            sink = pipes[i] if i < len(pipes) else None
+            tasks.append(
+                asyncio.ensure_future(self._stage(cmd, tokens[1:], source, sink))
+            )
+
+        def done(i: int, task: asyncio.Task) -> None:
+            # Upstream stages are useless once a stage ends, and all on failure
+            failed = not task.cancelled() and task.exception() is not None
+            for x in tasks if failed else tasks[:i]:
+                x.cancel()
+
+        for i, task in enumerate(tasks):
+            task.add_done_callback(functools.partial(done, i))
+        try:
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            raise
+        ok = True
+        for cmd, result in zip(commands, results):
+            if isinstance(result, Exception):
+                if isinstance(result, _Expired):
+                    result = "Timed out"
+                elif isinstance(result, TypeError):
+                    await self.help(cmd.alias)
+                self.output(f"{cmd.alias}: {result}")
+                ok = False
+        return ok
+
+    async def _stage(
+        self, cmd: Command, args: list[str], source: Pipe | None, sink: Pipe | None
+    ) -> None:
+        """Run a pipeline stage, closing its output pipe when finished."""
+        start = time.perf_counter_ns()
+        ok = False
+        try:
+            args, timeout = self._split_timeout(cmd, args)
+            extra = {cmd.stream_parameter: source} if source is not None else {}
+            await _deadline(self._drain(cmd.eval(*args, **extra), sink), timeout)
+            ok = True
+        finally:
+            if sink is not None:
+                sink.close()
+            self._metrics.record(cmd.alias, time.perf_counter_ns() - start, not ok)
+
+    async def _drain(self, result: any, sink: Pipe | None) -> None:
+        """Await a command result, sending its items to a pipe or the output."""
+        if not inspect.isasyncgen(result):
+            result = await result
+            # A synchronous callable may return an awaitable, like a coroutine
+            while inspect.isawaitable(result):
+                result = await result
+            if not inspect.isasyncgen(result):
+                return
+        try:
+            if sink is None:
+                await self._stream(result)
+            else:
+                async for item in result:
+                    await sink.put(item)
+        finally:
+            await result.aclose()
+
+    async def _stream(self, items: AsyncIterator) -> None:
+        """Output the items of an async generator as they are produced.
+
+        Items are coalesced and output together at most once per output interval,
+        so fast producers neither flood the terminal nor starve the event loop.
+        Pending items are output as well when the generator fails or is cancelled.
+        """
+        interval = self._output_interval
+        if interval <= 0:
+            async for item in items:
+                self.output(item)
+            return
+        loop = asyncio.get_running_loop()
+        pending: list[str] = []
+        timer: asyncio.TimerHandle | None = None
+
+        def flush() -> None:
+            nonlocal timer
+            if timer is not None:
+                timer.cancel()
+                timer = None
+            if pending:
+                self.output("\n".join(pending))
+                pending.clear()
+
+        deadline = loop.time()
+        try:
+            async for item in items:
+                pending.append(str(item))
+                if loop.time() >= deadline:
+                    # Busy producer: output and let other tasks run
+                    flush()
+                    deadline = loop.time() + interval
+                    await asyncio.sleep(0)
+                    await self.wait_output()
+                elif timer is None:
+                    # Idle producer: output once the interval elapses
+                    timer = loop.call_at(deadline, flush)
+        finally:
+            flush()
+
+    def _spawn(self, tokens: list[str]) -> None:
+        """Schedule a tokenized command as a background job.
+
+        Args:
+            tokens (list[str]): Command name followed by its arguments.
+
+        """
+        self._start_job(shlex.join(tokens), self._execute(tokens))
+
+    def _start_job(self, cmdline: str, coro: Awaitable) -> None:
+        """Schedule a coroutine as a background job.
+
+        Jobs outlive the line which spawned them, so their output is not captured
+        with the line output, as by `load --parallel`.
+
+        Args:
+            cmdline (str): Command line which originated the job.
+            coro (Awaitable): Job coroutine.
+
+        """
+        context = contextvars.copy_context()
+        context.run(_output_sink.set, _job_sink.get(_output_sink.get()))
+        job = context.run(self._jobs.spawn, cmdline, coro)
+        self.output(f"[{job.id}] {job.cmdline}")
 
     async def help(self, command: str = "help") -> None:
         """Show Cmdcraft interpreter help.
@@ -117,7 +759,7 @@ class BasePrompter(metaclass=ABCMeta):
 
         For further help, type the command `help [command]`.
         """
-        cmd = self._commands.get(command, None)
+        cmd = self._commands.resolve(command)
         if cmd:
             self.output(cleandoc(cmd.__doc__))
         else:
@@ -126,12 +768,33 @@ class BasePrompter(metaclass=ABCMeta):
 
     async def clear(self) -> None:
         """Clear both command history and screen."""
-        self._history.clear()
-        os.system("clear")
+        self.command_history.clear()
+        if _session_history.get() is None:
+            os.system("clear")
+        else:
+            # Remote session: let the client terminal clear itself
+            self.output("\033[2J\033[H")
+
+    async def history(
+        self, *, grep: str | None = None, prefix: str | None = None, limit: int = 0
+    ) -> None:
+        """Show command history.
+
+        Args:
+            grep (str | None, optional): Show only commands containing this text.
+                Defaults to None.
+            prefix (str | None, optional): Show only commands starting with this
+                text. Defaults to None.
+            limit (int, optional): Show only the last commands. Defaults to 0 (all).
 
-    async def history(self) -> None:
-        """Show command history."""
-        self.output("\n".join(self._history))
+        """
+        if prefix is not None:
+            found = self.command_history.search(
+                prefix, prefix=True, limit=limit or None
+            )
+        else:
+            found = self.command_history.search(grep or "", limit=limit or None)
+        self.output("\n".join(reversed(found)))
 
     async def save(self, file: str) -> None:
         """Save the current command history to a file.
@@ -153,13 +816,13 @@ class BasePrompter(metaclass=ABCMeta):
         with open(filepath, "w", encoding="utf-8") as f:
             script = [
                 x + "\n"
-                for x in self._history
+                for x in self.command_history
                 if not x.startswith(("save", "history", "help"))
             ]
             for line in script:
                 f.write(line)
 
-    async def load(self, file: str) -> None:
+    async def load(self, file: str, *, parallel: int = 1, cache: bool = True) -> None:
         """Load a command file.
 
         This may be used to recover previously saved command history into the
@@ -168,19 +831,215 @@ class BasePrompter(metaclass=ABCMeta):
         If the provided file path is not absolute, the contents will be loaded
         from `routines` folder.
 
+        With `--parallel=N`, up to N lines are executed concurrently. `wait` lines
+        act as barriers, waiting for every previous line to finish. The output of
+        each line is shown in line order, followed by a summary of the run.
+
+        The routine is compiled into pre-tokenized lines, which are cached next to
+        the file (as `.<file>.cmdc`) and reused while the file is unchanged.
+
         Args:
             file (str): Filename.
+            parallel (int, optional): Maximum number of lines executed concurrently.
+                Defaults to 1.
+            cache (bool, optional): Use the compiled routine cache. Defaults to True.
+
+        Raises:
+            RuntimeError: If any line failed, with `--parallel`.
 
         """
         filepath = os.path.join(file)
         if not os.path.isabs(file):
             filepath = os.path.join("routines", filepath)
 
-        with open(filepath, encoding="utf-8") as f:
-            for line in f:
-                if line.startswith(("save", "history", "help")):
-                    continue
-                await self.interpret(line.rstrip())
+        routine = Routine.load(filepath, self._resolve_alias, cache)
+        if parallel <= 1:
+            for line in routine.lines:
+                await self._run_line(line)
+            return
+        await self._load_parallel(routine.lines, parallel)
+
+    def _resolve_alias(self, name: str) -> str | None:
+        """Return the alias of a command name or abbreviation, if any."""
+        cmd = self._commands.resolve(name)
+        return cmd.alias if cmd is not None else None
+
+    async def _run_line(self, line: RoutineLine) -> bool:
+        """Execute a compiled routine line.
+
+        Args:
+            line (RoutineLine): Compiled line.
+
+        Returns:
+            bool: False if the command failed, True otherwise.
+
+        """
+        if line.error is not None:
+            self.output(line.error)
+            return False
+        if "|" in line.tokens:
+            # Pipelines are split from the quoting aware input
+            return await self.interpret(line.text)
+        if line.background:
+            self._spawn(line.tokens)
+            return True
+        return await self._execute(line.tokens)
+
+    async def _load_parallel(self, lines: list[RoutineLine], parallel: int) -> None:
+        """Execute routine lines concurrently.
+
+        Args:
+            lines (list[RoutineLine]): Compiled routine lines.
+            parallel (int): Maximum number of lines executed concurrently.
+
+        Raises:
+            RuntimeError: If any line failed, after the summary is shown.
+
+        """
+        semaphore = asyncio.Semaphore(parallel)
+        # Lines scheduled ahead, whose output waits for the previous lines
+        window = 2 * parallel
+        failures: list[RoutineLine] = []
+        start = time.monotonic()
+
+        async def run(line: RoutineLine) -> tuple[bool, list[tuple]]:
+            captured = []
+            _job_sink.set(_output_sink.get())
+            _output_sink.set(lambda *args: captured.append(args))
+            async with semaphore:
+                ok = await self._run_line(line)
+            return ok, captured
+
+        async def barrier(
+            batch: deque[tuple[RoutineLine, asyncio.Task]], size: int = 0
+        ) -> None:
+            # Output the oldest lines, in order, until at most `size` are left
+            while len(batch) > size:
+                line, task = batch[0]
+                ok, captured = await task
+                batch.popleft()
+                for args in captured:
+                    self.output(*args)
+                if not ok:
+                    failures.append(line)
+
+        batch = deque()
+        try:
+            for line in lines:
+                if line.tokens[:1] == ["wait"]:
+                    await barrier(batch)
+                    if not await self._run_line(line):
+                        failures.append(line)
+                else:
+                    await barrier(batch, window - 1)
+                    batch.append((line, asyncio.ensure_future(run(line))))
+            await barrier(batch)
+        finally:
+            for _, task in batch:
+                task.cancel()
+
+        elapsed = time.monotonic() - start
+        self.output(
+            f"Executed {len(lines)} lines in {elapsed:.3f}s, {len(failures)} failed"
+        )
+        for line in failures:
+            self.output(f"  line {line.lineno}: {line.text}")
+        if failures:
+            raise RuntimeError(f"{len(failures)} of {len(lines)} lines failed")
+
+    async def stats(self, command: str | None = None, *, reset: bool = False) -> None:
+        """Show command statistics.
+
+        For each command, show the number of calls and errors, and the execution
+        latency percentiles. Completion latencies are shown as well.
+
+        Args:
+            command (str | None, optional): Show only this command. Defaults to None.
+            reset (bool, optional): Clear the statistics after showing them.
+                Defaults to False.
+
+        """
+        snapshot = self._metrics.snapshot()
+        header = (
+            f"{'command':<20} {'calls':>8} {'errors':>8} "
+            f"{'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}"
+        )
+        for title, table in snapshot.items():
+            rows = [
+                f"{k:<20} {v['calls']:>8} {v['errors']:>8} "
+                f"{v['p50'] * 1e3:>7.3f}ms {v['p95'] * 1e3:>7.3f}ms "
+                f"{v['p99'] * 1e3:>7.3f}ms {v['max'] * 1e3:>7.3f}ms"
+                for k, v in sorted(table.items())
+                if command is None or k == command
+            ]
+            if rows:
+                self.output(f"{title}:")
+                self.output(header)
+                self.output("\n".join(rows))
+        if reset:
+            self._metrics.reset()
+
+    async def grep(
+        self,
+        pattern: str,
+        *,
+        stream: AsyncIterable | None = None,
+        invert: bool = False,
+        ignore_case: bool = False,
+    ) -> AsyncIterator:
+        """Filter a pipeline stream by a regular expression.
+
+        Args:
+            pattern (str): Regular expression searched in each item.
+            stream (AsyncIterable | None, optional): Pipeline stream.
+            invert (bool, optional): Keep the items not matching. Defaults to False.
+            ignore_case (bool, optional): Match case insensitively. Defaults to
+                False.
+
+        """
+        regex = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        async for item in self._require_stream(stream):
+            if bool(regex.search(str(item))) != invert:
+                yield item
+
+    async def head(
+        self, n: int = 10, *, stream: AsyncIterable | None = None
+    ) -> AsyncIterator:
+        """Keep the first items of a pipeline stream.
+
+        The previous commands are stopped once enough items are received.
+
+        Args:
+            n (int, optional): Number of items. Defaults to 10.
+            stream (AsyncIterable | None, optional): Pipeline stream.
+
+        """
+        if n <= 0:
+            return
+        async for item in self._require_stream(stream):
+            yield item
+            n -= 1
+            if n <= 0:
+                return
+
+    async def count(self, *, stream: AsyncIterable | None = None) -> None:
+        """Count the items of a pipeline stream.
+
+        Args:
+            stream (AsyncIterable | None, optional): Pipeline stream.
+
+        """
+        total = 0
+        async for _ in self._require_stream(stream):
+            total += 1
+        self.output(total)
+
+    @staticmethod
+    def _require_stream(stream: AsyncIterable | None) -> AsyncIterable:
+        """Return a pipeline stream, failing if the command is not piped."""
+        if stream is None:
+            raise ValueError("Expected a pipeline input, as: command | ...")
+        return stream
 
     async def wait(self, delay: float) -> None:
         """Block the execution list for given time.
@@ -191,10 +1050,286 @@ class BasePrompter(metaclass=ABCMeta):
         """
         await asyncio.sleep(float(delay))
 
-    async def quit(self) -> None:
+    async def spawn(self, *command: str) -> None:
+        """Run a command in background.
+
+        The command is scheduled as a job, and the prompt is returned immediately.
+        This is the same as ending the command line with `&`.
+
+        Args:
+            command (str): Command followed by its arguments.
+
+        """
+        if command:
+            self._spawn(list(command))
+
+    async def jobs(self) -> None:
+        """Show background jobs.
+
+        Finished jobs are removed from the table once shown.
+        """
+        for job in self._jobs:
+            self.output(f"[{job.id}] {job.status:<9} {job.elapsed:8.2f}s {job.cmdline}")
+        self._jobs.purge()
+
+    async def fg(self, job: int | None = None) -> None:
+        """Wait for a background job to finish.
+
+        Args:
+            job (int | None, optional): Job identifier. Defaults to the most recent
+                job.
+
+        """
+        j = self._jobs.get(job)
+        if j is None:
+            self.output("No such job")
+            return
+        await asyncio.wait([j.task])
+        self._jobs.remove(j.id)
+        if j.status != "done":
+            self.output(f"[{j.id}] {j.status} {j.cmdline}")
+
+    async def kill(self, job: int) -> None:
+        """Cancel a background job.
+
+        Args:
+            job (int): Job identifier.
+
+        """
+        j = self._jobs.get(job)
+        if j is None:
+            self.output("No such job")
+            return
+        j.task.cancel()
+
+    async def foreach(self, *command: str) -> None:
+        """Run a command once for each argument set, concurrently.
+
+        Argument sets are taken from one source, given before the command:
+
+            --file=FILE        Each line of FILE, tokenized as a command line.
+            --range=[A:]B[:S]  Each integer of the range.
+            --options=PARAM    Each option of the command parameter PARAM.
+
+        Each set replaces the `{}` arguments of the command, or is appended to its
+        arguments otherwise (as `--PARAM=option` for options). Other options:
+
+            --parallel=N       Maximum number of concurrent runs. Defaults to 8.
+            --progress=SECS    Progress report interval. Defaults to 1 (0 disables).
+
+        A table of the results, with the error of each failed run, is shown at the
+        end. The command fails if any run failed.
+
+        Args:
+            command (str): Options, followed by the command and its arguments.
+
+        """
+        parallel, progress, source = 8, 1.0, None
+        tokens = list(command)
+        while tokens and tokens[0].startswith("--"):
+            name, _, value = tokens.pop(0).partition("=")
+            if name == "--":
+                break
+            if name == "--parallel":
+                parallel = max(1, int(value))
+            elif name == "--progress":
+                progress = float(value)
+            elif name in ("--file", "--range", "--options"):
+                if source is not None:
+                    raise TypeError("Expected a single source of arguments")
+                source = name[2:], value
+            else:
+                raise TypeError(f"Unknown option: {name}")
+        if source is None:
+            raise TypeError("Missing --file, --range or --options")
+        if not tokens:
+            raise TypeError("Missing command")
+        cmd = self._commands.resolve(tokens[0])
+        if cmd is None:
+            raise ValueError(f"Unknown command: {tokens[0]}")
+
+        kind, value = source
+        if kind == "file":
+            with open(value, encoding="utf-8") as f:
+                items = [x for x in map(Input.tokenize, f) if x]
+        elif kind == "range":
+            bounds = [int(x) for x in value.split(":")]
+            items = [[str(x)] for x in range(*bounds)]
+        else:
+            par = cmd.parameter(value)
+            if par is None:
+                raise TypeError(f"Unknown parameter: {value}")
+            items = [[x] for x in await par.fetch_options()]
+
+        template = tokens[1:]
+        placeholder = any("{}" in x for x in template)
+
+        def arguments(item: list[str]) -> list[str]:
+            if not placeholder:
+                if kind == "options":
+                    return [*template, f"--{value}={item[0]}"]
+                return template + item
+            args = []
+            for x in template:
+                if x == "{}":
+                    args.extend(item)
+                else:
+                    args.append(x.replace("{}", " ".join(item)))
+            return args
+
+        results: list[tuple[float, str | None] | None] = [None] * len(items)
+        pending = iter(enumerate(items))
+        done = failed = 0
+
+        async def worker() -> None:
+            nonlocal done, failed
+            for i, item in pending:
+                error = None
+                start = time.perf_counter_ns()
+                try:
+                    args, timeout = self._split_timeout(cmd, arguments(item))
+                    await _deadline(self._drain(cmd.eval(*args), None), timeout)
+                except _Expired:
+                    error = "Timed out"
+                except Exception as e:
+                    error = str(e) or type(e).__name__
+                elapsed = time.perf_counter_ns() - start
+                self._metrics.record(cmd.alias, elapsed, error is not None)
+                results[i] = elapsed / 1e9, error
+                done += 1
+                failed += error is not None
+
+        async def report() -> None:
+            while True:
+                await asyncio.sleep(progress)
+                self.output(f"foreach: {done}/{len(items)} done, {failed} failed")
+
+        start = time.monotonic()
+        tasks = [asyncio.ensure_future(worker()) for _ in range(parallel)]
+        reporter = asyncio.ensure_future(report()) if progress > 0 else None
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            if reporter is not None:
+                reporter.cancel()
+
+        labels = [shlex.join(x) for x in items]
+        width = max(len(x) for x in labels) if labels else 0
+        rows = [
+            f"{label:<{width}} {'failed' if error else 'ok':<6} {elapsed:8.3f}s"
+            + (f" {error}" if error else "")
+            for label, (elapsed, error) in zip(labels, results)
+        ]
+        if rows:
+            self.output("\n".join(rows))
+        self.output(
+            f"Executed {len(items)} items in {time.monotonic() - start:.3f}s, "
+            f"{failed} failed"
+        )
+        if failed:
+            raise RuntimeError(f"{cmd.alias} failed for {failed} item(s)")
+
+    async def profile(self, *command: str) -> None:
+        """Run a command under CPU and memory profiling.
+
+        Show the functions taking most time and the lines allocating most memory
+        while the command runs. Options go before the command:
+
+            --top=N      Number of entries shown. Defaults to 10.
+            --sort=KEY   CPU sort key, as `pstats`. Defaults to cumulative.
+            --dump=FILE  Save CPU stats into FILE, loadable by `pstats`, and the
+                         memory allocations into FILE.mem.
+
+        Other tasks running meanwhile, like background jobs, are profiled too. The
+        report is shown even if the command fails, and the failure is raised after.
+
+        Args:
+            command (str): Options, followed by the command and its arguments.
+
+        Raises:
+            RuntimeError: If the profiled command failed.
+
+        """
+        top, sort, dump = 10, "cumulative", None
+        tokens = list(command)
+        while tokens and tokens[0].startswith("--"):
+            name, _, value = tokens.pop(0).partition("=")
+            if name == "--":
+                break
+            if name == "--top":
+                top = int(value)
+            elif name == "--sort":
+                sort = value
+            elif name == "--dump":
+                dump = value
+            else:
+                raise TypeError(f"Unknown option: {name}")
+        if not tokens:
+            raise TypeError("Missing command")
+
+        # Imported here, as they are only needed by this command
+        import cProfile
+        import pstats
+        import tracemalloc
+
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            ok = await self._execute(tokens)
+        finally:
+            profiler.disable()
+            after = tracemalloc.take_snapshot()
+            if not tracing:
+                tracemalloc.stop()
+
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ]
+        allocations = after.filter_traces(filters).compare_to(
+            before.filter_traces(filters), "lineno"
+        )
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.strip_dirs().sort_stats(sort).print_stats(top)
+        self.output(stream.getvalue().strip())
+        self.output("Top allocations:")
+        self.output("\n".join(str(x) for x in allocations[:top]))
+        if dump is not None:
+            profiler.dump_stats(dump)
+            with open(f"{dump}.mem", "w", encoding="utf-8") as f:
+                f.writelines(f"{x}\n" for x in allocations)
+        if not ok:
+            raise RuntimeError(f"{tokens[0]} failed")
+
+    async def quit(self, *, grace: float = 10.0) -> None:
         """Stop the execution loop.
 
         This method calls for a graceful exit, waiting the current scheduled
-        commands to execute.
+        commands to execute. From a remote session, it only ends that session.
+
+        Args:
+            grace (float, optional): Time in seconds to wait for background jobs
+                before cancelling them. Defaults to 10.0.
+
         """
+        if _session_history.get() is not None:
+            # Remote session: the prompter keeps serving the other ones
+            close = _session_close.get()
+            if close is not None:
+                close()
+            return
         self._is_running = False
+        self.save_signatures()
+        cancelled = await self._jobs.drain(grace)
+        if cancelled:
+            self.output(f"Cancelled {cancelled} pending job(s)")
+        self._history.close()
+        self._shutdown_pools()
+        await self.close_output()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Prompter socket client.
+
+Lightweight client for `PromptServer`, depending only on the standard library:
+
+    python -m cmdcraft.client --unix /run/service.sock
+    CMDCRAFT_TOKEN=secret python -m cmdcraft.client --tcp 127.0.0.1:7000 < routine.txt
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+from typing import TextIO
+
+from .server import END
+
+
+async def run_client(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    input: TextIO | None = None,
+    output: TextIO | None = None,
+    prompt: str | None = None,
+) -> int:
+    """Send commands to a server, printing their output.
+
+    Output from background jobs is printed as soon as it arrives. Each command is
+    sent once the previous one has finished.
+
+    Args:
+        reader (asyncio.StreamReader): Server input stream.
+        writer (asyncio.StreamWriter): Server output stream.
+        input (TextIO | None, optional): Commands stream. Defaults to `sys.stdin`.
+        output (TextIO | None, optional): Output stream. Defaults to `sys.stdout`.
+        prompt (str | None, optional): Prompt shown before reading a command.
+            Defaults to "> " if input is a terminal, no prompt otherwise.
+
+    Returns:
+        int: Number of failed commands, plus one if the server closed the
+        connection before accepting commands.
+
+    """
+    input = input or sys.stdin
+    output = output or sys.stdout
+    if prompt is None:
+        prompt = "> " if input.isatty() else ""
+    loop = asyncio.get_running_loop()
+    ready = asyncio.Event()
+    failures = 0
+    accepted = False
+
+    async def receive() -> None:
+        nonlocal failures, accepted
+        while line := await reader.readline():
+            text = line.decode("utf-8", errors="replace")
+            if text.startswith(END):
+                failures += text[len(END) :].strip() == "0"
+                accepted = True
+                ready.set()
+            else:
+                output.write(text)
+                output.flush()
+        # Rejected, as by a failed authentication
+        failures += not accepted
+        ready.set()
+
+    receiver = asyncio.create_task(receive())
+    try:
+        while True:
+            await ready.wait()
+            ready.clear()
+            if receiver.done():
+                break
+            if prompt:
+                output.write(prompt)
+                output.flush()
+            line = await loop.run_in_executor(None, input.readline)
+            if not line:
+                break
+            writer.write(line.encode() if line.endswith("\n") else f"{line}\n".encode())
+            await writer.drain()
+    finally:
+        receiver.cancel()
+        writer.close()
+    return failures
+
+
+async def connect(
+    unix: str | None = None, tcp: str | None = None, token: str | None = None
+) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    """Connect to a server.
+
+    Args:
+        unix (str | None, optional): Unix domain socket path. Defaults to None.
+        tcp (str | None, optional): TCP address, as HOST:PORT. Defaults to None.
+        token (str | None, optional): Authentication token of TCP servers.
+            Defaults to None.
+
+    Returns:
+        tuple[asyncio.StreamReader, asyncio.StreamWriter]: Server streams.
+
+    """
+    if unix is not None:
+        return await asyncio.open_unix_connection(unix)
+    host, _, port = tcp.rpartition(":")
+    reader, writer = await asyncio.open_connection(host or "127.0.0.1", int(port))
+    writer.write(f"{token or ''}\n".encode())
+    return reader, writer
+
+
+async def _main(args: argparse.Namespace) -> int:
+    """Connect and run the client."""
+    token = os.environ.get("CMDCRAFT_TOKEN", None)
+    if args.token_file is not None:
+        with open(args.token_file, encoding="utf-8") as f:
+            token = f.read().strip()
+    reader, writer = await connect(args.unix, args.tcp, token)
+    return await run_client(reader, writer)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the client from the command line.
+
+    Args:
+        argv (list[str] | None, optional): Command line arguments. Defaults to
+            `sys.argv`.
+
+    Returns:
+        int: Exit status, 1 if any command failed.
+
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m cmdcraft.client",
+        description="Attach to a cmdcraft prompter server.",
+    )
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--unix", metavar="PATH", help="Unix domain socket path")
+    group.add_argument("--tcp", metavar="HOST:PORT", help="TCP address")
+    parser.add_argument(
+        "--token-file",
+        metavar="PATH",
+        help="file with the TCP authentication token (default: $CMDCRAFT_TOKEN)",
+    )
+    args = parser.parse_args(argv)
+    try:
+        return 1 if asyncio.run(_main(args)) else 0
+    except KeyboardInterrupt:
+        return 130
+    except OSError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
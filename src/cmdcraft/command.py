@@ -4,10 +4,105 @@
 from __future__ import annotations
 
 import asyncio
+import contextvars
+import functools
 import inspect
+import sys
+import threading
+from collections.abc import Callable
+from concurrent.futures import Executor
 from typing import get_type_hints
 
 from .parameter import Parameter
+from .signatures import ParameterSpec, SignatureCache
+
+_POSITIONAL_ONLY = inspect.Parameter.POSITIONAL_ONLY
+_POSITIONAL_OR_KEYWORD = inspect.Parameter.POSITIONAL_OR_KEYWORD
+_VAR_POSITIONAL = inspect.Parameter.VAR_POSITIONAL
+_KEYWORD_ONLY = inspect.Parameter.KEYWORD_ONLY
+_VAR_KEYWORD = inspect.Parameter.VAR_KEYWORD
+
+
+class Binding:
+    """Argument binding plan.
+
+    This class holds everything needed to bind input tokens into call arguments of a
+    command. It is compiled once by `Command.process`, so evaluating a call only
+    runs the plan.
+    """
+
+    __slots__ = ("_has_args", "_has_kwargs", "_keyword", "_positional")
+
+    def __init__(
+        self,
+        positional: list[callable],
+        keyword: dict[str, callable],
+        has_args: bool = False,
+        has_kwargs: bool = False,
+    ) -> None:
+        """Construct a Binding object.
+
+        Args:
+            positional (list[callable]): Cast functions of positional parameters.
+            keyword (dict[str, callable]): Cast functions of keyword parameters.
+            has_args (bool, optional): Accept variadic non-keyword arguments.
+                Defaults to False.
+            has_kwargs (bool, optional): Accept variadic keyword arguments.
+                Defaults to False.
+
+        """
+        self._positional = tuple(positional)
+        self._keyword = keyword
+        self._has_args = has_args
+        self._has_kwargs = has_kwargs
+
+    def bind(self, tokens: tuple[str, ...]) -> tuple[list, dict]:
+        """Bind input tokens into call arguments.
+
+        Tokens starting with `--` are options, in the `--name=value` form, and the
+        value is kept as is even if it contains `=`. A single `--` token ends the
+        options, so following tokens are positional even if they start with `--`.
+        Missing arguments are left out, so the callable defaults apply.
+
+        Args:
+            tokens (tuple[str, ...]): Input tokens, without the command name.
+
+        Returns:
+            tuple[list, dict]: Positional and keyword arguments.
+
+        Raises:
+            TypeError: If the tokens do not match the command parameters.
+
+        """
+        positional = self._positional
+        keyword = self._keyword
+        args = []
+        kwargs = {}
+        options = True
+        for tk in tokens:
+            if options and tk.startswith("--"):
+                if tk == "--":
+                    options = False
+                    continue
+                name, sep, value = tk[2:].partition("=")
+                if not sep:
+                    raise TypeError(f"option '--{name}' requires a value")
+                cast = keyword.get(name)
+                if cast is not None:
+                    kwargs[name] = cast(value)
+                elif self._has_kwargs:
+                    kwargs[name] = value
+                else:
+                    raise TypeError(f"unexpected option '--{name}'")
+            elif len(args) < len(positional):
+                args.append(positional[len(args)](tk))
+            elif self._has_args:
+                args.append(tk)
+            else:
+                raise TypeError(
+                    f"takes {len(positional)} positional arguments but more were given"
+                )
+        return args, kwargs
 
 
 class Command:
@@ -17,12 +112,30 @@ class Command:
     parameters.
     """
 
-    def __init__(self, cb: callable, alias: str | None = None) -> None:
+    def __init__(
+        self,
+        cb: callable,
+        alias: str | None = None,
+        raw: bool = False,
+        executor: Executor | Callable[[], Executor] | None = None,
+        timeout: float | None = None,
+        cache: SignatureCache | None = None,
+    ) -> None:
         """Construct a Command object.
 
         Args:
             cb (callable): Callable to be wrapped.
             alias (str | None, optional): Command name. Defaults to None.
+            raw (bool, optional): Pass input tokens to the callable as is, without
+                binding them to its parameters. Defaults to False.
+            executor (Executor | Callable[[], Executor] | None, optional): Executor
+                where a synchronous callable runs, or a callable returning it on
+                each call, like a lazily created pool. Defaults to None (the event
+                loop default executor).
+            timeout (float | None, optional): Time limit of a call, in seconds.
+                Defaults to None (no limit).
+            cache (SignatureCache | None, optional): Cache of processed signatures.
+                Defaults to None.
 
         """
         self._cb: callable = cb
@@ -33,6 +146,19 @@ class Command:
         self._alias: str = alias if alias is not None else self.name
         self._has_args: bool = False
         self._has_kwargs: bool = False
+        self._raw: bool = raw
+        self._executor: Executor | Callable[[], Executor] | None = executor
+        self._timeout: float | None = timeout
+        self._cache: SignatureCache | None = cache
+        self._is_async: bool = True
+        self._is_generator: bool = False
+        self._stream: str | None = None
+        # Position of the stream parameter among positional ones, if positional
+        self._stream_index: int | None = None
+        self._binding: Binding | None = None
+        self._processed: bool = False
+        # Processing may be triggered from the loop and the completer threads
+        self._lock = threading.Lock()
 
     @property
     def __doc__(self) -> str:
@@ -74,6 +200,7 @@ class Command:
             dict[str, Parameter]: Parameters.
 
         """
+        self._ensure()
         return self._pars
 
     @property
@@ -84,6 +211,7 @@ class Command:
             dict[str, Parameter]: Parameters.
 
         """
+        self._ensure()
         return self._positional
 
     @property
@@ -94,70 +222,195 @@ class Command:
             dict[str, Parameter]: Parameters.
 
         """
+        self._ensure()
         return self._keyword
 
+    @property
+    def processed(self) -> bool:
+        """Return if the callable metadata was processed."""
+        return self._processed
+
+    @property
+    def raw(self) -> bool:
+        """Return if the command receives the input tokens as is."""
+        return self._raw
+
+    @property
+    def is_async(self) -> bool:
+        """Return if the callable is a coroutine function."""
+        self._ensure()
+        return self._is_async
+
+    @property
+    def is_generator(self) -> bool:
+        """Return if the callable is an async generator function.
+
+        Async generators stream their items, and may feed a pipeline.
+        """
+        self._ensure()
+        return self._is_generator
+
+    @property
+    def stream_parameter(self) -> str | None:
+        """Return the parameter receiving a pipeline stream, if any."""
+        self._ensure()
+        return self._stream
+
+    @property
+    def executor(self) -> Executor | None:
+        """Return the executor where a synchronous callable runs."""
+        if callable(self._executor):
+            return self._executor()
+        return self._executor
+
+    @property
+    def timeout(self) -> float | None:
+        """Return the time limit of a call, in seconds."""
+        return self._timeout
+
     @property
     def has_args(self) -> bool:
         """Return if the command accepts variadic non-keyword arguments."""
+        self._ensure()
         return self._has_args
 
     @property
     def has_kwargs(self) -> bool:
         """Return if the command accepts variadic keyword arguments."""
+        self._ensure()
         return self._has_kwargs
 
-    def eval(self, *args) -> asyncio.Future:
+    def eval(self, *args, **extra) -> asyncio.Future:
         """Evaluate a call.
 
+        Synchronous callables run in the command executor, so they don't block the
+        event loop. Arguments are bound before, so binding errors are raised
+        immediately. Async generator functions return their async generator.
+
+        Args:
+            args: Input tokens.
+            extra: Keyword arguments passed as is, like the stream parameter.
+
         Returns:
             asyncio.Future: A future of this callable.
 
         """
-        pos: list[str] = [x for x in args if "--" not in x]
-        kws: list[str] = [x.lstrip("--") for x in args if "--" in x]
-
-        args = []
-        var_args = []
-        for a, p in zip(pos, self._positional.values()):
-            args.append(p.cast(a))
+        if not self._processed:
+            self.process()
+        if self._raw:
+            kwargs = extra
+        else:
+            args, kwargs = self._binding.bind(args)
+            index = self._stream_index
+            if index is not None and self._stream in extra and len(args) >= index:
+                # Passed at its position, as it may be positional only
+                args.insert(index, extra.pop(self._stream))
+            kwargs.update(extra)
+        if self._is_async or self._is_generator:
+            return self._cb(*args, **kwargs)
+        call = functools.partial(self._cb, *args, **kwargs)
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        # The process pool module is imported by creating one, so it is only looked
+        # up when already loaded
+        process = sys.modules.get("concurrent.futures.process")
+        if process is not None and isinstance(executor, process.ProcessPoolExecutor):
+            return loop.run_in_executor(executor, call)
+        # Threads see the caller context, like its output sink
+        return loop.run_in_executor(executor, contextvars.copy_context().run, call)
+
+    def bind(self, *args) -> tuple[list, dict]:
+        """Bind input tokens into call arguments, casting them.
 
-        if self.has_args:
-            var_args = pos[len(self._positional):]
+        Returns:
+            tuple[list, dict]: Positional and keyword arguments.
 
-        kwargs = {}
-        for kw in kws:
-            [par, value] = kw.split("=")
-            if par in self._pars:
-                kwargs[par] = self._pars[par].cast(value)
-            elif self.has_kwargs:
-                kwargs[par] = value
+        """
+        if self._raw:
+            return list(args), {}
+        self._ensure()
+        return self._binding.bind(args)
 
-        return self._cb(*args, *var_args, **kwargs)
+    def _ensure(self) -> None:
+        """Process the callable metadata, if not done yet."""
+        if not self._processed:
+            self.process()
 
     def process(self) -> None:
-        """Process the callable metadata."""
+        """Process the callable metadata.
+
+        This is done on first use of the metadata, or explicitly, to report
+        annotation errors early. Later calls do nothing. It is thread-safe: the
+        metadata is built once, and published at once.
+        """
+        if self._processed:
+            return
+        with self._lock:
+            if not self._processed:
+                self._process()
+
+    def _process(self) -> None:
+        """Build the callable metadata and publish it."""
         f = self._cb
-        anns = get_type_hints(f)
-        pars = inspect.signature(f).parameters
-        for k, v in pars.items():
-            default = None
-            ptype = None
-            if v.default is not inspect.Parameter.empty:
-                default = v.default
-            if k in anns:
-                ptype = anns[k]
+        pars, positional, keyword = {}, {}, {}
+        has_args = has_kwargs = False
+        stream = stream_index = None
+        specs = self._cache.get(f) if self._cache is not None else None
+        if specs is None:
+            specs = self._introspect()
+            if self._cache is not None:
+                self._cache.put(f, specs)
+
+        casts = {}
+        for k, kind, ptype, default in specs:
             par = Parameter(k, ptype, default)
-
-            if v.kind in (v.POSITIONAL_ONLY, v.POSITIONAL_OR_KEYWORD):
-                self._positional[k] = par
-            elif v.kind == v.KEYWORD_ONLY:
-                self._keyword[k] = par
-            elif v.kind == v.VAR_POSITIONAL:
-                self._has_args = True
-            elif v.kind == v.VAR_KEYWORD:
-                self._has_kwargs = True
-            self._pars[k] = par
+            pars[k] = par
+            if stream is None and par.is_stream:
+                # Passed by the pipeline, not bound from tokens
+                stream = k
+                if kind in (_POSITIONAL_ONLY, _POSITIONAL_OR_KEYWORD):
+                    stream_index = len(positional)
+                continue
+            if kind in (_POSITIONAL_ONLY, _POSITIONAL_OR_KEYWORD):
+                positional[k] = par
+            elif kind == _KEYWORD_ONLY:
+                keyword[k] = par
+            elif kind == _VAR_POSITIONAL:
+                has_args = True
+            elif kind == _VAR_KEYWORD:
+                has_kwargs = True
+            if kind in (_POSITIONAL_OR_KEYWORD, _KEYWORD_ONLY):
+                casts[k] = par._cast
+
+        self._is_generator = inspect.isasyncgenfunction(f)
+        self._is_async = inspect.iscoroutinefunction(f) or (
+            not inspect.isroutine(f)
+            and inspect.iscoroutinefunction(getattr(f, "__call__", None))
+        )
+        self._pars, self._positional, self._keyword = pars, positional, keyword
+        self._has_args, self._has_kwargs = has_args, has_kwargs
+        self._stream, self._stream_index = stream, stream_index
+        self._binding = Binding(
+            [p._cast for p in positional.values()], casts, has_args, has_kwargs
+        )
+        # Set last, as readers check it without the lock
+        self._processed = True
+
+    def _introspect(self) -> list[ParameterSpec]:
+        """Return the parameter specifications of the callable signature."""
+        anns = get_type_hints(self._cb)
+        pars = inspect.signature(self._cb).parameters
+        return [
+            (
+                k,
+                v.kind,
+                anns.get(k, None),
+                None if v.default is inspect.Parameter.empty else v.default,
+            )
+            for k, v in pars.items()
+        ]
 
     def parameter(self, parameter: str) -> Parameter | None:
         """Parameter getter."""
+        self._ensure()
         return self._pars.get(parameter, None)
@@ -3,10 +3,17 @@
 
 from __future__ import annotations
 
-from typing import Iterable
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncGenerator, Iterable
 
+from prompt_toolkit.application import get_app_or_none
 from prompt_toolkit.completion import (
     CompleteEvent,
+    Completer,
     Completion,
     FuzzyWordCompleter,
     NestedCompleter,
@@ -15,22 +22,62 @@ from prompt_toolkit.document import Document
 
 from cmdcraft.command import Command
 from cmdcraft.input import Input, InputState
+from cmdcraft.metrics import Metrics
+from cmdcraft.options import _caller_loop
+from cmdcraft.registry import CommandRegistry
+
+
+def _timed(
+    completions: Iterable[Completion], metrics: Metrics, name: str
+) -> Iterable[Completion]:
+    """Yield completions, recording the time spent producing all of them.
+
+    Completions are usually generated lazily, so the time is measured around each
+    item, excluding the time the consumer takes between items.
+    """
+    elapsed = 0
+    iterator = iter(completions)
+    try:
+        while True:
+            start = time.perf_counter_ns()
+            try:
+                completion = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed += time.perf_counter_ns() - start
+            yield completion
+    finally:
+        metrics.record_completion(name, elapsed)
 
 
 class CommandCompleter(NestedCompleter):
     """Prompt Completer class."""
 
-    def __init__(self, command: Command, ignore_case: bool = True) -> None:
+    def __init__(
+        self,
+        command: Command,
+        ignore_case: bool = True,
+        limit: int | None = 100,
+        metrics: Metrics | None = None,
+    ) -> None:
         """CommandCompleter constructor.
 
         Args:
             command (Command): Command which will be used as base.
             ignore_case (bool, optional): Sets if input should be case-sensitive
                 or not. Defaults to True.
+            limit (int | None, optional): Maximum number of value completions.
+                Defaults to 100.
+            metrics (Metrics | None, optional): Metrics where completion latencies
+                are recorded. Defaults to None.
 
         """
         super().__init__([], ignore_case)
         self._command = command
+        self._input = Input()
+        self._limit = limit
+        self._metrics = metrics
 
     def _get_par_completions(
         self, input: Input, document: Document, complete_event: CompleteEvent
@@ -46,11 +93,10 @@ class CommandCompleter(NestedCompleter):
             Iterable[Completion]: List of Completions for current prompt.
 
         """
-        pars = list(self._command._positional.keys())
-        idx = pars[input.position]
-        par = self._command._positional[idx]
-        completer = FuzzyWordCompleter(list(par.options))
-        return completer.get_completions(document, complete_event)
+        positional = self._command.positional_parameters
+        par = positional[list(positional)[input.position]]
+        word = document.get_word_before_cursor(WORD=True)
+        return (Completion(x, -len(word)) for x in par.match(word, self._limit))
 
     def _get_opt_completions(
         self, _: str, document: Document, complete_event: CompleteEvent
@@ -84,15 +130,100 @@ class CommandCompleter(NestedCompleter):
             Iterable[Completion]: List of Completions for current prompt.
 
         """
-        (par, arg) = prompt.lstrip("--").split("=")
-        if par not in self._command._pars:
+        (par, _, arg) = prompt.lstrip("--").partition("=")
+        pars = self._command.parameters
+        if par not in pars:
+            return ()
+        vs = pars[par].match(arg, self._limit)
+        return (Completion(x, -len(arg)) for x in vs)
+
+    def get_completions(
+        self, document: Document, complete_event: CompleteEvent
+    ) -> Iterable[Completion]:
+        """Get list of completions for current input.
+
+        Args:
+            document (Document): Current document object.
+            complete_event (CompleteEvent): Completion event.
+
+        Returns:
+            Iterable[Completion]: List of Completions for current prompt.
+
+        """
+        completions = self._get_completions(document, complete_event)
+        if self._metrics is None:
+            return completions
+        return _timed(completions, self._metrics, self._command.alias)
+
+    def _get_completions(
+        self, document: Document, complete_event: CompleteEvent
+    ) -> Iterable[Completion]:
+        """Get list of completions for current input."""
+        input = self._input
+        input.update(document.text)
+        input.process()
+        if input.state == InputState.TYPING_STRING:
             return ()
-        vs = self._command._pars[par].options
-        if vs is None:
+        elif input.position < len(self._command.positional_parameters):
+            return self._get_par_completions(input, document, complete_event)
+        elif input.state in (InputState.TYPING_OPTION, InputState.TYPING_COMPLETE):
+            return self._get_opt_completions("", document, complete_event)
+        elif input.state == InputState.TYPING_VALUE:
+            word = input.tokens[-1]
+            return self._get_value_completions(word, document, complete_event)
+        else:
             return ()
-        completer = FuzzyWordCompleter(vs)
-        doc = Document(arg, -len(arg) - 2)
-        return completer.get_completions(doc, complete_event)
+
+
+class RegistryCompleter(Completer):
+    """Prompt Completer over a command registry.
+
+    The first word is completed from the registry prefix trie, and the following
+    words by the CommandCompleter of the typed command, which may be abbreviated.
+    The CommandCompleters are kept in sync with the registry incrementally.
+    """
+
+    # Name under which command name completions are recorded
+    COMMAND_NAME = "<command>"
+
+    def __init__(
+        self,
+        registry: CommandRegistry,
+        limit: int | None = 1000,
+        metrics: Metrics | None = None,
+    ) -> None:
+        """RegistryCompleter constructor.
+
+        Args:
+            registry (CommandRegistry): Command registry.
+            limit (int | None, optional): Maximum number of command completions.
+                Defaults to 1000.
+            metrics (Metrics | None, optional): Metrics where completion latencies
+                are recorded. Defaults to None.
+
+        """
+        self._registry = registry
+        self._limit = limit
+        self._metrics = metrics
+        self._input = Input()
+        self.options: dict[str, CommandCompleter] = {
+            name: CommandCompleter(cmd, metrics=metrics)
+            for name, cmd in registry.items()
+        }
+        registry.subscribe(self._update)
+
+    def _update(self, alias: str, command: Command | None) -> None:
+        """Apply a registry change.
+
+        Args:
+            alias (str): Changed command alias.
+            command (Command | None): New command, or None if it was removed.
+
+        """
+        if command is None:
+            self.options.pop(alias, None)
+        else:
+            self.options[alias] = CommandCompleter(command, metrics=self._metrics)
 
     def get_completions(
         self, document: Document, complete_event: CompleteEvent
@@ -107,17 +238,167 @@ class CommandCompleter(NestedCompleter):
             Iterable[Completion]: List of Completions for current prompt.
 
         """
+        text = document.text_before_cursor
+        # Complete the last pipeline stage
+        self._input.update(text)
+        self._input.process()
+        text = text[self._input.stage_offset :].lstrip()
+        stripped_len = len(document.text_before_cursor) - len(text)
+
+        if " " not in text:
+            names = (
+                Completion(name, start_position=-len(text))
+                for name in self._registry.complete(text, self._limit)
+            )
+            if self._metrics is not None:
+                names = _timed(names, self._metrics, self.COMMAND_NAME)
+            yield from names
+            return
+
+        first_term = text.split()[0]
+        cmd = self._registry.resolve(first_term)
+        completer = self.options.get(cmd.alias, None) if cmd is not None else None
+        if completer is None:
+            return
+        remaining_text = text[len(first_term) :].lstrip()
+        move_cursor = len(text) - len(remaining_text) + stripped_len
+        new_document = Document(
+            remaining_text, cursor_position=document.cursor_position - move_cursor
+        )
+        yield from completer.get_completions(new_document, complete_event)
+
+
+class AsyncCompleter(Completer):
+    """Non-blocking completer.
+
+    This class wraps a completer, running it in a worker thread so slow option
+    generators or huge option lists do not freeze keystrokes. Requests are debounced
+    while typing, and a request is abandoned as soon as the input changes: the
+    completions it produced are dropped. Each request has a time budget, after
+    which the completions found so far are returned.
+
+    The worker only checks for abandoned requests between completions: a single
+    slow completion keeps it busy, and following requests return nothing, each
+    after its budget, until it is produced. Option generators should be cached,
+    like dynamic options, to keep completions fast.
+
+    Static options and the completers themselves are read from the worker thread.
+    Dynamic options are served from their cached snapshot, refreshed in background:
+    coroutine generators on the event loop, and synchronous ones in its default
+    executor, like synchronous commands. Either way, a slow generator never
+    exceeds the request budget.
+    """
+
+    def __init__(
+        self, completer: Completer, debounce: float = 0.05, budget: float = 0.2
+    ) -> None:
+        """AsyncCompleter constructor.
+
+        Args:
+            completer (Completer): Wrapped completer.
+            debounce (float, optional): Time to wait for further keystrokes before
+                completing, in seconds. Explicit requests, like Tab, are not
+                debounced. Defaults to 0.05.
+            budget (float, optional): Maximum time of a request, in seconds.
+                Defaults to 0.2.
+
+        """
+        self._completer = completer
+        self._debounce = debounce
+        self._budget = budget
+        self._generation: int = 0
+        self._executor: ThreadPoolExecutor | None = None
+
+    @property
+    def completer(self) -> Completer:
+        """Return the wrapped completer."""
+        return self._completer
+
+    def get_completions(
+        self, document: Document, complete_event: CompleteEvent
+    ) -> Iterable[Completion]:
+        """Get list of completions for current input, synchronously.
+
+        Args:
+            document (Document): Current document object.
+            complete_event (CompleteEvent): Completion event.
+
+        Returns:
+            Iterable[Completion]: List of Completions for current prompt.
+
+        """
+        return self._completer.get_completions(document, complete_event)
+
+    async def get_completions_async(
+        self, document: Document, complete_event: CompleteEvent
+    ) -> AsyncGenerator[Completion, None]:
+        """Get list of completions for current input, without blocking the loop.
+
+        Args:
+            document (Document): Current document object.
+            complete_event (CompleteEvent): Completion event.
+
+        Yields:
+            Completion: Completions for current prompt.
+
+        """
+        self._generation += 1
+        generation = self._generation
+
+        def stale() -> bool:
+            return generation != self._generation or self._is_stale(document)
+
+        if self._debounce > 0 and not complete_event.completion_requested:
+            await asyncio.sleep(self._debounce)
+            if stale():
+                return
+
+        found: list[Completion] = []
+        stop = threading.Event()
+        deadline = time.monotonic() + self._budget
+
+        def collect() -> None:
+            for completion in self._completer.get_completions(document, complete_event):
+                if stop.is_set():
+                    break
+                found.append(completion)
+                if time.monotonic() >= deadline:
+                    break
+
+        loop = asyncio.get_running_loop()
+        # Options refreshed by the worker thread are fetched on this loop
+        context = contextvars.copy_context()
+        context.run(_caller_loop.set, loop)
+        if self._executor is None:
+            # A single worker, as completers keep their parsing state
+            self._executor = ThreadPoolExecutor(1, "cmdcraft-complete")
+        future = loop.run_in_executor(self._executor, context.run, collect)
+        future.add_done_callback(lambda x: x.cancelled() or x.exception())
         try:
-            input = Input(document.text)
-            input.process()
-            if input.position < len(self._command._positional):
-                return self._get_par_completions(input, document, complete_event)
-            elif input.state in (InputState.TYPING_OPTION, InputState.TYPING_COMPLETE):
-                return self._get_opt_completions("", document, complete_event)
-            elif input.state == InputState.TYPING_VALUE:
-                word = input.tokens[-1]
-                return self._get_value_completions(word, document, complete_event)
-            else:
-                return ()
-        except ValueError:  # TODO: improve open quote handling
-            return ()
+            while not future.done() and not stale():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                await asyncio.wait({future}, timeout=min(remaining, 0.02))
+        finally:
+            stop.set()
+        if stale():
+            return
+        if future.done() and not future.cancelled() and future.exception():
+            raise future.exception()
+        for completion in found[:]:
+            yield completion
+
+    def close(self) -> None:
+        """Stop the worker thread."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @staticmethod
+    def _is_stale(document: Document) -> bool:
+        """Return if the input changed since a request was made."""
+        app = get_app_or_none()
+        if app is None or not app.is_running:
+            return False
+        return app.current_buffer.text != document.text
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Fuzzy matching index."""
+
+from __future__ import annotations
+
+import heapq
+import operator
+import re
+from bisect import bisect_left
+from collections.abc import Sequence
+from itertools import islice, repeat
+
+_NONZERO = re.compile(rb"[^\x00]")
+
+
+class FuzzyIndex:
+    """Fuzzy matching index.
+
+    This class indexes a list of options for fuzzy matching, where the typed
+    characters must appear in order in the option, not necessarily contiguous.
+    Matches are ranked like prompt_toolkit `FuzzyCompleter`, by the position of the
+    match and then by its length, with ties in alphabetical order.
+
+    Options starting with the typed text are found by bisection over the sorted
+    options, and always come first. Other matches are prefiltered by per character
+    masks, so only options containing every typed character are compared. Masks are
+    built on first use of each character.
+    """
+
+    def __init__(self, options: Sequence[str], max_candidates: int = 5000) -> None:
+        """Construct a FuzzyIndex object.
+
+        Args:
+            options (Sequence[str]): Options to be indexed.
+            max_candidates (int, optional): Maximum number of prefiltered options
+                compared on a query, besides prefixed ones. The ranking of other
+                matches is approximate beyond it. Defaults to 5000.
+
+        """
+        self._options: list[str] = list(options)
+        self._keys: list[str] = [x.lower() for x in self._options]
+        order = sorted(range(len(self._keys)), key=self._keys.__getitem__)
+        self._order: list[int] = order
+        self._sorted: list[str] = [self._keys[i] for i in order]
+        self._rank: list[int] = [0] * len(order)
+        for r, i in enumerate(order):
+            self._rank[i] = r
+        self._masks: dict[str, int] = {}
+        self._max_candidates = max_candidates
+
+    @property
+    def options(self) -> list[str]:
+        """Return the indexed options.
+
+        Returns:
+            list[str]: List of options.
+
+        """
+        return self._options
+
+    def match(self, text: str, limit: int | None = 100) -> list[str]:
+        """Return the best options matching a text.
+
+        Args:
+            text (str): Typed text.
+            limit (int | None, optional): Maximum number of options. Defaults to 100.
+
+        Returns:
+            list[str]: Matching options, best first.
+
+        """
+        if not text:
+            return self._options[:limit]
+        key = text.lower()
+
+        # Prefixed options have the best possible rank, and are contiguous
+        start = bisect_left(self._sorted, key)
+        end = bisect_left(self._sorted, key + "\U0010ffff", start)
+        if limit is not None:
+            end = min(end, start + limit)
+        found = [self._options[i] for i in self._order[start:end]]
+        if limit is not None:
+            limit -= len(found)
+            if limit <= 0:
+                return found
+
+        regex = re.compile(f"(?=({'.*?'.join(map(re.escape, key))}))")
+        keys = self._keys
+        rank = self._rank
+        ranked = []
+        for i in self._candidates(key, start, end):
+            m = regex.search(keys[i])
+            if m is not None:
+                ranked.append((m.start(), len(m.group(1)), rank[i]))
+        if limit is None:
+            ranked.sort()
+        else:
+            ranked = heapq.nsmallest(limit, ranked)
+        found.extend(self._options[self._order[x[2]]] for x in ranked)
+        return found
+
+    def _candidates(self, key: str, start: int, end: int) -> list[int]:
+        """Return the indexes of options containing every character of a key.
+
+        Options ranked from `start` to `end` are excluded, like prefixed options,
+        so they do not count in the maximum number of candidates.
+        """
+        mask = -1
+        for c in set(key):
+            mask &= self._mask(c)
+            if not mask:
+                return []
+        data = mask.to_bytes(len(self._keys), "little")
+        rank = self._rank
+        found = (
+            m.start()
+            for m in _NONZERO.finditer(data)
+            if not start <= rank[m.start()] < end
+        )
+        return list(islice(found, self._max_candidates))
+
+    def _mask(self, c: str) -> int:
+        """Return the mask of options containing a character.
+
+        Each option is represented by one byte of the mask, set to 1 if the option
+        contains the character.
+        """
+        mask = self._masks.get(c, None)
+        if mask is None:
+            flags = bytes(map(operator.contains, self._keys, repeat(c)))
+            mask = self._masks[c] = int.from_bytes(flags, "little")
+        return mask
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Headless Prompter."""
+
+from __future__ import annotations
+
+import asyncio
+import codecs
+import contextlib
+import io
+import os
+import stat
+import sys
+from collections.abc import AsyncIterator
+from typing import TextIO
+
+from .base import BasePrompter
+
+
+class HeadlessPrompter(BasePrompter):
+    """Headless Prompter class.
+
+    This class interprets commands streamed from a file or pipe, without any
+    interactive terminal. It does not depend on `prompt_toolkit`, so it is suited for
+    batch jobs and scripts.
+    """
+
+    def __init__(
+        self,
+        input: TextIO | None = None,
+        output: TextIO | None = None,
+        stop_on_error: bool = False,
+        record_history: bool | None = None,
+        **kwargs,
+    ) -> None:
+        """Construct the interpreter object.
+
+        Args:
+            input (TextIO | None, optional): Command stream. Defaults to stdin.
+            output (TextIO | None, optional): Output stream. Defaults to stdout.
+            stop_on_error (bool, optional): Stop on the first failed command.
+                Defaults to False.
+            record_history (bool | None, optional): Record the commands in the
+                history. Defaults to None, recording only with a `history_file`,
+                as indexing every command slows down large batches.
+            kwargs: Arguments forwarded to `BasePrompter`. Output is buffered by
+                default, and never drops lines, so the transcript is complete:
+                the next command waits until the buffer has room.
+
+        """
+        kwargs.setdefault("output_buffer", 10000)
+        super().__init__(**kwargs)
+        self._input = input if input is not None else sys.stdin
+        self._output = output if output is not None else sys.stdout
+        self._stop_on_error = stop_on_error
+        if record_history is None:
+            record_history = kwargs.get("history_file") is not None
+        self._record_history = record_history
+        self._failures: int = 0
+
+    @property
+    def failures(self) -> int:
+        """Return the number of failed commands.
+
+        Returns:
+            int: Number of failed commands.
+
+        """
+        return self._failures
+
+    # Size of the chunks read from pipes, in bytes
+    _CHUNK = 65536
+
+    async def _lines(self) -> AsyncIterator[str]:
+        """Iterate over the command stream lines.
+
+        Regular files are read directly. Pipes are read in chunks by the event
+        loop, and terminals line by line in a worker thread, so background jobs
+        keep running while waiting for input.
+        """
+        stream = self._input
+        if stream.seekable():
+            for line in stream:
+                yield line
+            return
+        fd = self._pipe_fileno(stream)
+        if fd is not None:
+            async for line in self._pipe_lines(stream, fd):
+                yield line
+            return
+        loop = asyncio.get_running_loop()
+        while True:
+            line = await loop.run_in_executor(None, stream.readline)
+            if not line:
+                return
+            yield line
+
+    @staticmethod
+    def _pipe_fileno(stream: TextIO) -> int | None:
+        """Return the file descriptor of a pipe or socket stream, None otherwise.
+
+        Terminals are excluded, as they share their file status with the output,
+        which must not become non-blocking.
+        """
+        try:
+            fd = stream.fileno()
+            mode = os.fstat(fd).st_mode
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            return None
+        if stat.S_ISFIFO(mode) or stat.S_ISSOCK(mode):
+            return fd
+        return None
+
+    async def _pipe_lines(self, stream: TextIO, fd: int) -> AsyncIterator[str]:
+        """Iterate over the lines of a pipe, read in chunks by the event loop."""
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        # The transport closes its file, so the stream file descriptor is kept
+        pipe = os.fdopen(os.dup(fd), "rb", buffering=0)
+        try:
+            transport, _ = await loop.connect_read_pipe(
+                lambda: asyncio.StreamReaderProtocol(reader), pipe
+            )
+        except (NotImplementedError, OSError, ValueError):
+            # Unsupported by the event loop, as on Windows
+            pipe.close()
+            while True:
+                line = await loop.run_in_executor(None, stream.readline)
+                if not line:
+                    return
+                yield line
+        decoder = codecs.getincrementaldecoder(stream.encoding or "utf-8")(
+            stream.errors or "strict"
+        )
+        pending = ""
+        try:
+            while True:
+                chunk = await reader.read(self._CHUNK)
+                pending += decoder.decode(chunk, final=not chunk)
+                *lines, pending = pending.split("\n")
+                for line in lines:
+                    yield line.removesuffix("\r")
+                if not chunk:
+                    break
+            if pending:
+                yield pending
+        finally:
+            transport.close()
+            os.set_blocking(fd, True)
+
+    async def run(self) -> None:
+        """Run Prompter main loop.
+
+        The loop ends when the command stream is exhausted or `quit` is called.
+        Background jobs are waited for before returning.
+        """
+        await super().run()
+        self._is_running = True
+        async with contextlib.aclosing(self._lines()) as lines:
+            async for line in lines:
+                cmdline = line.rstrip("\n")
+                if self._record_history:
+                    self._history.append(cmdline)
+                if not await self.interpret(cmdline):
+                    self._failures += 1
+                    if self._stop_on_error:
+                        break
+                await self.wait_output()
+                if not self.is_running:
+                    break
+        self._is_running = False
+        self.save_signatures()
+        await self._jobs.drain()
+        self._history.close()
+        self._shutdown_pools()
+        await self.close_output()
+        self._output.flush()
+
+    def write(self, *args) -> None:
+        """Write output to the output stream."""
+        print(*args, file=self._output)
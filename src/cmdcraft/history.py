@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Command history store."""
+
+from __future__ import annotations
+
+import os
+from collections.abc import Iterator
+
+
+class CommandHistory:
+    """Command history store.
+
+    This class keeps the most recent commands in a bounded ring buffer, indexed by
+    trigrams for fast substring and prefix search. Optionally, every command is
+    appended to a log file, and the tail of that file is loaded on startup, without
+    reading the whole file.
+    """
+
+    _BLOCK = 65536
+
+    def __init__(self, maxlen: int = 1000, path: str | None = None) -> None:
+        """Construct a CommandHistory object.
+
+        Args:
+            maxlen (int, optional): Maximum number of commands kept in memory.
+                Defaults to 1000.
+            path (str | None, optional): Log file path. Defaults to None (no
+                persistence).
+
+        """
+        self._maxlen = max(1, maxlen)
+        self._ring: list[str | None] = [None] * self._maxlen
+        self._next: int = 0
+        self._index: dict[str, set[int]] = {}
+        self._path = path
+        self._file = None
+        if path is not None:
+            for line in self._read_tail(path):
+                self._push(line)
+            self._file = open(path, "a", encoding="utf-8")
+
+    def __len__(self) -> int:
+        """Return the number of commands in memory."""
+        return min(self._next, self._maxlen)
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the commands in memory, oldest first."""
+        for seq in range(self._next - len(self), self._next):
+            yield self._ring[seq % self._maxlen]
+
+    def __reversed__(self) -> Iterator[str]:
+        """Iterate over the commands in memory, newest first."""
+        for seq in range(self._next - 1, self._next - len(self) - 1, -1):
+            yield self._ring[seq % self._maxlen]
+
+    @property
+    def maxlen(self) -> int:
+        """Return the maximum number of commands kept in memory."""
+        return self._maxlen
+
+    @property
+    def path(self) -> str | None:
+        """Return the log file path, if any."""
+        return self._path
+
+    def append(self, cmdline: str) -> None:
+        """Append a command to the history.
+
+        Args:
+            cmdline (str): Command line.
+
+        """
+        cmdline = cmdline.replace("\n", " ")
+        self._push(cmdline)
+        if self._file is not None:
+            self._file.write(cmdline + "\n")
+            self._file.flush()
+
+    def clear(self) -> None:
+        """Clear the commands in memory.
+
+        The log file, if any, is kept untouched.
+        """
+        self._ring = [None] * self._maxlen
+        self._next = 0
+        self._index.clear()
+
+    def close(self) -> None:
+        """Close the log file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def search(
+        self, text: str = "", prefix: bool = False, limit: int | None = None
+    ) -> list[str]:
+        """Search commands in memory, newest first.
+
+        Args:
+            text (str, optional): Text to be searched. Defaults to "", which matches
+                every command.
+            prefix (bool, optional): Match only commands starting with the text.
+                Defaults to False.
+            limit (int | None, optional): Maximum number of commands. Defaults to
+                None (unbounded).
+
+        Returns:
+            list[str]: Matching commands.
+
+        """
+        result = []
+        if limit is not None and limit <= 0:
+            return result
+        first = self._next - len(self)
+        if len(text) < 3:
+            seqs = range(self._next - 1, first - 1, -1)
+        else:
+            grams = [self._index.get(x, set()) for x in self._trigrams(text)]
+            grams.sort(key=len)
+            seqs = sorted(set.intersection(*grams), reverse=True)
+        for seq in seqs:
+            cmdline = self._ring[seq % self._maxlen]
+            if cmdline.startswith(text) if prefix else text in cmdline:
+                result.append(cmdline)
+                if limit is not None and len(result) >= limit:
+                    break
+        return result
+
+    def _push(self, cmdline: str) -> None:
+        """Store a command into the ring buffer, evicting the oldest one."""
+        slot = self._next % self._maxlen
+        if self._next >= self._maxlen:
+            self._unindex(self._next - self._maxlen, self._ring[slot])
+        self._ring[slot] = cmdline
+        for gram in self._trigrams(cmdline):
+            self._index.setdefault(gram, set()).add(self._next)
+        self._next += 1
+
+    def _unindex(self, seq: int, cmdline: str) -> None:
+        """Remove an evicted command from the trigram index."""
+        for gram in self._trigrams(cmdline):
+            seqs = self._index.get(gram, None)
+            if seqs is not None:
+                seqs.discard(seq)
+                if not seqs:
+                    del self._index[gram]
+
+    @staticmethod
+    def _trigrams(text: str) -> set[str]:
+        """Return the trigrams of a text."""
+        return {text[i : i + 3] for i in range(len(text) - 2)}
+
+    def _read_tail(self, path: str) -> list[str]:
+        """Read the last lines of the log file.
+
+        The file is read backwards by blocks, until enough lines are found.
+
+        Args:
+            path (str): Log file path.
+
+        Returns:
+            list[str]: Last lines of the file, oldest first.
+
+        """
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return []
+        with f:
+            pos = f.seek(0, os.SEEK_END)
+            data = b""
+            while pos > 0 and data.count(b"\n") <= self._maxlen:
+                step = min(self._BLOCK, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+        lines = data.decode("utf-8", errors="replace").splitlines()
+        if pos > 0:
+            # The first line may be partial
+            lines = lines[1:]
+        return lines[-self._maxlen :]
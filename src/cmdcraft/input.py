@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 """Input related classes."""
 
+from __future__ import annotations
+
 import enum
-import shlex
+import re
 
 
 class InputState(enum.Enum):
@@ -20,16 +22,181 @@ class InputState(enum.Enum):
     TYPING_STRING = enum.auto()
 
 
+class Lexer:
+    """Incremental input lexer.
+
+    This class splits an input into tokens following the same rules as
+    `shlex.split(input, comments=True, posix=True)`, but keeps its state between
+    calls, so appending text to an input only processes the new characters.
+    """
+
+    _WHITESPACE = " \t\r\n"
+    _QUOTES = "'\""
+    _ESCAPE = "\\"
+    _COMMENT = "#"
+    # Plain word characters: other whitespace is part of words, as in `shlex`
+    _WORD = re.compile(f"[^{re.escape(_WHITESPACE + _QUOTES + _ESCAPE + _COMMENT)}]+")
+
+    def __init__(self) -> None:
+        """Lexer class initializer."""
+        self.reset()
+
+    def reset(self) -> None:
+        """Reset the lexer state, discarding every processed character."""
+        self._tokens: list[str] = []
+        self._token: list[str] = []
+        self._plain: list[bool] = []
+        self._ends: list[int] = []
+        self._quoted: bool = False
+        self._state: str = " "
+        self._escaped_state: str = " "
+        self._length: int = 0
+
+    def feed(self, text: str) -> None:
+        """Process more input characters.
+
+        Args:
+            text (str): Characters appended to the input.
+
+        """
+        offset = self._length
+        self._length += len(text)
+        state = self._state
+        token = self._token
+        i = 0
+        n = len(text)
+        while i < n:
+            c = text[i]
+            if state == " ":
+                if c in self._WHITESPACE:
+                    pass
+                elif c == self._COMMENT:
+                    state = "#"
+                elif c == self._ESCAPE:
+                    self._escaped_state = "a"
+                    self._quoted = True
+                    state = c
+                elif c in self._QUOTES:
+                    self._quoted = True
+                    state = c
+                else:
+                    m = self._WORD.match(text, i)
+                    token.append(m.group())
+                    i = m.end()
+                    state = "a"
+                    continue
+            elif state == "a":
+                if c in self._WHITESPACE or c == self._COMMENT:
+                    self._emit(offset + i)
+                    state = " " if c != self._COMMENT else "#"
+                elif c in self._QUOTES:
+                    self._quoted = True
+                    state = c
+                elif c == self._ESCAPE:
+                    self._escaped_state = "a"
+                    self._quoted = True
+                    state = c
+                else:
+                    m = self._WORD.match(text, i)
+                    token.append(m.group())
+                    i = m.end()
+                    continue
+            elif state == "#":
+                if c == "\n":
+                    state = " "
+            elif state in self._QUOTES:
+                if c == state:
+                    state = "a"
+                elif c == self._ESCAPE and state == '"':
+                    self._escaped_state = state
+                    state = c
+                else:
+                    j = text.find(state, i)
+                    if state == '"':
+                        k = text.find(self._ESCAPE, i)
+                        j = k if k != -1 and (j == -1 or k < j) else j
+                    j = n if j == -1 else j
+                    token.append(text[i:j])
+                    i = j
+                    continue
+            else:
+                escaped = self._escaped_state
+                if escaped in self._QUOTES and c != state and c != escaped:
+                    token.append(state)
+                token.append(c)
+                state = escaped
+            i += 1
+        self._state = state
+
+    def _emit(self, end: int) -> None:
+        """Complete the token being processed, ending at given offset."""
+        self._tokens.append("".join(self._token))
+        self._plain.append(not self._quoted)
+        self._ends.append(end)
+        self._token.clear()
+        self._quoted = False
+
+    @property
+    def length(self) -> int:
+        """Returns the number of processed characters."""
+        return self._length
+
+    @property
+    def tokens(self) -> list[str]:
+        """Returns the processed tokens, including the one being typed."""
+        if self.pending:
+            return [*self._tokens, "".join(self._token)]
+        return self._tokens[:]
+
+    @property
+    def plain(self) -> list[bool]:
+        """Returns, for each token, if it has no quoted or escaped characters.
+
+        Plain tokens may be interpreted as operators, like a trailing `&`.
+        """
+        if self.pending:
+            return [*self._plain, not self._quoted]
+        return self._plain[:]
+
+    @property
+    def ends(self) -> list[int]:
+        """Returns the end offset of each completed token in the input."""
+        return self._ends[:]
+
+    @property
+    def pending(self) -> bool:
+        """Returns if a token is still being typed."""
+        return self._state not in (" ", "#")
+
+    @property
+    def quote(self) -> str | None:
+        """Returns the open quote character, if any."""
+        if self._state in self._QUOTES:
+            return self._state
+        if self._state == self._ESCAPE and self._escaped_state in self._QUOTES:
+            return self._escaped_state
+        return None
+
+    @property
+    def escaped(self) -> bool:
+        """Returns if the last processed character is an open escape."""
+        return self._state == self._ESCAPE
+
+
 class Input:
     """Prompt Input class.
 
     This class manages inputs data, handling token extraction and state analysis.
     """
 
-    def __init__(self, input: str) -> None:
+    def __init__(self, input: str = "") -> None:
         """Input class initializer."""
         self._input = input
+        self._lexer = Lexer()
+        self._lexed = ""
         self._tokens = []
+        self._pipes = []
+        self._background = False
         self._state = InputState.EMPTY
 
     @staticmethod
@@ -46,15 +213,47 @@ class Input:
         Returns:
             list[str]: List of input tokens.
 
+        Raises:
+            ValueError: If the input has an open quote or escape.
+
+        """
+        lexer = Lexer()
+        lexer.feed(input.rstrip())
+        if lexer.escaped:
+            raise ValueError("No escaped character")
+        if lexer.quote is not None:
+            raise ValueError("No closing quotation")
+        return lexer.tokens
+
+    def update(self, input: str) -> None:
+        """Update the input text.
+
+        The input is lexed incrementally: if the new text extends the previous one,
+        only the appended characters are processed on the next `process` call.
+
+        Args:
+            input (str): Raw prompted input.
+
         """
-        tks = shlex.split(input.rstrip(), comments=True, posix=True)
-        return tks
+        self._input = input
 
     def process(self) -> None:
         """Process an input."""
-        try:
-            self._tokens = self.tokenize(self._input)
-        except ValueError:
+        lexer = self._lexer
+        if self._input.startswith(self._lexed):
+            lexer.feed(self._input[lexer.length :])
+        else:
+            lexer.reset()
+            lexer.feed(self._input)
+        self._lexed = self._input
+        self._tokens = lexer.tokens
+        plain = lexer.plain
+        self._pipes = [i for i, x in enumerate(self._tokens) if x == "|" and plain[i]]
+        self._background = bool(self._tokens) and self._tokens[-1] == "&"
+        if self._background:
+            self._background = plain[-1]
+
+        if lexer.quote is not None or lexer.escaped:
             self._state = InputState.TYPING_STRING
             return
 
@@ -63,7 +262,7 @@ class Input:
             return
 
         last_token = self._tokens[-1]
-        if self._input.endswith(" "):
+        if not lexer.pending and self._input.endswith(" "):
             self._state = InputState.TYPING_COMPLETE
         elif "=" in last_token:
             self._state = InputState.TYPING_VALUE
@@ -87,6 +286,32 @@ class Input:
         """
         return self._tokens[:]
 
+    @property
+    def stages(self) -> list[list[str]]:
+        """Returns the tokens of each pipeline stage.
+
+        Stages are split by unquoted `|` tokens. The background operator is not
+        included.
+        """
+        tokens = self._tokens[:-1] if self._background else self._tokens
+        bounds = [-1, *(x for x in self._pipes if x < len(tokens)), len(tokens)]
+        return [tokens[a + 1 : b] for a, b in zip(bounds, bounds[1:])]
+
+    @property
+    def stage_offset(self) -> int:
+        """Returns the offset of the last pipeline stage in the input.
+
+        Only completed `|` tokens start a stage, so a `|` being typed does not.
+        """
+        ends = self._lexer.ends
+        pipes = [x for x in self._pipes if x < len(ends)]
+        return ends[pipes[-1]] if pipes else 0
+
+    @property
+    def background(self) -> bool:
+        """Returns if the Input ends with the background operator `&`."""
+        return self._background
+
     @property
     def state(self) -> InputState:
         """Retuns the actual state of the Input."""
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""Background job execution."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Awaitable, Iterator
+
+
+class Job:
+    """Background job.
+
+    This class wraps the task of a command running in background.
+    """
+
+    def __init__(self, id: int, cmdline: str, task: asyncio.Task) -> None:
+        """Construct a Job object.
+
+        Args:
+            id (int): Job identifier.
+            cmdline (str): Command line which originated the job.
+            task (asyncio.Task): Job task.
+
+        """
+        self._id = id
+        self._cmdline = cmdline
+        self._task = task
+        self._started: float = time.monotonic()
+        self._finished: float | None = None
+        self._is_active: bool = False
+
+    @property
+    def id(self) -> int:
+        """Return the job identifier."""
+        return self._id
+
+    @property
+    def cmdline(self) -> str:
+        """Return the command line which originated the job."""
+        return self._cmdline
+
+    @property
+    def task(self) -> asyncio.Task:
+        """Return the job task."""
+        return self._task
+
+    @property
+    def elapsed(self) -> float:
+        """Return the job elapsed time in seconds."""
+        end = self._finished if self._finished is not None else time.monotonic()
+        return end - self._started
+
+    @property
+    def status(self) -> str:
+        """Return the job status.
+
+        A job fails when its coroutine raises, or returns False, as commands
+        reporting their own errors do.
+
+        Returns:
+            str: One of `pending`, `running`, `done`, `failed` or `cancelled`.
+
+        """
+        if not self._task.done():
+            return "running" if self._is_active else "pending"
+        if self._task.cancelled():
+            return "cancelled"
+        if self._task.exception() is not None or self._task.result() is False:
+            return "failed"
+        return "done"
+
+
+class JobTable:
+    """Background job table.
+
+    Jobs are run as tasks under a bounded concurrency: at most `limit` jobs are
+    active at once, the remaining ones wait for a free slot.
+    """
+
+    def __init__(self, limit: int = 8) -> None:
+        """Construct a JobTable object.
+
+        Args:
+            limit (int, optional): Maximum number of concurrent jobs. Defaults to 8.
+
+        """
+        self._jobs: dict[int, Job] = {}
+        self._next_id: int = 1
+        self._semaphore = asyncio.Semaphore(limit)
+
+    def __iter__(self) -> Iterator[Job]:
+        """Iterate over the jobs in the table."""
+        return iter(list(self._jobs.values()))
+
+    def __len__(self) -> int:
+        """Return the number of jobs in the table."""
+        return len(self._jobs)
+
+    def spawn(self, cmdline: str, coro: Awaitable) -> Job:
+        """Schedule a job.
+
+        Args:
+            cmdline (str): Command line which originated the job.
+            coro (Awaitable): Job coroutine.
+
+        Returns:
+            Job: The scheduled job.
+
+        """
+        id = self._next_id
+        self._next_id += 1
+        task = asyncio.ensure_future(self._run(id, coro))
+        job = Job(id, cmdline, task)
+        self._jobs[id] = job
+        return job
+
+    async def _run(self, id: int, coro: Awaitable) -> any:
+        """Run a job coroutine once a concurrency slot is available."""
+        try:
+            async with self._semaphore:
+                self._jobs[id]._is_active = True
+                return await coro
+        finally:
+            if asyncio.iscoroutine(coro):
+                # Avoid never awaited warnings for jobs cancelled while pending
+                coro.close()
+            if id in self._jobs:
+                self._jobs[id]._finished = time.monotonic()
+
+    def get(self, id: int | None = None) -> Job | None:
+        """Return a job.
+
+        Args:
+            id (int | None, optional): Job identifier. Defaults to None, which
+                returns the most recent job.
+
+        Returns:
+            Job | None: The job, or None if it is not in the table.
+
+        """
+        if id is None:
+            return self._jobs[max(self._jobs)] if self._jobs else None
+        return self._jobs.get(id, None)
+
+    def remove(self, id: int) -> Job | None:
+        """Remove a job from the table, without cancelling it.
+
+        Args:
+            id (int): Job identifier.
+
+        Returns:
+            Job | None: The removed job, or None if it is not in the table.
+
+        """
+        return self._jobs.pop(id, None)
+
+    def purge(self) -> None:
+        """Remove finished jobs from the table."""
+        for id in [k for k, v in self._jobs.items() if v.task.done()]:
+            del self._jobs[id]
+
+    async def drain(self, timeout: float | None = None) -> int:
+        """Wait for the scheduled jobs to finish.
+
+        Jobs still running after the timeout are cancelled.
+
+        Args:
+            timeout (float | None, optional): Time in seconds to wait for the jobs.
+                Defaults to None (wait forever).
+
+        Returns:
+            int: Number of cancelled jobs.
+
+        """
+        current = asyncio.current_task()
+        tasks = [
+            x.task
+            for x in self._jobs.values()
+            if not x.task.done() and x.task is not current
+        ]
+        if not tasks:
+            return 0
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+        return len(pending)
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""Latency metrics."""
+
+from __future__ import annotations
+
+import threading
+
+
+class Histogram:
+    """Latency histogram.
+
+    This class counts values into log-linear buckets, like HDR histograms: each power
+    of two is split into 2**SUB_BITS buckets, so percentiles have a bounded relative
+    error (about 3%) with constant time recording and small memory.
+    """
+
+    SUB_BITS = 5
+
+    __slots__ = ("_buckets", "count", "max", "min", "total")
+
+    def __init__(self) -> None:
+        """Construct an empty Histogram."""
+        self._buckets: dict[int, int] = {}
+        self.count: int = 0
+        self.total: int = 0
+        self.min: int = 0
+        self.max: int = 0
+
+    def record(self, value: int) -> None:
+        """Record a value.
+
+        Args:
+            value (int): Non-negative value, usually in nanoseconds.
+
+        """
+        shift = value.bit_length() - self.SUB_BITS
+        idx = value if shift <= 0 else (shift << self.SUB_BITS) + (value >> shift)
+        self._buckets[idx] = self._buckets.get(idx, 0) + 1
+        if self.count == 0 or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += 1
+        self.total += value
+
+    def percentile(self, q: float) -> int:
+        """Return an estimation of a percentile.
+
+        Args:
+            q (float): Percentile, between 0 and 100.
+
+        Returns:
+            int: Estimated value, or 0 if the histogram is empty.
+
+        """
+        if self.count == 0:
+            return 0
+        rank = max(1, round(self.count * q / 100))
+        seen = 0
+        for idx in sorted(self._buckets):
+            seen += self._buckets[idx]
+            if seen >= rank:
+                return min(max(self._value(idx), self.min), self.max)
+        return self.max
+
+    def _value(self, idx: int) -> int:
+        """Return the middle value of a bucket."""
+        shift = idx >> self.SUB_BITS
+        if shift == 0:
+            return idx
+        low = (idx & ((1 << self.SUB_BITS) - 1)) << shift
+        return low + (1 << shift) // 2
+
+
+class CommandStats:
+    """Command statistics.
+
+    This class holds the call count, error count and latency histogram of a command.
+    """
+
+    __slots__ = ("calls", "errors", "latency")
+
+    def __init__(self) -> None:
+        """Construct empty statistics."""
+        self.calls: int = 0
+        self.errors: int = 0
+        self.latency: Histogram = Histogram()
+
+    def snapshot(self) -> dict:
+        """Return the statistics as a dictionary.
+
+        Latencies are given in seconds.
+
+        Returns:
+            dict: Statistics.
+
+        """
+        h = self.latency
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "mean": h.total / h.count / 1e9 if h.count else 0.0,
+            "p50": h.percentile(50) / 1e9,
+            "p95": h.percentile(95) / 1e9,
+            "p99": h.percentile(99) / 1e9,
+            "max": h.max / 1e9,
+        }
+
+
+class Metrics:
+    """Interpreter metrics.
+
+    This class records statistics of command executions and completions, by name.
+    Recording is thread-safe, as completions run in a worker thread.
+    """
+
+    def __init__(self) -> None:
+        """Construct empty metrics."""
+        self._commands: dict[str, CommandStats] = {}
+        self._completions: dict[str, CommandStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, elapsed: int, error: bool = False) -> None:
+        """Record a command execution.
+
+        Args:
+            name (str): Command name.
+            elapsed (int): Execution time in nanoseconds.
+            error (bool, optional): If the execution failed. Defaults to False.
+
+        """
+        self._record(self._commands, name, elapsed, error)
+
+    def record_completion(self, name: str, elapsed: int) -> None:
+        """Record a command completion.
+
+        Args:
+            name (str): Command name.
+            elapsed (int): Completion time in nanoseconds.
+
+        """
+        self._record(self._completions, name, elapsed, False)
+
+    def _record(
+        self, table: dict[str, CommandStats], name: str, elapsed: int, error: bool
+    ) -> None:
+        """Record a value into a statistics table."""
+        with self._lock:
+            stats = table.get(name, None)
+            if stats is None:
+                stats = table[name] = CommandStats()
+            stats.calls += 1
+            if error:
+                stats.errors += 1
+            stats.latency.record(elapsed)
+
+    def command(self, name: str) -> CommandStats | None:
+        """Return the execution statistics of a command.
+
+        Args:
+            name (str): Command name.
+
+        Returns:
+            CommandStats | None: Statistics, or None if never executed.
+
+        """
+        return self._commands.get(name, None)
+
+    def completion(self, name: str) -> CommandStats | None:
+        """Return the completion statistics of a command.
+
+        Args:
+            name (str): Command name.
+
+        Returns:
+            CommandStats | None: Statistics, or None if never completed.
+
+        """
+        return self._completions.get(name, None)
+
+    def snapshot(self) -> dict[str, dict[str, dict]]:
+        """Return every statistic as a dictionary.
+
+        Returns:
+            dict[str, dict[str, dict]]: Statistics of `commands` and `completions`,
+            by command name.
+
+        """
+        with self._lock:
+            return {
+                "commands": {k: v.snapshot() for k, v in self._commands.items()},
+                "completions": {k: v.snapshot() for k, v in self._completions.items()},
+            }
+
+    def reset(self) -> None:
+        """Clear every statistic."""
+        with self._lock:
+            self._commands.clear()
+            self._completions.clear()
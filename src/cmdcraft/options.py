@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""Dynamic options cache."""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import inspect
+import logging
+import time
+from itertools import islice
+
+_logger = logging.getLogger(__name__)
+
+# Event loop of the caller, when options are read from a worker thread
+_caller_loop: contextvars.ContextVar[asyncio.AbstractEventLoop | None] = (
+    contextvars.ContextVar("cmdcraft_caller_loop", default=None)
+)
+
+
+class OptionsCache:
+    """Dynamic options cache.
+
+    This class wraps a dynamic options generator, keeping a snapshot of its last
+    result. Reading the options never blocks on coroutine generators: an expired
+    snapshot is returned as is while a refresh runs on the event loop
+    (stale-while-revalidate), and concurrent refreshes share one in-flight fetch.
+
+    Read from a worker thread with a known caller loop, like the completion worker,
+    synchronous generators are refreshed in background as well, in the caller loop
+    default executor, so a slow generator never blocks the reader nor the loop.
+    Such generators run off the loop thread, like synchronous commands, so state
+    they share with commands should be copied before being iterated.
+    """
+
+    def __init__(
+        self, generator: callable, ttl: float = 1.0, maxsize: int | None = None
+    ) -> None:
+        """Construct a new OptionsCache object.
+
+        Args:
+            generator (callable): Callable or coroutine function which should return
+                an iterable of options.
+            ttl (float, optional): Time in seconds a snapshot is considered fresh.
+                Defaults to 1.0; 0 refreshes the options on every read.
+            maxsize (int | None, optional): Maximum number of options to be kept.
+                Defaults to None (unbounded).
+
+        """
+        self._generator = generator
+        self._is_async: bool = inspect.iscoroutinefunction(generator)
+        self._ttl = ttl
+        self._maxsize = maxsize
+        self._snapshot: list[str] = []
+        self._timestamp: float | None = None
+        self._pending: asyncio.Future | None = None
+        self._error: Exception | None = None
+        self._generation: int = 0
+
+    @property
+    def snapshot(self) -> list[str]:
+        """Return the last fetched options, without refreshing them.
+
+        Returns:
+            list[str]: List of options.
+
+        """
+        return self._snapshot
+
+    @property
+    def generation(self) -> int:
+        """Return the number of snapshots stored, which identifies the last one.
+
+        Returns:
+            int: Snapshot generation.
+
+        """
+        return self._generation
+
+    @property
+    def error(self) -> Exception | None:
+        """Return the error of the last background refresh, if it failed.
+
+        Returns:
+            Exception | None: Raised exception, or None.
+
+        """
+        return self._error
+
+    @property
+    def expired(self) -> bool:
+        """Return if the snapshot should be refreshed.
+
+        Returns:
+            bool: True if the snapshot is older than the TTL, False otherwise.
+
+        """
+        if self._timestamp is None:
+            return True
+        return time.monotonic() - self._timestamp >= self._ttl
+
+    def get(self) -> list[str]:
+        """Return the options.
+
+        Synchronous generators are called inline when the snapshot is expired,
+        unless read from a worker thread with a known caller loop. Otherwise, the
+        generator is refreshed in background, and the last snapshot is returned
+        immediately.
+
+        Returns:
+            list[str]: List of options.
+
+        """
+        if self.expired:
+            if self._is_async or self._in_worker():
+                self.refresh()
+            else:
+                self._store(self._generator())
+        return self._snapshot
+
+    async def fetch(self) -> list[str]:
+        """Return fresh options, waiting for them if the snapshot is expired.
+
+        Returns:
+            list[str]: List of options.
+
+        """
+        if not self.expired:
+            return self._snapshot
+        if not self._is_async:
+            self._store(self._generator())
+            return self._snapshot
+        await asyncio.shield(self.refresh())
+        return self._snapshot
+
+    def refresh(self) -> asyncio.Future | None:
+        """Refresh the options in background.
+
+        If a refresh is already in flight, it is shared instead of starting another
+        one. From a worker thread, the refresh is scheduled on the caller event loop,
+        if known. Nothing is done if there is no event loop.
+
+        Returns:
+            asyncio.Future | None: The in-flight refresh, if any.
+
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            caller = _caller_loop.get()
+            if caller is not None and not caller.is_closed():
+                caller.call_soon_threadsafe(self.refresh)
+            return None
+        if self._pending is None:
+            self._pending = loop.create_task(self._refresh())
+        return self._pending
+
+    @staticmethod
+    def _in_worker() -> bool:
+        """Return if called from a worker thread with a known caller loop."""
+        caller = _caller_loop.get()
+        if caller is None or caller.is_closed():
+            return False
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return True
+        return False
+
+    def invalidate(self) -> None:
+        """Mark the snapshot as expired."""
+        self._timestamp = None
+
+    async def _refresh(self) -> None:
+        """Await the generator and store its result.
+
+        Synchronous generators run in the loop default executor.
+        """
+        try:
+            if self._is_async:
+                options = await self._generator()
+            else:
+                loop = asyncio.get_running_loop()
+                options = await loop.run_in_executor(None, self._collect)
+            self._store(options)
+            self._error = None
+        except Exception as e:
+            # Keep serving the stale snapshot until the next refresh
+            _logger.debug("Dynamic options refresh failed", exc_info=True)
+            self._error = e
+            self._timestamp = time.monotonic()
+        finally:
+            self._pending = None
+
+    def _collect(self) -> list[str]:
+        """Call the synchronous generator, iterating over its result."""
+        options = self._generator()
+        return list(islice(options if options is not None else (), self._maxsize))
+
+    def _store(self, options: any) -> None:
+        """Store a generator result as the new snapshot."""
+        if options is None:
+            options = ()
+        self._snapshot = list(islice(options, self._maxsize))
+        self._timestamp = time.monotonic()
+        self._generation += 1
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""Batched output writer."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import deque
+from collections.abc import Callable
+
+
+class OutputWriter:
+    """Batched output writer.
+
+    This class buffers output lines and hands them in batches to a write callback,
+    called from a dedicated thread, so a slow terminal or pipe does not stall the
+    event loop.
+
+    When more than `max_pending` lines are waiting, the policy decides what happens:
+
+    - `block`: no line is discarded. Producers on worker threads wait until the
+      buffer has room (backpressure). The event loop is never blocked: lines
+      written from it are queued beyond the limit, and coroutines may await
+      `wait_room` instead.
+    - `drop`: new lines are discarded.
+    - `drop_oldest`: the oldest pending lines are discarded.
+
+    Discarded lines are reported by a notice line on the next batch. If writing
+    fails, the writer is closed and further lines are discarded.
+    """
+
+    POLICIES = ("block", "drop", "drop_oldest")
+    # Maximum time to wait for the writer thread, in seconds
+    TIMEOUT = 10.0
+
+    def __init__(
+        self,
+        write: Callable[[list[str]], None],
+        max_pending: int = 10000,
+        policy: str = "block",
+    ) -> None:
+        """Construct an OutputWriter object.
+
+        Args:
+            write (Callable[[list[str]], None]): Callback writing a batch of lines.
+            max_pending (int, optional): Maximum number of lines waiting to be
+                written. Defaults to 10000.
+            policy (str, optional): Policy when the buffer is full, one of
+                `POLICIES`. Defaults to "block".
+
+        Raises:
+            ValueError: If the policy is unknown.
+
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown output policy: {policy}")
+        self._write = write
+        self._max_pending = max(1, max_pending)
+        self._policy = policy
+        self._lines: deque[str] = deque()
+        self._dropped: int = 0
+        self._total_dropped: int = 0
+        self._busy: bool = False
+        self._closed: bool = False
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def pending(self) -> int:
+        """Return the number of lines waiting to be written."""
+        return len(self._lines)
+
+    @property
+    def closed(self) -> bool:
+        """Return if the writer is closed, or broken by a write failure."""
+        return self._closed
+
+    @property
+    def dropped(self) -> int:
+        """Return the number of discarded lines."""
+        return self._total_dropped
+
+    def write(self, line: str) -> None:
+        """Queue a line to be written.
+
+        Args:
+            line (str): Output line.
+
+        """
+        with self._cond:
+            if self._closed:
+                return
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="cmdcraft-output", daemon=True
+                )
+                self._thread.start()
+            if len(self._lines) >= self._max_pending:
+                if self._policy == "block":
+                    if not self._on_loop():
+                        self._cond.wait_for(self._has_room)
+                        if self._closed:
+                            return
+                elif self._policy == "drop":
+                    self._drop(1)
+                    return
+                else:
+                    self._lines.popleft()
+                    self._drop(1)
+            self._lines.append(line)
+            self._cond.notify_all()
+
+    def flush(self, timeout: float | None = TIMEOUT) -> bool:
+        """Wait until every queued line is written.
+
+        Args:
+            timeout (float | None, optional): Maximum time to wait, in seconds.
+                Defaults to `TIMEOUT` (None waits without limit).
+
+        Returns:
+            bool: True if the buffer was flushed, False on timeout.
+
+        """
+        with self._cond:
+            return self._cond.wait_for(self._is_idle, timeout)
+
+    async def drain(self) -> None:
+        """Wait until every queued line is written, without blocking the loop."""
+        if self._is_idle():
+            return
+        await asyncio.get_running_loop().run_in_executor(None, self.flush)
+
+    async def wait_room(self) -> None:
+        """Wait until the buffer has room, without blocking the loop."""
+        if self._has_room():
+            return
+
+        def wait() -> None:
+            with self._cond:
+                self._cond.wait_for(self._has_room)
+
+        await asyncio.get_running_loop().run_in_executor(None, wait)
+
+    def close(self, timeout: float | None = TIMEOUT) -> None:
+        """Write the queued lines and stop the writer thread.
+
+        Lines written afterwards are discarded.
+
+        Args:
+            timeout (float | None, optional): Maximum time to wait for the queued
+                lines, in seconds. Defaults to `TIMEOUT` (None waits without limit).
+
+        """
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _is_idle(self) -> bool:
+        """Return if there is nothing queued nor being written."""
+        return not self._lines and not self._dropped and not self._busy
+
+    def _has_room(self) -> bool:
+        """Return if a line can be queued without exceeding the limit."""
+        return len(self._lines) < self._max_pending or self._closed
+
+    @staticmethod
+    def _on_loop() -> bool:
+        """Return if called from a thread running an event loop."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        return True
+
+    def _drop(self, count: int) -> None:
+        """Count discarded lines."""
+        self._dropped += count
+        self._total_dropped += count
+
+    def _run(self) -> None:
+        """Write queued lines in batches, until closed."""
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._lines or self._dropped or self._closed
+                )
+                if self._closed and not self._lines:
+                    self._dropped = 0
+                    return
+                batch = list(self._lines)
+                self._lines.clear()
+                if self._dropped:
+                    notice = f"[{self._dropped} output line(s) dropped]"
+                    batch.insert(len(batch) if self._policy == "drop" else 0, notice)
+                    self._dropped = 0
+                self._busy = True
+                self._cond.notify_all()
+            try:
+                self._write(batch)
+            except Exception:
+                # Broken output, or unencodable text: discard everything from now on
+                with self._cond:
+                    self._closed = True
+                    self._lines.clear()
+                    self._dropped = 0
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
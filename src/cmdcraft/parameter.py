@@ -3,8 +3,67 @@
 
 from __future__ import annotations
 
+import array
+import collections.abc
+import types
+import typing
 from enum import Enum
 
+from .fuzzy import FuzzyIndex
+from .options import OptionsCache
+
+_TRUE = frozenset(("1", "true", "yes", "on", "y"))
+_FALSE = frozenset(("0", "false", "no", "off", "n"))
+_STREAMS = (
+    collections.abc.AsyncIterable,
+    collections.abc.AsyncIterator,
+    collections.abc.AsyncGenerator,
+)
+_COLLECTIONS = (list, tuple, set, frozenset)
+# Compact storage of numeric collections
+_TYPECODES = {int: "q", float: "d"}
+
+
+def _cast_bool(value: str) -> bool:
+    """Cast a string into a boolean.
+
+    Args:
+        value (str): Value to be cast.
+
+    Returns:
+        bool: The cast value.
+
+    Raises:
+        ValueError: If the value is not a boolean literal.
+
+    """
+    v = value.lower()
+    if v in _TRUE:
+        return True
+    if v in _FALSE:
+        return False
+    raise ValueError(f"invalid boolean value: '{value}'")
+
+
+def _scalar_cast(ptype: any) -> callable:
+    """Return the function which casts a string into a scalar type."""
+    if isinstance(ptype, type) and issubclass(ptype, Enum):
+        return dict(ptype.__members__).__getitem__
+    if ptype is bool:
+        return _cast_bool
+    if ptype is None or ptype is str or not callable(ptype):
+        return str
+    return ptype
+
+
+def _unwrap_optional(ptype: any) -> any:
+    """Return the inner type of an optional annotation, like `int | None`."""
+    if typing.get_origin(ptype) in (typing.Union, types.UnionType):
+        args = [x for x in typing.get_args(ptype) if x is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return ptype
+
 
 class Parameter:
     """Parameter wrapper.
@@ -27,7 +86,50 @@ class Parameter:
         self._name = name
         self._type = ptype
         self._default = default
-        self._dyn_opts = None
+        self._dyn_opts: OptionsCache | None = None
+        self._options: list[str] = []
+        self._index: FuzzyIndex | None = None
+        self._indexed: tuple | None = None
+        self._container: type | None = None
+        self._item_cast: callable | None = None
+        self._fixed_casts: list[callable] | None = None
+        self._typecode: str | None = None
+        self._compact: bool = False
+        self._cast: callable = self._resolve()
+
+    def _resolve(self) -> callable:
+        """Resolve the cast function and static options of the parameter.
+
+        This is done once, so casting and completing values does not need to inspect
+        the parameter type again. Parameters without annotation are cast to the type
+        of their default value.
+
+        Returns:
+            callable: Function which casts a string into the parameter type.
+
+        """
+        ptype = _unwrap_optional(self._type)
+        if ptype is None and self._default is not None:
+            ptype = type(self._default)
+        origin = typing.get_origin(ptype) or ptype
+        if origin in _COLLECTIONS:
+            return self._resolve_collection(origin, typing.get_args(ptype))
+        if isinstance(ptype, type) and issubclass(ptype, Enum):
+            self._options = list(ptype._member_names_)
+        return _scalar_cast(ptype)
+
+    def _resolve_collection(self, origin: type, args: tuple) -> callable:
+        """Resolve the item casts of a collection parameter, like `list[int]`."""
+        self._container = origin
+        if origin is tuple and args and args[-1] is not Ellipsis:
+            # Fixed size tuple, like tuple[str, int]
+            self._fixed_casts = [_scalar_cast(x) for x in args]
+            return self._cast_items
+        item = _unwrap_optional(args[0]) if args else str
+        self._item_cast = _scalar_cast(item)
+        if origin in (list, tuple):
+            self._typecode = _TYPECODES.get(item, None)
+        return self._cast_items
 
     @property
     def name(self) -> str:
@@ -49,6 +151,19 @@ class Parameter:
         """
         return self._default
 
+    @property
+    def is_stream(self) -> bool:
+        """Return if the parameter is annotated as an async iterable.
+
+        Stream parameters receive the output of the previous command of a pipeline.
+
+        Returns:
+            bool: True if the parameter is a stream, False otherwise.
+
+        """
+        ptype = _unwrap_optional(self._type)
+        return (typing.get_origin(ptype) or ptype) in _STREAMS
+
     @property
     def options(self) -> list[str]:
         """Return parameter options.
@@ -58,10 +173,78 @@ class Parameter:
 
         """
         if self._dyn_opts is not None:
-            return self._dyn_opts()
-        elif issubclass(self._type, Enum):
-            return self._type._member_names_
-        return []
+            return self._dyn_opts.get()
+        return self._options
+
+    def match(self, text: str, limit: int | None = 100) -> list[str]:
+        """Return the options best matching a typed text.
+
+        The options are fuzzy matched through an index, which is only rebuilt when
+        a new options snapshot is fetched, without comparing the options.
+
+        Args:
+            text (str): Typed text.
+            limit (int | None, optional): Maximum number of options. Defaults to 100.
+
+        Returns:
+            list[str]: Matching options, best first.
+
+        """
+        options = self.options
+        # Snapshot source and generation
+        source, generation = options, 0
+        if self._dyn_opts is not None:
+            source, generation = self._dyn_opts, self._dyn_opts.generation
+        indexed = self._indexed
+        if indexed is None or indexed[0] is not source or indexed[1] != generation:
+            self._index = FuzzyIndex(options)
+            self._indexed = (source, generation)
+        return self._index.match(text, limit)
+
+    @property
+    def compact(self) -> bool:
+        """Return if numeric collections are stored as `array.array`."""
+        return self._compact
+
+    def set_compact(self, compact: bool = True) -> None:
+        """Store numeric collections as `array.array`, instead of list or tuple.
+
+        This keeps memory low for parameters taking many numbers, like `list[int]`
+        (as 64-bit integers) or `tuple[float, ...]` (as doubles). Other parameters
+        are not affected, nor are integer values beyond 64 bits, which are kept in
+        the plain container.
+
+        Args:
+            compact (bool, optional): Use compact storage. Defaults to True.
+
+        """
+        self._compact = compact
+
+    def _cast_items(self, value: str) -> any:
+        """Cast a comma separated value into the parameter collection type.
+
+        A value starting with `@` references a file, whose items are separated by
+        commas or whitespace; `@@` escapes a literal `@`.
+        """
+        if value.startswith("@") and not value.startswith("@@"):
+            with open(value[1:], encoding="utf-8") as f:
+                parts = f.read().replace(",", " ").split()
+        else:
+            if value.startswith("@@"):
+                value = value[1:]
+            parts = value.split(",") if value else []
+        if self._fixed_casts is not None:
+            if len(parts) != len(self._fixed_casts):
+                raise ValueError(
+                    f"expected {len(self._fixed_casts)} values, got {len(parts)}"
+                )
+            return tuple(f(x) for f, x in zip(self._fixed_casts, parts))
+        if self._compact and self._typecode is not None:
+            try:
+                return array.array(self._typecode, map(self._item_cast, parts))
+            except OverflowError:
+                pass  # Integers beyond 64 bits are stored in the plain container
+        return self._container(map(self._item_cast, parts))
 
     def cast(self, value: str) -> any:
         """Cast a value to this parameter type.
@@ -73,20 +256,37 @@ class Parameter:
             any: The cast value.
 
         """
-        if issubclass(self._type, Enum):
-            return self._type[value]
-        if self._type:
-            return self._type(value)
-        return value
+        return self._cast(value)
+
+    async def fetch_options(self) -> list[str]:
+        """Return parameter options, waiting for dynamic options to be refreshed.
+
+        Returns:
+            list[str]: List of options.
+
+        """
+        if self._dyn_opts is not None:
+            return await self._dyn_opts.fetch()
+        return self.options
 
-    def set_dynamic_options(self, generator: callable) -> None:
+    def set_dynamic_options(
+        self, generator: callable, ttl: float = 1.0, maxsize: int | None = None
+    ) -> None:
         """Set dynamic options for the parameter.
 
         This allows the completer to suggest options based on previous operations, like
         connected usernames.
 
+        The generator may be a coroutine function, in which case it is refreshed in
+        background and the completer is answered from its last result.
+
         Args:
-            generator (callable): Callable which should return a list of options.
+            generator (callable): Callable or coroutine function which should return a
+                list of options.
+            ttl (float, optional): Time in seconds the generator result is cached.
+                Defaults to 1.0 (0 disables caching).
+            maxsize (int | None, optional): Maximum number of options to be kept.
+                Defaults to None (unbounded).
 
         """
-        self._dyn_opts = generator
+        self._dyn_opts = OptionsCache(generator, ttl, maxsize)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Pipeline channels."""
+
+from __future__ import annotations
+
+import asyncio
+
+
+class Pipe:
+    """Pipeline channel.
+
+    This class connects two pipeline stages, as a bounded async iterable: the
+    producer waits while the pipe is full (backpressure), and the consumer iterates
+    the items until the pipe is closed.
+    """
+
+    _END = object()
+
+    def __init__(self, maxsize: int = 64) -> None:
+        """Construct a Pipe object.
+
+        Args:
+            maxsize (int, optional): Maximum number of buffered items. Defaults to
+                64.
+
+        """
+        self._queue: asyncio.Queue = asyncio.Queue(max(1, maxsize))
+        self._closed: bool = False
+
+    @property
+    def closed(self) -> bool:
+        """Return if the producer has finished."""
+        return self._closed
+
+    async def put(self, item: any) -> None:
+        """Send an item, waiting while the pipe is full.
+
+        Args:
+            item (any): Item.
+
+        """
+        await self._queue.put(item)
+
+    def close(self) -> None:
+        """Signal the end of the items."""
+        if not self._closed:
+            self._closed = True
+            if not self._queue.full():
+                # Wake up a waiting consumer
+                self._queue.put_nowait(self._END)
+
+    def __aiter__(self) -> Pipe:
+        """Return the async iterator of the items."""
+        return self
+
+    async def __anext__(self) -> any:
+        """Return the next item, waiting while the pipe is empty."""
+        if self._closed and self._queue.empty():
+            raise StopAsyncIteration
+        item = await self._queue.get()
+        if item is self._END:
+            raise StopAsyncIteration
+        return item
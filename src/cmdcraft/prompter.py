@@ -3,43 +3,137 @@
 
 from __future__ import annotations
 
+from collections.abc import AsyncGenerator, Iterable
+
 from prompt_toolkit import PromptSession
-from prompt_toolkit.completion import NestedCompleter
+from prompt_toolkit.history import History
+from prompt_toolkit.patch_stdout import patch_stdout
+
+from .base import BasePrompter
+from .completer import AsyncCompleter, RegistryCompleter
+from .history import CommandHistory
+
+
+class StoreHistory(History):
+    """prompt_toolkit History backed by a CommandHistory.
+
+    This allows navigating (up-arrow) and searching (Ctrl-R) the commands kept by the
+    interpreter history store.
+    """
+
+    def __init__(self, store: CommandHistory) -> None:
+        """Construct a StoreHistory object.
+
+        Args:
+            store (CommandHistory): Interpreter history store.
+
+        """
+        super().__init__()
+        self._store = store
+
+    def load_history_strings(self) -> Iterable[str]:
+        """Load the commands in memory, newest first."""
+        return reversed(self._store)
 
-from cmdcraft import BasePrompter
+    async def load(self) -> AsyncGenerator[str, None]:
+        """Yield the commands in memory, newest first.
 
-from .completer import CommandCompleter
+        The commands are reloaded from the store on every prompt, so the loaded
+        strings don't grow beyond the store capacity.
+        """
+        self._loaded_strings = list(self.load_history_strings())
+        self._loaded = True
+        for item in self._loaded_strings:
+            yield item
+
+    def append_string(self, string: str) -> None:
+        """Add a command to the loaded strings, within the store capacity."""
+        super().append_string(string)
+        del self._loaded_strings[self._store.maxlen :]
+
+    def store_string(self, string: str) -> None:
+        """Do nothing, as commands are stored by the interpreter."""
 
 
 class Prompter(BasePrompter):
     """Prompt Prompter class."""
 
-    def __init__(self) -> None:
-        """Construct the interpreter object."""
-        super().__init__()
-        self._session = PromptSession()
+    def __init__(
+        self,
+        completion_debounce: float = 0.05,
+        completion_budget: float = 0.2,
+        **kwargs,
+    ) -> None:
+        """Construct the interpreter object.
+
+        Output is buffered by default, and written above the prompt line.
+
+        Args:
+            completion_debounce (float, optional): Time to wait for further
+                keystrokes before completing, in seconds. Defaults to 0.05.
+            completion_budget (float, optional): Maximum time of a completion
+                request, in seconds; partial completions are shown after it.
+                Defaults to 0.2.
+            kwargs: Arguments forwarded to `BasePrompter`.
+
+        """
+        kwargs.setdefault("output_buffer", 10000)
+        super().__init__(**kwargs)
+        self._completion_debounce = completion_debounce
+        self._completion_budget = completion_budget
+        self._session = PromptSession(history=StoreHistory(self._history))
+        self._completer = RegistryCompleter(self._commands, metrics=self._metrics)
 
     async def init(self) -> None:
         """Init the interpreter object."""
         await super().init()
 
-    def completer(self) -> None:
-        """Process interpreter completer."""
-        cmds = {}
-        for name, cmd in self._commands.items():
-            cmds[name] = CommandCompleter(cmd)
-        return NestedCompleter(cmds)
+    def completer(self) -> RegistryCompleter:
+        """Return the interpreter completer.
+
+        The completer tree is built once and kept in sync with the command registry,
+        so its cost does not depend on the number of registered commands.
+        """
+        return self._completer
 
     async def run(self) -> None:
-        """Run Prompter main loop."""
+        """Run Prompter main loop.
+
+        Ctrl-C cancels the running command, or discards the typed line at the
+        prompt. Ctrl-D quits. Completions are computed in background while typing.
+        """
         await super().run()
         self._is_running = True
-        await self.interpret("help")
-        while self.is_running:
-            cmdline = await self._session.prompt_async("> ", completer=self.completer())
-            self._history.append(cmdline)
-            await self.interpret(cmdline)
-
-    def output(self, *args) -> None:
-        """Output command."""
+        completer = AsyncCompleter(
+            self.completer(), self._completion_debounce, self._completion_budget
+        )
+        try:
+            with patch_stdout(raw=True):
+                await self.interpret("help")
+                while self.is_running:
+                    await self.flush()
+                    try:
+                        cmdline = await self._session.prompt_async(
+                            "> ", completer=completer, complete_while_typing=True
+                        )
+                    except KeyboardInterrupt:
+                        # Ctrl-C discards the typed line
+                        continue
+                    except EOFError:
+                        # Ctrl-D quits
+                        await self.quit()
+                        break
+                    if cmdline.strip():
+                        self._history.append(cmdline)
+                    await self.interrupt(cmdline)
+                await self.flush()
+        finally:
+            completer.close()
+
+    def write(self, *args) -> None:
+        """Write output to the terminal.
+
+        While running, the terminal output is patched so background output is
+        printed above the prompt line.
+        """
         print(*args)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""Command registry."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator, Mapping
+
+from .command import Command
+
+
+class _TrieNode:
+    """Prefix trie node."""
+
+    __slots__ = ("alias", "children", "count")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode] = {}
+        self.alias: str | None = None
+        self.count: int = 0
+
+
+class CommandRegistry(Mapping):
+    """Versioned command registry.
+
+    This class maps command aliases into their Command objects. Every change bumps
+    the registry version and is notified to the registered listeners, so derived
+    structures (like completers) can be updated incrementally instead of rebuilt.
+
+    Aliases are also indexed in a prefix trie, so prefix completion and abbreviation
+    lookups cost O(prefix) instead of scanning every registered command.
+    """
+
+    def __init__(self) -> None:
+        """Construct an empty registry."""
+        self._commands: dict[str, Command] = {}
+        self._trie = _TrieNode()
+        self._version: int = 0
+        self._listeners: list[Callable[[str, Command | None], None]] = []
+
+    def __getitem__(self, alias: str) -> Command:
+        """Return the command registered under the given alias."""
+        return self._commands[alias]
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the registered aliases."""
+        return iter(self._commands)
+
+    def __len__(self) -> int:
+        """Return the number of registered commands."""
+        return len(self._commands)
+
+    @property
+    def version(self) -> int:
+        """Return the registry version.
+
+        Returns:
+            int: Counter incremented on every registry change.
+
+        """
+        return self._version
+
+    def add(self, command: Command) -> None:
+        """Add a command into the registry.
+
+        An existing command with the same alias is replaced.
+
+        Args:
+            command (Command): Command to be added.
+
+        """
+        if command.alias not in self._commands:
+            self._insert(command.alias)
+        self._commands[command.alias] = command
+        self._notify(command.alias, command)
+
+    def remove(self, alias: str) -> Command:
+        """Remove a command from the registry.
+
+        Args:
+            alias (str): Command alias.
+
+        Returns:
+            Command: The removed command.
+
+        Raises:
+            KeyError: If there is no command registered with given alias.
+
+        """
+        command = self._commands.pop(alias)
+        self._delete(alias)
+        self._notify(alias, None)
+        return command
+
+    def complete(self, prefix: str, limit: int | None = None) -> list[str]:
+        """Return the aliases starting with a prefix, in alphabetical order.
+
+        Args:
+            prefix (str): Alias prefix.
+            limit (int | None, optional): Maximum number of aliases. Defaults to
+                None (unbounded).
+
+        Returns:
+            list[str]: Matching aliases.
+
+        """
+        node = self._find(prefix)
+        if node is None:
+            return []
+        result = []
+        stack = [node]
+        while stack and (limit is None or len(result) < limit):
+            node = stack.pop()
+            if node.alias is not None:
+                result.append(node.alias)
+            stack.extend(node.children[k] for k in sorted(node.children, reverse=True))
+        return result
+
+    def resolve(self, name: str) -> Command | None:
+        """Return the command matching a name or an unambiguous abbreviation.
+
+        Args:
+            name (str): Command alias, or a prefix matching a single alias.
+
+        Returns:
+            Command | None: The matching command, or None if there is no match or
+            the abbreviation is ambiguous.
+
+        """
+        command = self._commands.get(name, None)
+        if command is not None:
+            return command
+        node = self._find(name)
+        if node is None or node.count != 1:
+            return None
+        while node.alias is None:
+            node = next(iter(node.children.values()))
+        return self._commands[node.alias]
+
+    def _find(self, prefix: str) -> _TrieNode | None:
+        """Return the trie node of a prefix."""
+        node = self._trie
+        for c in prefix:
+            node = node.children.get(c, None)
+            if node is None:
+                return None
+        return node
+
+    def _insert(self, alias: str) -> None:
+        """Index an alias into the trie."""
+        node = self._trie
+        node.count += 1
+        for c in alias:
+            node = node.children.setdefault(c, _TrieNode())
+            node.count += 1
+        node.alias = alias
+
+    def _delete(self, alias: str) -> None:
+        """Remove an alias from the trie."""
+        node = self._trie
+        node.count -= 1
+        for c in alias:
+            child = node.children[c]
+            child.count -= 1
+            if child.count == 0:
+                del node.children[c]
+                return
+            node = child
+        node.alias = None
+
+    def subscribe(self, listener: Callable[[str, Command | None], None]) -> None:
+        """Subscribe to registry changes.
+
+        The listener is called with the changed alias and its new command, or `None`
+        if the command was removed.
+
+        Args:
+            listener (Callable[[str, Command | None], None]): Change callback.
+
+        """
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[str, Command | None], None]) -> None:
+        """Unsubscribe from registry changes.
+
+        Args:
+            listener (Callable[[str, Command | None], None]): Change callback.
+
+        """
+        self._listeners.remove(listener)
+
+    def _notify(self, alias: str, command: Command | None) -> None:
+        """Bump the registry version and notify the listeners."""
+        self._version += 1
+        for listener in self._listeners:
+            listener(alias, command)
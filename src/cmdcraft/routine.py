@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""Compiled routines."""
+
+from __future__ import annotations
+
+import hashlib
+import marshal
+import os
+from collections.abc import Callable
+from typing import NamedTuple
+
+from .input import Input, InputState
+
+
+class RoutineLine(NamedTuple):
+    """Compiled routine line."""
+
+    lineno: int
+    text: str
+    tokens: list[str]
+    background: bool
+    error: str | None
+
+
+class Routine:
+    """Compiled routine.
+
+    This class holds a routine file as pre-tokenized lines, with the command names
+    already resolved. Compiled routines are cached next to their source file, keyed
+    by its modification time and content hash, so loading the same routine again
+    skips parsing. The cache holds the tokens before resolving command names, as
+    abbreviations depend on the commands registered when loading.
+
+    `VERSION` must be increased whenever the cached data or the lexer rules change.
+    """
+
+    VERSION = 2
+    _MAGIC = b"cmdcraft-routine\n"
+    _SKIP = ("save", "history", "help")
+
+    def __init__(self, lines: list[RoutineLine]) -> None:
+        """Construct a Routine object.
+
+        Args:
+            lines (list[RoutineLine]): Compiled lines.
+
+        """
+        self._lines = lines
+
+    @property
+    def lines(self) -> list[RoutineLine]:
+        """Return the compiled lines.
+
+        Returns:
+            list[RoutineLine]: Compiled lines.
+
+        """
+        return self._lines
+
+    @classmethod
+    def compile(
+        cls, source: str, resolve: Callable[[str], str | None] | None = None
+    ) -> Routine:
+        """Compile a routine source.
+
+        Empty lines, comments and `save`, `history` and `help` commands are skipped.
+
+        Args:
+            source (str): Routine source.
+            resolve (Callable[[str], str | None] | None, optional): Callable which
+                returns the alias of a command name, or None if it can't be
+                resolved. Defaults to None.
+
+        Returns:
+            Routine: The compiled routine.
+
+        """
+        lines = []
+        for lineno, text in enumerate(source.splitlines(), 1):
+            text = text.rstrip()
+            if text.startswith(cls._SKIP):
+                continue
+            input = Input(text)
+            input.process()
+            tokens = input.tokens
+            if input.state == InputState.TYPING_STRING:
+                lines.append(
+                    RoutineLine(lineno, text, [], False, "Unterminated quote or escape")
+                )
+                continue
+            if input.background:
+                tokens.pop()
+            if not tokens:
+                continue
+            lines.append(RoutineLine(lineno, text, tokens, input.background, None))
+        return cls(lines).resolved(resolve)
+
+    def resolved(self, resolve: Callable[[str], str | None] | None) -> Routine:
+        """Return the routine with its command names resolved.
+
+        Args:
+            resolve (Callable[[str], str | None] | None): Callable which returns the
+                alias of a command name, or None if it can't be resolved.
+
+        Returns:
+            Routine: The resolved routine.
+
+        """
+        if resolve is None:
+            return self
+        lines = []
+        for line in self._lines:
+            if line.tokens:
+                alias = resolve(line.tokens[0]) or line.tokens[0]
+                line = line._replace(tokens=[alias, *line.tokens[1:]])
+            lines.append(line)
+        return Routine(lines)
+
+    @staticmethod
+    def cache_path(path: str) -> str:
+        """Return the cache file path of a routine.
+
+        Args:
+            path (str): Routine file path.
+
+        Returns:
+            str: Cache file path.
+
+        """
+        head, tail = os.path.split(path)
+        return os.path.join(head, f".{tail}.cmdc")
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        resolve: Callable[[str], str | None] | None = None,
+        cache: bool = True,
+    ) -> Routine:
+        """Load a routine file, using its compiled cache when valid.
+
+        Stale or incompatible caches are rebuilt. Failing to write the cache is not
+        an error.
+
+        Args:
+            path (str): Routine file path.
+            resolve (Callable[[str], str | None] | None, optional): Callable which
+                returns the alias of a command name. Defaults to None.
+            cache (bool, optional): Use the compiled cache. Defaults to True.
+
+        Returns:
+            Routine: The compiled routine.
+
+        """
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            cached = cls._read_cache(path) if cache else None
+            if cached is not None and cached["stamp"] == [st.st_mtime_ns, st.st_size]:
+                return cls([RoutineLine(*x) for x in cached["lines"]]).resolved(resolve)
+            data = f.read()
+
+        digest = hashlib.sha256(data).hexdigest()
+        if cached is not None and cached["hash"] == digest:
+            routine = cls([RoutineLine(*x) for x in cached["lines"]])
+        else:
+            routine = cls.compile(data.decode("utf-8"))
+        if cache:
+            cls._write_cache(path, [st.st_mtime_ns, st.st_size], digest, routine)
+        return routine.resolved(resolve)
+
+    @classmethod
+    def _read_cache(cls, path: str) -> dict | None:
+        """Read a routine cache, returning None if it is missing or incompatible."""
+        try:
+            with open(cls.cache_path(path), "rb") as f:
+                if f.read(len(cls._MAGIC)) != cls._MAGIC:
+                    return None
+                cached = marshal.loads(f.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(cached, dict) or cached.get("version") != cls.VERSION:
+            return None
+        return cached
+
+    @classmethod
+    def _write_cache(
+        cls, path: str, stamp: list[int], digest: str, routine: Routine
+    ) -> None:
+        """Write a routine cache, atomically replacing the previous one."""
+        cached = {
+            "version": cls.VERSION,
+            "stamp": stamp,
+            "hash": digest,
+            "lines": [tuple(x) for x in routine.lines],
+        }
+        target = cls.cache_path(path)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(cls._MAGIC + marshal.dumps(cached))
+            os.replace(tmp, target)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
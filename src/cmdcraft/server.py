@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""Prompter socket server."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hmac
+import itertools
+import os
+import socket
+import stat
+
+from .base import BasePrompter, _output_sink, _session_close, _session_history
+from .history import CommandHistory
+
+# Line sent after each command, followed by "1" on success or "0" on failure
+END = "\x1e"
+
+
+class Session:
+    """Server session.
+
+    This class holds the state of a client connection: its own command history and
+    the stream where its commands output is written.
+    """
+
+    def __init__(
+        self, id: int, writer: asyncio.StreamWriter, history_size: int = 1000
+    ) -> None:
+        """Construct a Session object.
+
+        Args:
+            id (int): Session identifier.
+            writer (asyncio.StreamWriter): Client stream.
+            history_size (int, optional): Maximum number of commands kept in
+                history. Defaults to 1000.
+
+        """
+        self._id = id
+        self._writer = writer
+        self._loop = asyncio.get_running_loop()
+        self._history = CommandHistory(history_size)
+
+    @property
+    def id(self) -> int:
+        """Return the session identifier."""
+        return self._id
+
+    @property
+    def peer(self) -> any:
+        """Return the client address."""
+        return self._writer.get_extra_info("peername")
+
+    @property
+    def history(self) -> CommandHistory:
+        """Return the session command history."""
+        return self._history
+
+    def write(self, *args) -> None:
+        """Write output to the client.
+
+        This may be called from worker threads, running synchronous commands. Output
+        written after the client is gone, as from background jobs, is discarded.
+        """
+        data = f"{' '.join(str(x) for x in args)}\n".encode()
+        try:
+            running = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            running = False
+        if running:
+            self._send(data)
+        else:
+            self._loop.call_soon_threadsafe(self._send, data)
+
+    def _send(self, data: bytes) -> None:
+        """Send data to the client, unless it is gone."""
+        if not self._writer.is_closing():
+            self._writer.write(data)
+
+    def close(self) -> None:
+        """Close the client connection."""
+        self._writer.close()
+
+
+class PromptServer:
+    """Prompter socket server.
+
+    This class exposes a prompter over Unix domain or TCP sockets, using a line
+    based protocol. Each connection gets its own session, with its own history and
+    output, while sharing the prompter command registry and jobs. Connections are
+    served concurrently, so a long command only blocks its own client.
+
+    After each command, the server sends an `END` line with the command status, so
+    clients know when to prompt again. Typing `quit` closes the session only.
+
+    Unix domain sockets are only accessible by their owner. TCP sockets require
+    clients to send an authentication token as their first line.
+    """
+
+    def __init__(self, prompter: BasePrompter, history_size: int = 1000) -> None:
+        """Construct a PromptServer object.
+
+        Args:
+            prompter (BasePrompter): Prompter to be served.
+            history_size (int, optional): Maximum number of commands kept in each
+                session history. Defaults to 1000.
+
+        """
+        self._prompter = prompter
+        self._history_size = history_size
+        self._servers: list[asyncio.AbstractServer] = []
+        self._sessions: dict[int, Session] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._ids = itertools.count(1)
+        self._token: bytes | None = None
+
+    @property
+    def sessions(self) -> list[Session]:
+        """Return the open sessions."""
+        return list(self._sessions.values())
+
+    @property
+    def addresses(self) -> list[any]:
+        """Return the addresses the server is listening on."""
+        return [x.getsockname() for s in self._servers for x in s.sockets]
+
+    async def start_unix(self, path: str) -> None:
+        """Listen on a Unix domain socket.
+
+        The socket is only accessible by its owner.
+
+        Args:
+            path (str): Socket path.
+
+        """
+        # Remove a stale socket, as left by a previous server
+        with contextlib.suppress(FileNotFoundError):
+            if stat.S_ISSOCK(os.stat(path).st_mode):
+                os.remove(path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Bound with owner permissions, so it is never accessible by others. The
+        # umask is process wide, so it is restored before yielding to the loop.
+        umask = os.umask(0o177)
+        try:
+            sock.bind(path)
+        except BaseException:
+            sock.close()
+            raise
+        finally:
+            os.umask(umask)
+        server = await asyncio.start_unix_server(self._handle, sock=sock)
+        self._servers.append(server)
+
+    async def start_tcp(
+        self, host: str = "127.0.0.1", port: int = 0, *, token: str
+    ) -> None:
+        """Listen on a TCP socket.
+
+        Any user able to connect may run commands, so clients must authenticate by
+        sending the token as their first line.
+
+        Args:
+            host (str, optional): Interface address. Defaults to "127.0.0.1".
+            port (int, optional): Port number. Defaults to 0 (any free port).
+            token (str): Authentication token, shared with the clients.
+
+        Raises:
+            ValueError: If the token is empty.
+
+        """
+        if not token:
+            raise ValueError("An authentication token is required")
+        self._token = token.encode()
+        server = await asyncio.start_server(self._authenticate, host, port)
+        self._servers.append(server)
+
+    async def serve_forever(self) -> None:
+        """Serve clients until cancelled."""
+        await asyncio.gather(*(x.serve_forever() for x in self._servers))
+
+    async def close(self) -> None:
+        """Stop listening and close every session.
+
+        Commands still running for the sessions are cancelled.
+        """
+        for server in self._servers:
+            server.close()
+        for session in self.sessions:
+            session.close()
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for server in self._servers:
+            await server.wait_closed()
+        self._servers.clear()
+
+    def _track(self) -> None:
+        """Track the current connection task, so it is cancelled on close."""
+        task = asyncio.current_task()
+        if task not in self._tasks:
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _authenticate(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Serve a client connection, once authenticated by its first line."""
+        self._track()
+        try:
+            line = await self._readline(reader)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            line = None
+        except asyncio.CancelledError:
+            # Server closed: the connection task ends quietly
+            writer.close()
+            return
+        if line is None or not hmac.compare_digest(line.strip(), self._token):
+            if not writer.is_closing():
+                writer.write(b"Authentication failed\n")
+            writer.close()
+            return
+        await self._handle(reader, writer)
+
+    @staticmethod
+    async def _readline(reader: asyncio.StreamReader) -> bytes | None:
+        """Read a line, returning None and discarding it if longer than the limit.
+
+        Raises:
+            asyncio.IncompleteReadError: If the connection is closed mid-line.
+
+        """
+        try:
+            return await reader.readuntil(b"\n")
+        except asyncio.IncompleteReadError as e:
+            if not e.partial:
+                raise
+            return e.partial
+        except asyncio.LimitOverrunError as e:
+            consumed = e.consumed
+        # Skip the rest of the line, which may not be fully received yet
+        while True:
+            await reader.readexactly(consumed)
+            try:
+                await reader.readuntil(b"\n")
+                return None
+            except asyncio.LimitOverrunError as e:
+                consumed = e.consumed
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Serve a client connection."""
+        self._track()
+        session = Session(next(self._ids), writer, self._history_size)
+        self._sessions[session.id] = session
+        # Each connection runs on its own task, so its context is private. Jobs
+        # inherit it, so `quit` ends the session wherever it runs from.
+        _output_sink.set(session.write)
+        _session_history.set(session.history)
+        _session_close.set(session.close)
+        try:
+            writer.write(f"{END}1\n".encode())
+            while True:
+                await writer.drain()
+                line = await self._readline(reader)
+                if line is None:
+                    writer.write(f"Line too long\n{END}0\n".encode())
+                    continue
+                cmdline = line.decode("utf-8", errors="replace").strip()
+                if cmdline:
+                    session.history.append(cmdline)
+                ok = await self._prompter.interpret(cmdline)
+                if writer.is_closing():
+                    break
+                writer.write(f"{END}{int(ok)}\n".encode())
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # Server closed: the connection task ends quietly
+            pass
+        finally:
+            del self._sessions[session.id]
+            session.close()
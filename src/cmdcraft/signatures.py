@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""Persistent signature cache."""
+
+from __future__ import annotations
+
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import sys
+import types
+import typing
+from enum import Enum
+
+# Parameter specification: name, kind, annotation and default value
+ParameterSpec = typing.Tuple[str, int, typing.Any, typing.Any]
+
+
+def _version() -> str:
+    """Return the cmdcraft version."""
+    # Imported here, as the package imports this module before defining it
+    from . import __version__
+
+    return __version__
+
+
+class _Uncacheable(Exception):
+    """Raised when a signature can't be encoded into the cache."""
+
+
+class SignatureCache:
+    """Persistent signature cache.
+
+    This class stores the processed signatures of commands (parameter names, kinds,
+    annotations and defaults) into a JSON file, so processing them again on the next
+    launch skips `inspect.signature` and `get_type_hints`.
+
+    Entries are grouped by module, keyed by the hash of the module source file, and
+    the whole cache by the cmdcraft version; changed modules are introspected again.
+    Annotations are stored as references to importable objects, so signatures using
+    other annotations (or defaults other than literals, enum members and tuples or
+    lists of them) are not cached.
+    """
+
+    FORMAT = 1
+
+    def __init__(self, path: str) -> None:
+        """Construct a SignatureCache object, loading the cache file if valid.
+
+        Args:
+            path (str): Cache file path.
+
+        """
+        self._path = path
+        self._modules: dict[str, dict] = {}
+        self._hashes: dict[str, str | None] = {}
+        self._dirty: bool = False
+        self._load()
+
+    @property
+    def path(self) -> str:
+        """Return the cache file path."""
+        return self._path
+
+    @property
+    def dirty(self) -> bool:
+        """Return if the cache has unsaved changes."""
+        return self._dirty
+
+    def get(self, cb: callable) -> list[ParameterSpec] | None:
+        """Return the cached signature of a callable.
+
+        Args:
+            cb (callable): Callable.
+
+        Returns:
+            list[ParameterSpec] | None: Parameter specifications, or None if the
+            callable is not cached or its module has changed.
+
+        """
+        key = self._key(cb)
+        if key is None:
+            return None
+        module, name = key
+        entry = self._modules.get(module, None)
+        if entry is None or entry["hash"] != self._hash(module):
+            return None
+        specs = entry["commands"].get(name, None)
+        if specs is None:
+            return None
+        try:
+            return [(n, k, self._decode(t), self._decode(d)) for n, k, t, d in specs]
+        except Exception:
+            return None
+
+    def put(self, cb: callable, specs: list[ParameterSpec]) -> bool:
+        """Store the signature of a callable.
+
+        Args:
+            cb (callable): Callable.
+            specs (list[ParameterSpec]): Parameter specifications.
+
+        Returns:
+            bool: True if the signature was stored, False if it can't be cached.
+
+        """
+        key = self._key(cb)
+        if key is None:
+            return False
+        module, name = key
+        digest = self._hash(module)
+        if digest is None:
+            return False
+        try:
+            encoded = [
+                [n, int(k), self._encode(t), self._encode(d)] for n, k, t, d in specs
+            ]
+        except _Uncacheable:
+            return False
+        entry = self._modules.get(module, None)
+        if entry is None or entry["hash"] != digest:
+            entry = self._modules[module] = {"hash": digest, "commands": {}}
+        entry["commands"][name] = encoded
+        self._dirty = True
+        return True
+
+    def save(self) -> None:
+        """Save the cache file, if changed.
+
+        The file is replaced atomically. Failing to write it is not an error.
+        """
+        if not self._dirty:
+            return
+        data = {"format": self.FORMAT, "version": _version(), "modules": self._modules}
+        tmp = f"{self._path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp, self._path)
+            self._dirty = False
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def _load(self) -> None:
+        """Load the cache file, ignoring it if missing or incompatible."""
+        try:
+            with open(self._path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if (
+            isinstance(data, dict)
+            and data.get("format") == self.FORMAT
+            and data.get("version") == _version()
+            and isinstance(data.get("modules"), dict)
+        ):
+            self._modules = data["modules"]
+
+    @staticmethod
+    def _key(cb: callable) -> tuple[str, str] | None:
+        """Return the module and qualified name of a callable, if importable."""
+        f = getattr(cb, "__func__", cb)
+        module = getattr(f, "__module__", None)
+        name = getattr(f, "__qualname__", None)
+        if module is None or name is None or "<" in name:
+            return None
+        # Bound methods have no `self` parameter
+        return module, f"{name}()" if inspect.ismethod(cb) else name
+
+    def _hash(self, module: str) -> str | None:
+        """Return the hash of a module source file."""
+        if module not in self._hashes:
+            path = getattr(sys.modules.get(module, None), "__file__", None)
+            try:
+                with open(path, "rb") as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+            except (OSError, TypeError):
+                digest = None
+            self._hashes[module] = digest
+        return self._hashes[module]
+
+    @classmethod
+    def _encode(cls, value: any) -> any:
+        """Encode an annotation or default value into JSON data."""
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return {"v": value}
+        if value is Ellipsis:
+            return {"x": None}
+        if type(value) in (tuple, list):
+            return {"s": [cls._encode(x) for x in value], "k": type(value).__name__}
+        if isinstance(value, Enum):
+            return {"e": cls._ref(type(value)), "n": value.name}
+        origin = typing.get_origin(value)
+        if origin is not None:
+            if origin in (typing.Union, types.UnionType):
+                return {"u": [cls._encode(x) for x in typing.get_args(value)]}
+            return {
+                "g": cls._ref(origin),
+                "a": [cls._encode(x) for x in typing.get_args(value)],
+            }
+        if value is type(None):
+            return {"n": None}
+        if isinstance(value, type):
+            return {"t": cls._ref(value)}
+        raise _Uncacheable(value)
+
+    @classmethod
+    def _decode(cls, data: dict) -> any:
+        """Decode an annotation or default value from JSON data."""
+        if "v" in data:
+            return data["v"]
+        if "t" in data:
+            return cls._import(data["t"])
+        if "x" in data:
+            return Ellipsis
+        if "s" in data:
+            items = [cls._decode(x) for x in data["s"]]
+            return tuple(items) if data["k"] == "tuple" else items
+        if "e" in data:
+            return cls._import(data["e"])[data["n"]]
+        if "u" in data:
+            return typing.Union[tuple(cls._decode(x) for x in data["u"])]
+        if "g" in data:
+            args = tuple(cls._decode(x) for x in data["a"])
+            return cls._import(data["g"])[args]
+        if "n" in data:
+            return type(None)
+        raise ValueError(data)
+
+    @staticmethod
+    def _ref(obj: any) -> str:
+        """Return the reference of an importable object."""
+        module = getattr(obj, "__module__", None)
+        name = getattr(obj, "__qualname__", None)
+        if module is None or name is None or "<" in name:
+            raise _Uncacheable(obj)
+        return f"{module}:{name}"
+
+    @staticmethod
+    def _import(ref: str) -> any:
+        """Import an object from its reference."""
+        module, _, name = ref.partition(":")
+        obj = sys.modules.get(module, None) or importlib.import_module(module)
+        for attr in name.split("."):
+            obj = getattr(obj, attr)
+        return obj
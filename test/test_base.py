@@ -0,0 +1,578 @@
+#!/usr/bin/env python3
+
+import asyncio
+import os
+import signal
+import threading
+import types
+from collections.abc import AsyncIterable
+
+import pytest
+
+from cmdcraft.base import BasePrompter
+
+
+class Prompter(BasePrompter):
+    """Prompter collecting its output."""
+
+    def __init__(self, **kwargs) -> None:
+        """Construct the prompter with an empty output."""
+        super().__init__(**kwargs)
+        self.lines = []
+
+    def write(self, *args) -> None:
+        """Collect an output line."""
+        self.lines.append(" ".join(str(x) for x in args))
+
+
+def test_interpret():
+    """Test command interpretation."""
+    calls = []
+
+    async def add(a: int, b: int = 1) -> None:
+        calls.append(a + b)
+
+    async def main():
+        p = Prompter()
+        p.register_command(add)
+        await p.interpret("add 1 2")
+        await p.interpret("add 1")
+        await p.interpret("add 1 # comment")
+        await p.interpret("")
+        assert calls == [3, 2, 2]
+
+        await p.interpret("unknown")
+        assert p.lines[-1] == "Unknown command: unknown"
+        await p.interpret('add "1')
+        assert p.lines[-1] == "Unterminated quote or escape"
+
+        await p.interpret("ad 5")
+        assert calls[-1] == 6
+        await p.interpret("x 1")
+        assert p.lines[-1] == "Unknown command: x"
+        await p.interpret("h")
+        assert p.lines[-1] == "Ambiguous command: h (head, help, history)"
+
+    asyncio.run(main())
+
+
+def test_jobs():
+    """Test background jobs."""
+    done = []
+
+    async def work(delay: float) -> None:
+        await asyncio.sleep(delay)
+        done.append(delay)
+
+    async def main():
+        p = Prompter(max_jobs=2)
+        p.register_command(work)
+        await p.interpret("work 0.01 &")
+        await p.interpret("spawn work 10")
+        assert p.lines == ["[1] work 0.01", "[2] work 10"]
+        assert done == []
+
+        await p.interpret("fg 1")
+        assert done == [0.01]
+
+        await p.interpret("kill 2")
+        await p.interpret("await 2")
+        assert p.lines[-1] == "[2] cancelled work 10"
+
+        p.lines.clear()
+        await p.interpret("nosuch &")
+        await p.interpret("work bogus &")
+        await p.interpret("wait 0.01")
+        await p.interpret("jobs")
+        assert p.lines[-2].startswith("[3] failed")
+        assert p.lines[-1].startswith("[4] failed")
+        await p.interpret("nosuch &")
+        await p.interpret("fg")
+        assert p.lines[-1] == "[5] failed nosuch"
+
+        await p.interpret("work 10 &")
+        await p.interpret("quit --grace=0.01")
+        assert not p.is_running
+        assert p.lines[-1] == "Cancelled 1 pending job(s)"
+
+    asyncio.run(main())
+
+
+def test_load_parallel(tmp_path):
+    """Test routines loaded in parallel mode."""
+    order = []
+
+    async def work(name: str, delay: float) -> None:
+        await asyncio.sleep(delay)
+        order.append(name)
+        p.output(name)
+        if name == "fail":
+            raise ValueError("failed")
+
+    p = Prompter()
+    p.register_command(work)
+    routine = tmp_path / "routine"
+    routine.write_text(
+        "work a 0.05\nwork b 0.01\nwork fail 0\nwait 0\nwork c 0\nwork d 0\n"
+    )
+
+    async def main():
+        assert not await p.interpret(f"load {os.fspath(routine)} --parallel=4")
+
+    asyncio.run(main())
+    assert order.index("a") > order.index("b")
+    assert order[-2:] == ["c", "d"]
+    assert p.lines[:6] == ["a", "b", "fail", "failed", "c", "d"]
+    assert p.lines[6].startswith("Executed 6 lines in ")
+    assert p.lines[6].endswith(", 1 failed")
+    assert p.lines[7:] == ["  line 3: work fail 0", "1 of 6 lines failed"]
+
+
+def test_load_parallel_window(tmp_path):
+    """Test parallel routines schedule a bounded window of lines."""
+    peak = 0
+
+    async def work() -> None:
+        nonlocal peak
+        peak = max(peak, len(asyncio.all_tasks()))
+        await asyncio.sleep(0)
+
+    async def late() -> None:
+        await asyncio.sleep(0.05)
+        p.output("late")
+
+    p = Prompter()
+    p.register_command(work)
+    p.register_command(late)
+    routine = tmp_path / "routine"
+    routine.write_text("late &\n" + "work\n" * 100)
+
+    async def main():
+        await p.interpret(f"load {os.fspath(routine)} --parallel=2")
+        await p.interpret("wait 0.1")
+
+    asyncio.run(main())
+    assert peak <= 8
+    assert p.lines[0] == "[1] late"
+    assert p.lines[1].startswith("Executed 101 lines in ")
+    # Output of jobs is not captured with the line which spawned them
+    assert p.lines[2:] == ["late"]
+
+
+def test_default_write(capsys):
+    """Test subclasses overriding only output can be instantiated."""
+
+    class Legacy(BasePrompter):
+        def output(self, *args) -> None:
+            pass
+
+    Legacy()
+    BasePrompter().write("a", 1)
+    assert capsys.readouterr().out == "a 1\n"
+
+
+def test_history():
+    """Test history command."""
+
+    async def main():
+        p = Prompter(history_size=3)
+        for line in ("wait 0", "help wait", "wait 1", "history"):
+            p._history.append(line)
+        await p.interpret("history")
+        await p.interpret("history --grep=wait")
+        await p.interpret("history --prefix=wait --limit=1")
+        assert p.lines == [
+            "help wait\nwait 1\nhistory",
+            "help wait\nwait 1",
+            "wait 1",
+        ]
+
+    asyncio.run(main())
+
+
+def test_quit_closes_history(tmp_path):
+    """Test quit closes the history file."""
+
+    async def main():
+        p = Prompter(history_file=os.fspath(tmp_path / "history"))
+        p.command_history.append("wait 0")
+        await p.interpret("quit")
+        assert p.command_history._file is None
+
+    asyncio.run(main())
+
+
+def test_stats():
+    """Test execution metrics and stats command."""
+
+    async def fail():
+        raise ValueError("fail")
+
+    async def main():
+        p = Prompter()
+        p.register_command(fail)
+        await p.interpret("wait 0")
+        await p.interpret("wait 0")
+        await p.interpret("fail")
+        assert p.metrics.command("wait").calls == 2
+        assert p.metrics.command("fail").errors == 1
+        p.lines.clear()
+        await p.interpret("stats fail --reset=true")
+        assert p.lines[0] == "commands:"
+        assert p.lines[1].split() == "command calls errors p50 p95 p99 max".split()
+        assert p.lines[2].split()[:3] == ["fail", "1", "1"]
+        assert p.metrics.command("fail") is None
+
+    asyncio.run(main())
+
+
+def test_profile(tmp_path):
+    """Test profile command."""
+
+    async def work(n: int):
+        return [str(x) for x in range(n)]
+
+    async def main():
+        p = Prompter()
+        p.register_command(work)
+        dump = os.fspath(tmp_path / "work.prof")
+        await p.interpret(f"profile --top=5 --dump={dump} work 10000")
+        assert "function calls" in p.lines[0]
+        assert "work" in p.lines[0]
+        assert p.lines[1] == "Top allocations:"
+        assert p.metrics.command("work").calls == 1
+        assert os.path.exists(dump) and os.path.exists(dump + ".mem")
+        p.lines.clear()
+        assert not await p.interpret("profile --bad=1 work 1")
+        assert p.lines[-1] == "Unknown option: --bad"
+        p.lines.clear()
+        assert not await p.interpret("profile --top=1 work bogus")
+        assert "Top allocations:" in p.lines
+        assert p.lines[-1] == "work failed"
+
+    asyncio.run(main())
+
+
+def test_output_buffer():
+    """Test buffered output."""
+
+    async def main():
+        p = Prompter(output_buffer=100)
+        await p.interpret("help wait")
+        await p.interpret("bogus")
+        await p.flush()
+        assert "\n".join(p.lines).endswith("Unknown command: bogus")
+
+    asyncio.run(main())
+
+
+def test_sync_commands():
+    """Test synchronous commands run in executors."""
+
+    def work():
+        p.output(threading.current_thread().name)
+
+    async def main():
+        p.register_command(work)
+        await p.interpret("work")
+        cmd = p.register_command(os.getpid, "pid", executor="process")
+        assert cmd.executor is p.process_pool
+        with pytest.raises(ValueError):
+            p.register_command(work, executor="bogus")
+
+    p = Prompter(max_workers=2)
+    asyncio.run(main())
+    assert p.lines[0].startswith("cmdcraft")
+    p.process_pool.shutdown()
+
+
+def test_sync_awaitable():
+    """Test awaitables returned by synchronous callables are awaited."""
+
+    async def later(text: str):
+        p.output(text)
+
+    def schedule(text: str):
+        return later(text)
+
+    async def main():
+        p.register_command(schedule)
+        assert await p.interpret("schedule done")
+        assert p.lines == ["done"]
+        pool = p.thread_pool
+        await p.interpret("quit")
+        assert p._thread_pool is None
+        assert pool._shutdown
+        # Registered commands use the pool created again
+        assert await p.interpret("schedule again")
+        assert p.lines[-1] == "again"
+        assert p.thread_pool is not pool
+
+    p = Prompter()
+    asyncio.run(main())
+
+
+def test_timeout():
+    """Test command timeouts."""
+
+    async def sleep(delay: float):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(delay)
+            raise
+
+    async def slow(*, timeout: float = 0):
+        pass
+
+    async def fetch(*keys: str):
+        await asyncio.wait_for(asyncio.sleep(1), 0.01)
+
+    async def main():
+        p = Prompter()
+        p.register_command(sleep, timeout=0.05)
+        p.register_command(slow)
+        p.register_command(fetch, timeout=5)
+        assert not await p.interpret("sleep 1")
+        assert p.lines[-1] == "Timed out after 0.05s"
+        assert await p.interpret("sleep 0.1 --timeout=0")
+        assert not await p.interpret("wait 1 --timeout=0.01")
+        assert p.lines[-1] == "Timed out after 0.01s"
+        assert await p.interpret("slow --timeout=0.01")
+        assert p.metrics.command("sleep").errors == 1
+        # A timeout raised by the command itself is its own error
+        p.lines.clear()
+        assert not await p.interpret("fetch")
+        assert p.lines == ["TimeoutError"]
+        assert not await p.interpret("foreach --range=1 --progress=0 fetch")
+        assert "Timed out" not in " ".join(p.lines)
+
+    cancelled = []
+    asyncio.run(main())
+    assert cancelled == [1]
+
+
+def test_interrupt():
+    """Test Ctrl-C cancels the running command only."""
+
+    async def main():
+        p = Prompter()
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, os.kill, os.getpid(), signal.SIGINT)
+        assert not await p.interrupt("wait 5")
+        assert p.lines == ["Cancelled"]
+        assert await p.interrupt("wait 0")
+
+    asyncio.run(main())
+
+
+def test_register_bulk():
+    """Test lazy bulk registration."""
+
+    class Service:
+        value = 1
+
+        def ping(self, n: int):
+            p.output(f"pong {n}")
+
+        @staticmethod
+        def stat() -> None:
+            pass
+
+        @property
+        def broken(self):
+            raise AssertionError("evaluated")
+
+        def _private(self):
+            pass
+
+    module = types.ModuleType("svc")
+    exec(
+        "from os import getcwd\n"
+        "def add(a: int, b: int):\n"
+        "    return a + b\n"
+        "def _hidden():\n"
+        "    pass\n",
+        module.__dict__,
+    )
+    module.add.__module__ = "svc"
+
+    p = Prompter()
+    cmds = p.register_object(Service(), prefix="svc.")
+    assert [x.alias for x in cmds] == ["svc.ping", "svc.stat"]
+    assert not any(x.processed for x in cmds)
+    cmds = p.register_module(module)
+    assert [x.alias for x in cmds] == ["add"]
+    assert not cmds[0].processed
+
+    asyncio.run(p.interpret("svc.ping 3"))
+    assert p.lines == ["pong 3"]
+    assert p.commands["svc.ping"].processed
+    assert not p.commands["svc.stat"].processed
+
+    cmds = p.register_object(Service, prefix="cls.")
+    assert [x.alias for x in cmds] == ["cls.stat"]
+    cmds = p.register_object(Service(), prefix="eager.", lazy=False)
+    assert all(x.processed for x in cmds)
+    assert p.register_module(module, prefix="eager.", lazy=False)[0].processed
+
+    module.__all__ = ["getcwd"]
+    assert [x.alias for x in p.register_module(module)] == ["getcwd"]
+
+
+def test_pipeline():
+    """Test streaming pipelines."""
+    produced = []
+
+    async def numbers(n: int):
+        for i in range(n):
+            produced.append(i)
+            yield i
+
+    async def double(*, stream: AsyncIterable[int]):
+        async for x in stream:
+            yield x * 2
+
+    async def scale(stream: AsyncIterable[int], /, factor: int, *rest: str):
+        async for x in stream:
+            yield f"{x * factor}{''.join(rest)}"
+
+    async def offset(base: int = 0, stream: AsyncIterable[int] | None = None):
+        async for x in stream:
+            yield x + base
+
+    async def fail(*, stream: AsyncIterable):
+        async for x in stream:
+            if x > 2:
+                raise ValueError("too big")
+            yield x
+
+    async def main():
+        p = Prompter(pipe_buffer=2, output_interval=0)
+        p.register_command(numbers)
+        p.register_command(double)
+        p.register_command(fail)
+        p.register_command(scale)
+        p.register_command(offset)
+        assert await p.interpret("numbers 2 | scale 3 a b")
+        assert p.lines == ["0ab", "3ab"]
+        p.lines.clear()
+        assert await p.interpret("numbers 2 | offset 5")
+        assert await p.interpret("numbers 2 | offset")
+        assert p.lines == ["5", "6", "0", "1"]
+        p.lines.clear()
+        assert await p.interpret("numbers 5 | double")
+        assert p.lines == ["0", "2", "4", "6", "8"]
+        p.lines.clear()
+        assert await p.interpret("numbers 100000 | double | head 3")
+        assert p.lines == ["0", "2", "4"]
+        # The producer is stopped once head has enough items
+        assert len(produced) < 100
+        p.lines.clear()
+        assert await p.interpret("numbers 20 | grep 1 --invert=true | count")
+        assert p.lines == ["9"]
+        p.lines.clear()
+        assert await p.interpret("numbers 3 | grep '^[12]$' | head")
+        assert p.lines == ["1", "2"]
+        p.lines.clear()
+        assert not await p.interpret("numbers 10 | fail")
+        assert p.lines == ["0", "1", "2", "fail: too big"]
+
+        assert not await p.interpret("numbers 3 |")
+        assert p.lines[-1] == "Empty pipeline stage"
+        assert not await p.interpret("wait 0 | count")
+        assert p.lines[-1] == "wait: does not produce a stream"
+        assert not await p.interpret("numbers 3 | numbers 1")
+        assert p.lines[-1] == "numbers: does not accept a stream"
+        assert not await p.interpret("count")
+        assert p.lines[-1].startswith("Expected a pipeline input")
+        assert await p.interpret("numbers 2 | count &")
+        await p.interpret("wait 0.01")
+        assert p.lines[-1] == "2"
+
+    asyncio.run(main())
+
+
+def test_stream_output():
+    """Test async generator output is coalesced by interval."""
+
+    async def burst(n: int, delay: float = 0):
+        for i in range(n):
+            yield i
+            if delay:
+                await asyncio.sleep(delay)
+
+    async def broken():
+        yield "partial"
+        raise ValueError("broken")
+
+    async def main():
+        p = Prompter(output_interval=0.05)
+        p.register_command(burst)
+        p.register_command(broken)
+        assert await p.interpret("burst 1000")
+        # The first item is output at once, the rest together
+        assert p.lines == ["0", "\n".join(str(x) for x in range(1, 1000))]
+        p.lines.clear()
+        assert await p.interpret("burst 3 0.1")
+        assert p.lines == ["0", "1", "2"]
+        p.lines.clear()
+        assert not await p.interpret("broken")
+        assert p.lines == ["partial", "broken"]
+        p.lines.clear()
+        assert not await p.interpret("burst 100 0.01 --timeout=0.1")
+        assert 1 < len(p.lines) < 10
+        assert p.lines[-1] == "Timed out after 0.1s"
+
+    asyncio.run(main())
+
+
+def test_foreach(tmp_path):
+    """Test running a command over many argument sets."""
+    calls = []
+
+    async def deploy(host: str, retries: int = 0):
+        if host == "bad":
+            raise ValueError("unreachable")
+        await asyncio.sleep(0.01)
+        calls.append((host, retries))
+
+    async def square(n: int):
+        calls.append(n * n)
+
+    async def main():
+        p = Prompter(output_interval=0)
+        p.register_command(deploy)
+        p.register_command(square)
+        p.commands.resolve("deploy").parameter("host").set_dynamic_options(
+            lambda: ["web-1", "web-2"]
+        )
+
+        assert await p.interpret("foreach --range=4 --progress=0 square")
+        assert sorted(calls) == [0, 1, 4, 9]
+        assert p.lines[-1].startswith("Executed 4 items in ")
+        assert len(p.lines[-2].splitlines()) == 4
+
+        calls.clear()
+        assert await p.interpret("foreach --options=host deploy --retries=2")
+        assert sorted(calls) == [("web-1", 2), ("web-2", 2)]
+
+        calls.clear()
+        path = tmp_path / "hosts.txt"
+        path.write_text("db-1 3\n# skipped\n\nbad\n'db 2'\n")
+        p.lines.clear()
+        assert not await p.interpret(f"foreach --file={path} --parallel=2 deploy")
+        assert sorted(calls) == [("db 2", 0), ("db-1", 3)]
+        table = p.lines[0].splitlines()
+        assert table[1].startswith("bad ") and table[1].endswith(" unreachable")
+        assert p.lines[-1] == "deploy failed for 1 item(s)"
+
+        calls.clear()
+        assert await p.interpret("foreach --range=1:3 --progress=0 deploy h{} {}")
+        assert sorted(calls) == [("h1", 1), ("h2", 2)]
+        assert not await p.interpret("foreach --range=2 --file=x deploy")
+        assert p.lines[-1] == "Expected a single source of arguments"
+        assert not await p.interpret("foreach --options=x deploy")
+        assert p.lines[-1] == "Unknown parameter: x"
+
+    asyncio.run(main())
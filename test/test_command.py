@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+
+import pytest
+
+from cmdcraft.command import Command
+
+
+class Color(Enum):
+    """Color choices."""
+
+    RED = 1
+    GREEN = 2
+
+
+def target(a: int, b: Color = Color.RED, *args, c: float = 0.5, d=3, **kwargs):
+    """Return the call arguments."""
+    return (a, b, args, c, d, kwargs)
+
+
+def simple(a: int, *, flag: bool = False):
+    """Return the call arguments."""
+    return (a, flag)
+
+
+def call(cmd, *args):
+    """Evaluate a command call."""
+
+    async def main():
+        return await cmd.eval(*args)
+
+    return asyncio.run(main())
+
+
+def test_eval_positional():
+    """Test positional arguments casting."""
+    cmd = Command(target)
+    cmd.process()
+    assert call(cmd, "1") == (1, Color.RED, (), 0.5, 3, {})
+    assert call(cmd, "1", "GREEN", "x", "y") == (1, Color.GREEN, ("x", "y"), 0.5, 3, {})
+
+    with pytest.raises(KeyError):
+        call(cmd, "1", "BLUE")
+
+
+def test_process_once():
+    """Test processing again keeps the parameters and their options."""
+    cmd = Command(target)
+    cmd.process()
+    cmd.parameter("c").set_dynamic_options(lambda: ["0.5", "1.0"])
+    parameters = cmd.parameters
+    cmd.process()
+    assert cmd.parameters is parameters
+    assert cmd.parameter("c").options == ["0.5", "1.0"]
+
+
+def test_process_threads():
+    """Test concurrent processing builds the metadata once."""
+    cmd = Command(target)
+    barrier = threading.Barrier(8)
+    seen = []
+
+    def run():
+        barrier.wait()
+        seen.append((cmd.parameters, cmd.positional_parameters))
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert all(x[0] is seen[0][0] and x[1] is seen[0][1] for x in seen)
+    assert list(seen[0][1]) == ["a", "b"]
+
+
+def test_eval_keyword():
+    """Test keyword arguments casting."""
+    cmd = Command(target)
+    cmd.process()
+    assert call(cmd, "1", "--c=2", "--d=4") == (1, Color.RED, (), 2.0, 4, {})
+    assert call(cmd, "--a=2", "--b=GREEN") == (2, Color.GREEN, (), 0.5, 3, {})
+    assert call(cmd, "1", "--e=x=y") == (1, Color.RED, (), 0.5, 3, {"e": "x=y"})
+
+
+def test_eval_separator():
+    """Test tokens after `--` are handled as positional arguments."""
+    cmd = Command(target)
+    cmd.process()
+    assert call(cmd, "1", "RED", "--", "--c=2", "a--b") == (
+        1,
+        Color.RED,
+        ("--c=2", "a--b"),
+        0.5,
+        3,
+        {},
+    )
+
+
+def test_eval_errors():
+    """Test invalid inputs."""
+    cmd = Command(simple)
+    cmd.process()
+    assert call(cmd, "1", "--flag=yes") == (1, True)
+    assert call(cmd, "1", "--flag=off") == (1, False)
+
+    with pytest.raises(TypeError):
+        call(cmd, "1", "2")
+    with pytest.raises(TypeError):
+        call(cmd, "1", "--flag")
+    with pytest.raises(TypeError):
+        call(cmd, "1", "--other=1")
+    with pytest.raises(ValueError):
+        call(cmd, "1", "--flag=maybe")
+
+
+def collect(ids: list[int], *, weights: tuple[float, ...] = ()):
+    """Return the call arguments."""
+    return (ids, weights)
+
+
+def test_eval_collections():
+    """Test collection arguments casting."""
+    cmd = Command(collect)
+    cmd.process()
+    assert call(cmd, "1,2", "--weights=0.5,1") == ([1, 2], (0.5, 1.0))
+    cmd.parameter("ids").set_compact()
+    ids, _ = call(cmd, "3,4")
+    assert ids.typecode == "q" and list(ids) == [3, 4]
+
+
+def test_executor():
+    """Test synchronous callables run in executors."""
+
+    def where():
+        return threading.current_thread() is threading.main_thread(), os.getpid()
+
+    async def awhere():
+        return where()
+
+    cmd = Command(where)
+    cmd.process()
+    assert not cmd.is_async
+    assert call(cmd) == (False, os.getpid())
+
+    cmd = Command(awhere)
+    cmd.process()
+    assert cmd.is_async
+    assert call(cmd) == (True, os.getpid())
+
+    with ProcessPoolExecutor(1) as pool:
+        cmd = Command(os.getpid, executor=pool)
+        cmd.process()
+        assert cmd.executor is pool
+        assert call(cmd) != os.getpid()
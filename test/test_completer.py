@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Test cmdcraft.completer module."""
+
+import asyncio
+import time
+
+from prompt_toolkit.completion import CompleteEvent, Completer, Completion
+from prompt_toolkit.document import Document
+
+from cmdcraft.command import Command
+from cmdcraft.completer import AsyncCompleter, RegistryCompleter
+from cmdcraft.metrics import Metrics
+from cmdcraft.registry import CommandRegistry
+
+
+class SlowCompleter(Completer):
+    """Completer yielding an item every few milliseconds."""
+
+    def __init__(self, count: int, delay: float) -> None:
+        """Construct the completer with its item count and delay."""
+        self.count = count
+        self.delay = delay
+        self.requests = []
+
+    def get_completions(self, document, complete_event):
+        """Yield the items slowly, recording the request."""
+        self.requests.append(document.text)
+        for i in range(self.count):
+            time.sleep(self.delay)
+            yield Completion(f"{document.text}{i}")
+
+
+async def collect(completer, text, requested=False):
+    """Return the completion texts of an async completer."""
+    event = CompleteEvent(completion_requested=requested)
+    completions = completer.get_completions_async(Document(text), event)
+    return [x.text async for x in completions]
+
+
+def test_async_completer():
+    """Test completions run in background, within the time budget."""
+
+    async def main():
+        slow = SlowCompleter(3, 0)
+        completer = AsyncCompleter(slow, debounce=0, budget=1)
+        assert await collect(completer, "a") == ["a0", "a1", "a2"]
+
+        slow.count, slow.delay = 1000, 0.01
+        completer = AsyncCompleter(slow, debounce=0, budget=0.1)
+        start = time.monotonic()
+        partial = await collect(completer, "b")
+        assert time.monotonic() - start < 0.5
+        assert 0 < len(partial) < 1000
+        assert partial == [f"b{i}" for i in range(len(partial))]
+        completer.close()
+
+    asyncio.run(main())
+
+
+def test_async_completer_debounce():
+    """Test stale requests are dropped while typing."""
+
+    async def main():
+        slow = SlowCompleter(3, 0)
+        completer = AsyncCompleter(slow, debounce=0.05, budget=1)
+        first = asyncio.ensure_future(collect(completer, "a"))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(collect(completer, "ab"))
+        assert await first == []
+        assert await second == ["ab0", "ab1", "ab2"]
+        assert slow.requests == ["ab"]
+        # Explicit requests are not debounced
+        assert await collect(completer, "c", requested=True) == ["c0", "c1", "c2"]
+
+        slow.count, slow.delay = 100, 0.01
+        first = asyncio.ensure_future(collect(completer, "d", requested=True))
+        await asyncio.sleep(0.05)
+        await collect(completer, "e", requested=True)
+        assert await first == []
+        completer.close()
+
+    asyncio.run(main())
+
+
+def test_async_completer_options():
+    """Test async options are refreshed from the completion thread."""
+
+    async def hosts():
+        return ["web-1", "web-2"]
+
+    async def deploy(host: str):
+        pass
+
+    async def main():
+        registry = CommandRegistry()
+        cmd = Command(deploy)
+        cmd.process()
+        cmd.parameter("host").set_dynamic_options(hosts, ttl=60)
+        registry.add(cmd)
+        completer = AsyncCompleter(RegistryCompleter(registry), debounce=0)
+        # The first request schedules the refresh on this loop
+        await collect(completer, "deploy w")
+        await asyncio.sleep(0.01)
+        assert await collect(completer, "deploy w") == ["web-1", "web-2"]
+        assert await collect(completer, "dep | deploy w") == ["web-1", "web-2"]
+        assert await collect(completer, "dep\t|\tdeploy w") == ["web-1", "web-2"]
+        assert await collect(completer, "dep '|' x | deploy w") == ["web-1", "web-2"]
+        assert await collect(completer, "deploy 'a | deploy w") == []
+        completer.close()
+
+    asyncio.run(main())
+
+
+def test_completion_metrics():
+    """Test completion latencies cover the whole completion."""
+
+    async def deploy(host: str):
+        pass
+
+    registry = CommandRegistry()
+    cmd = Command(deploy)
+    cmd.process()
+    cmd.parameter("host").set_dynamic_options(lambda: [f"h{i}" for i in range(1000)])
+    registry.add(cmd)
+    metrics = Metrics()
+    completer = RegistryCompleter(registry, metrics=metrics)
+    event = CompleteEvent()
+    assert [x.text for x in completer.get_completions(Document("dep"), event)] == [
+        "deploy"
+    ]
+    assert len(list(completer.get_completions(Document("deploy h"), event))) == 100
+    assert metrics.completion(RegistryCompleter.COMMAND_NAME).calls == 1
+    stats = metrics.completion("deploy")
+    assert stats.calls == 1 and stats.latency.max > 0
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+
+from cmdcraft.fuzzy import FuzzyIndex
+
+
+def test_match():
+    """Test fuzzy matching and ranking."""
+    idx = FuzzyIndex(["beta", "alpha", "Alphabet", "zalpha", "a-l-p-h-a", "gamma"])
+    assert idx.match("", 2) == ["beta", "alpha"]
+    assert idx.match("alp") == ["alpha", "Alphabet", "a-l-p-h-a", "zalpha"]
+    assert idx.match("ALP", 2) == ["alpha", "Alphabet"]
+    assert idx.match("bt") == ["beta", "Alphabet"]
+    assert idx.match("xyz") == []
+    assert idx.match("ag") == []
+
+
+def test_match_limit():
+    """Test result limits."""
+    idx = FuzzyIndex([f"host{i:03d}" for i in range(1000)])
+    assert idx.match("host", 3) == ["host000", "host001", "host002"]
+    assert idx.match("h99", 2) == ["host990", "host991"]
+    assert len(idx.match("h", None)) == 1000
+
+
+def test_match_prefix_first():
+    """Test prefixed options are found beyond the maximum number of candidates."""
+    options = [f"xaxb{i:05d}" for i in range(20000)]
+    idx = FuzzyIndex([*options, "abc", "Abd"])
+    assert idx.match("ab", 3) == ["abc", "Abd", "xaxb00000"]
+    assert idx.match("ab", 1) == ["abc"]
+    assert len(idx.match("ab", None)) == 5002
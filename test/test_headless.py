@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+import asyncio
+import io
+import os
+import subprocess
+import sys
+
+from cmdcraft import HeadlessPrompter
+
+
+def test_run():
+    """Test commands streamed from a file."""
+    calls = []
+
+    async def add(a: int, b: int) -> None:
+        calls.append(a + b)
+
+    input = io.StringIO("add 1 2\nbogus\nadd 2 2 &\n\nadd 3 3\n")
+    output = io.StringIO()
+    p = HeadlessPrompter(input, output)
+    p.register_command(add)
+    asyncio.run(p.run())
+    assert sorted(calls) == [3, 4, 6]
+    assert p.failures == 1
+    assert "Unknown command: bogus" in output.getvalue()
+    assert not p.is_running
+
+
+def test_run_again():
+    """Test synchronous commands still run after a previous run ended."""
+    calls = []
+    p = HeadlessPrompter(io.StringIO("add 1\n"), io.StringIO())
+    p.register_command(calls.append, "add")
+    asyncio.run(p.run())
+    p._input = io.StringIO("add 2\n")
+    asyncio.run(p.run())
+    assert calls == ["1", "2"]
+    assert p.failures == 0
+
+
+def test_stop_on_error():
+    """Test the stop on error option."""
+    input = io.StringIO("bogus\nquit\n")
+    p = HeadlessPrompter(input, io.StringIO(), stop_on_error=True)
+    asyncio.run(p.run())
+    assert p.failures == 1
+
+
+def test_unencodable_output():
+    """Test a failing output stream does not hang the interpreter."""
+
+    def say(text: str) -> None:
+        p.output(text)
+
+    input = io.StringIO("say café\nwait 0.2\nsay hello\n")
+    output = io.TextIOWrapper(io.BytesIO(), encoding="ascii")
+    p = HeadlessPrompter(input, output)
+    p.register_command(say)
+    asyncio.run(asyncio.wait_for(p.run(), 10))
+    output.seek(0)
+    assert output.read().endswith("hello\n")
+
+
+def test_history():
+    """Test commands are recorded in the history only on request."""
+    p = HeadlessPrompter(io.StringIO("wait 0\n"), io.StringIO())
+    asyncio.run(p.run())
+    assert list(p.command_history) == []
+    p = HeadlessPrompter(io.StringIO("wait 0\n"), io.StringIO(), record_history=True)
+    asyncio.run(p.run())
+    assert list(p.command_history) == ["wait 0"]
+
+
+def test_pipe():
+    """Test commands streamed from a pipe, read in chunks."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    lines = "".join(f"history --limit={i}\r\n" for i in range(20000))
+    result = subprocess.run(
+        [sys.executable, "-m", "cmdcraft"],
+        input=lines + "bogus\nhelp wait",
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    assert result.returncode == 1
+    assert result.stdout.count("Unknown command") == 1
+    assert "Block the execution" in result.stdout.split("Unknown command: bogus")[1]
+
+
+def test_lazy_import():
+    """Test prompt_toolkit and multiprocessing are not imported by headless usage."""
+    code = (
+        "import sys, cmdcraft; cmdcraft.HeadlessPrompter(); "
+        "assert 'prompt_toolkit' not in sys.modules; "
+        "assert 'multiprocessing' not in sys.modules"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    subprocess.run([sys.executable, "-c", code], env=env, check=True)
+
+
+def test_main_module(tmp_path):
+    """Test registering module functions from the command line."""
+    from cmdcraft.__main__ import main
+
+    routine = tmp_path / "routine.txt"
+    routine.write_text("loads 1\n")
+    assert main(["--module", "json", os.fspath(routine)]) == 0
+    routine.write_text("loads 1\nJSONDecoder\n")
+    assert main(["-m", "json", os.fspath(routine)]) == 1
+
+    # Failed lines of a parallel load fail the run
+    parallel = tmp_path / "parallel.txt"
+    parallel.write_text("escape a\nescape\n")
+    routine.write_text(f"load {os.fspath(parallel)} --parallel=2\n")
+    assert main(["-m", "html", os.fspath(routine)]) == 1
+    parallel.write_text("escape a\nescape b\n")
+    assert main(["-m", "html", os.fspath(routine)]) == 0
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+import asyncio
+
+from cmdcraft.history import CommandHistory
+from cmdcraft.prompter import StoreHistory
+
+
+def test_ring_buffer():
+    """Test history bounds."""
+    history = CommandHistory(3)
+    for i in range(5):
+        history.append(f"cmd {i}")
+    assert len(history) == 3
+    assert list(history) == ["cmd 2", "cmd 3", "cmd 4"]
+    assert list(reversed(history)) == ["cmd 4", "cmd 3", "cmd 2"]
+
+    history.clear()
+    assert list(history) == []
+
+
+def test_search():
+    """Test history search."""
+    history = CommandHistory(4)
+    for line in ("load file", "wait 1", "help load", "load other", "save file"):
+        history.append(line)
+    assert history.search("load") == ["load other", "help load"]
+    assert history.search("load", prefix=True) == ["load other"]
+    assert history.search("fil") == ["save file"]
+    assert history.search("l", limit=2) == ["save file", "load other"]
+    assert history.search() == ["save file", "load other", "help load", "wait 1"]
+    assert history.search("missing") == []
+
+
+def test_persistence(tmp_path):
+    """Test history log file."""
+    path = tmp_path / "history"
+    history = CommandHistory(10, str(path))
+    for i in range(25):
+        history.append(f"cmd {i}")
+    history.close()
+    assert path.read_text().count("\n") == 25
+
+    CommandHistory._BLOCK = 16
+    try:
+        history = CommandHistory(10, str(path))
+    finally:
+        CommandHistory._BLOCK = 65536
+    assert list(history) == [f"cmd {i}" for i in range(15, 25)]
+    found = history.search("cmd 2", prefix=True)
+    assert found == [f"cmd {i}" for i in range(24, 19, -1)]
+    history.close()
+
+
+def test_store_history():
+    """Test the prompt history stays within the store capacity."""
+
+    async def main():
+        store = CommandHistory(3)
+        history = StoreHistory(store)
+        for i in range(5):
+            history.append_string(f"cmd {i}")
+            store.append(f"cmd {i}")
+        assert history.get_strings() == ["cmd 2", "cmd 3", "cmd 4"]
+        assert [x async for x in history.load()] == ["cmd 4", "cmd 3", "cmd 2"]
+
+    asyncio.run(main())
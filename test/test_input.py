@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 
+import shlex
+
 import pytest
 
-from cmdcraft.input import Input, InputState
+from cmdcraft.input import Input, InputState, Lexer
 
 
 def test_tokenize():
@@ -122,3 +124,89 @@ def test_input_option_complete():
     assert input.tokens == ["test1", "--opt=value"]
     assert input.position == 2
     assert input.state == InputState.TYPING_COMPLETE
+
+
+def test_lexer_incremental():
+    """Test lexer fed in chunks."""
+    lexer = Lexer()
+    lexer.feed("test pa")
+    assert lexer.tokens == ["test", "pa"]
+    assert lexer.pending
+    lexer.feed('r="1 ')
+    assert lexer.tokens == ["test", "par=1 "]
+    assert lexer.quote == '"'
+    lexer.feed('2" ')
+    assert lexer.tokens == ["test", "par=1 2"]
+    assert lexer.quote is None
+    assert not lexer.pending
+    assert lexer.length == len('test par="1 2" ')
+
+
+def test_lexer_whitespace():
+    """Test only shlex whitespace splits tokens."""
+    for text in ("a\xa0b c", "a\x0bb c", "a\x0cb c", "a\u2003b c", "caf\u00e9 c"):
+        assert Input.tokenize(text) == shlex.split(text, comments=True)
+    assert Input.tokenize("a\tb\r\nc") == ["a", "b", "c"]
+
+
+def test_lexer_escape():
+    """Test lexer escape state."""
+    lexer = Lexer()
+    lexer.feed("test a\\")
+    assert lexer.escaped
+    lexer.feed(" b")
+    assert not lexer.escaped
+    assert lexer.tokens == ["test", "a b"]
+
+
+def test_input_open_quote():
+    """Test methods for an input with an open quote."""
+    input = Input('test1 "a b')
+    input.process()
+    assert input.tokens == ["test1", "a b"]
+    assert input.position == 1
+    assert input.state == InputState.TYPING_STRING
+
+
+def test_input_update():
+    """Test incremental input updates."""
+    input = Input("test1 --opt")
+    input.process()
+    input.update("test1 --opt=v")
+    input.process()
+    assert input.tokens == ["test1", "--opt=v"]
+    assert input.state == InputState.TYPING_VALUE
+    input.update("test2")
+    input.process()
+    assert input.tokens == ["test2"]
+    assert input.state == InputState.TYPING_PARAMETER
+
+
+def test_input_background():
+    """Test the background operator."""
+    input = Input("test1 arg &")
+    input.process()
+    assert input.background
+    input = Input('test1 "&"')
+    input.process()
+    assert not input.background
+    input = Input("test1 a&")
+    input.process()
+    assert not input.background
+
+
+def test_input_stages():
+    """Test the pipeline stages."""
+    input = Input("cmd1 a | cmd2 b c | cmd3 &")
+    input.process()
+    assert input.stages == [["cmd1", "a"], ["cmd2", "b", "c"], ["cmd3"]]
+    input = Input("cmd1 '|' a|b")
+    input.process()
+    assert input.stages == [["cmd1", "|", "a|b"]]
+    input = Input("cmd1 |")
+    input.process()
+    assert input.stages == [["cmd1"], []]
+    assert input.stage_offset == 0
+    input.update("cmd1 \t|\tcmd2 '|' x")
+    input.process()
+    assert input.stage_offset == 7
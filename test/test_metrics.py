@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Test cmdcraft.metrics module."""
+
+import threading
+
+from cmdcraft.metrics import Histogram, Metrics
+
+
+def test_histogram():
+    """Test histogram percentiles."""
+    h = Histogram()
+    assert h.percentile(50) == 0
+    for x in range(1, 10001):
+        h.record(x * 1000)
+    assert h.count == 10000
+    assert h.min == 1000 and h.max == 10000000
+    for q in (50, 95, 99):
+        assert abs(h.percentile(q) - q * 100000) <= q * 100000 * 0.04
+    assert h.percentile(100) == 10000000
+    h = Histogram()
+    for x in (0, 1, 7, 31):
+        h.record(x)
+    assert [h.percentile(q) for q in (25, 50, 75, 100)] == [0, 1, 7, 31]
+
+
+def test_metrics():
+    """Test metrics recording."""
+    m = Metrics()
+    m.record("cmd", 1000)
+    m.record("cmd", 3000, error=True)
+    m.record_completion("cmd", 500)
+    stats = m.command("cmd")
+    assert stats.calls == 2 and stats.errors == 1
+    assert m.completion("cmd").calls == 1
+    assert m.command("other") is None
+    snapshot = m.snapshot()
+    assert snapshot["commands"]["cmd"]["max"] == 3e-6
+    assert snapshot["commands"]["cmd"]["mean"] == 2e-6
+    m.reset()
+    assert m.snapshot() == {"commands": {}, "completions": {}}
+
+
+def test_metrics_threads():
+    """Test recording from several threads while taking snapshots."""
+    m = Metrics()
+
+    def work(i):
+        for x in range(2000):
+            m.record_completion(f"cmd{x % 50}", i * 2000 + x)
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    while any(t.is_alive() for t in threads):
+        m.snapshot()
+    for t in threads:
+        t.join()
+    snapshot = m.snapshot()["completions"]
+    assert sum(x["calls"] for x in snapshot.values()) == 8000
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+import asyncio
+import contextvars
+import threading
+import time
+
+from cmdcraft.options import OptionsCache, _caller_loop
+
+
+def test_sync_generator():
+    """Test cache over a synchronous generator."""
+    calls = []
+
+    def gen():
+        calls.append(1)
+        return ("a", "b", "c")
+
+    cache = OptionsCache(gen, ttl=0)
+    assert cache.get() == ["a", "b", "c"]
+    assert cache.get() == ["a", "b", "c"]
+    assert len(calls) == 2
+
+    cache = OptionsCache(gen, ttl=60.0, maxsize=2)
+    assert cache.get() == ["a", "b"]
+    assert cache.get() == ["a", "b"]
+    assert len(calls) == 3
+    cache.invalidate()
+    assert cache.expired
+
+
+def test_async_generator():
+    """Test stale-while-revalidate over a coroutine generator."""
+    calls = []
+
+    async def gen():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return [f"opt{len(calls)}"]
+
+    async def main():
+        cache = OptionsCache(gen, ttl=60.0)
+        assert cache.get() == []
+        assert cache.get() == []
+        assert await cache.fetch() == ["opt1"]
+        assert len(calls) == 1
+        assert cache.get() == ["opt1"]
+
+        cache.invalidate()
+        results = await asyncio.gather(cache.fetch(), cache.fetch())
+        assert results == [["opt2"], ["opt2"]]
+        assert len(calls) == 2
+
+    asyncio.run(main())
+
+
+def test_async_generator_failure():
+    """Test a failing coroutine generator keeps the last snapshot."""
+
+    async def gen():
+        raise RuntimeError("unavailable")
+
+    async def main():
+        cache = OptionsCache(gen)
+        cache._snapshot = ["old"]
+        assert await cache.fetch() == ["old"]
+        assert isinstance(cache.error, RuntimeError)
+
+    asyncio.run(main())
+
+
+def test_refresh_from_thread():
+    """Test coroutine generators are refreshed on the caller loop from threads."""
+
+    async def gen():
+        return ["x"]
+
+    async def main():
+        cache = OptionsCache(gen)
+        loop = asyncio.get_running_loop()
+        assert await loop.run_in_executor(None, cache.get) == []
+        assert cache.expired
+        context = contextvars.copy_context()
+        context.run(_caller_loop.set, loop)
+        await loop.run_in_executor(None, context.run, cache.get)
+        await asyncio.sleep(0.01)
+        assert cache.snapshot == ["x"]
+
+    asyncio.run(main())
+
+
+def test_sync_generator_from_thread():
+    """Test synchronous generators are refreshed off the loop from threads."""
+    threads = []
+
+    def gen():
+        threads.append(threading.current_thread())
+        time.sleep(0.05)
+        return iter(["y"])
+
+    async def main():
+        cache = OptionsCache(gen)
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        context.run(_caller_loop.set, loop)
+        # The stale snapshot is served without waiting for the generator
+        start = time.monotonic()
+        assert await loop.run_in_executor(None, context.run, cache.get) == []
+        assert time.monotonic() - start < 0.05
+        await asyncio.sleep(0.1)
+        assert cache.snapshot == ["y"]
+        assert threads[0] is not threading.current_thread()
+
+    asyncio.run(main())
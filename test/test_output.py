@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Test cmdcraft.output module."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from cmdcraft.output import OutputWriter
+
+
+def test_batches():
+    """Test lines are written in order, in batches."""
+    batches = []
+    w = OutputWriter(batches.append)
+    for i in range(1000):
+        w.write(str(i))
+    assert w.flush(5)
+    assert [x for b in batches for x in b] == [str(i) for i in range(1000)]
+    assert len(batches) < 1000
+    w.close()
+    w.write("closed")
+    assert w.pending == 0
+
+
+def test_policies():
+    """Test full buffer policies."""
+    for policy, expected in (
+        ("drop", ["0", "1", "2", "[3 output line(s) dropped]"]),
+        ("drop_oldest", ["[3 output line(s) dropped]", "3", "4", "5"]),
+    ):
+        gate = threading.Event()
+        batches = []
+
+        def write(batch):
+            gate.wait(5)
+            batches.append(batch)
+
+        w = OutputWriter(write, max_pending=3, policy=policy)
+        w.write("first")
+        while w.pending:
+            time.sleep(0.001)  # Wait for the writer to block on the first batch
+        for i in range(6):
+            w.write(str(i))
+        gate.set()
+        assert w.flush(5)
+        assert batches == [["first"], expected]
+        assert w.dropped == 3
+        w.close()
+
+    with pytest.raises(ValueError):
+        OutputWriter(print, policy="bogus")
+
+
+def test_block():
+    """Test blocking policy applies backpressure."""
+    gate = threading.Event()
+    lines = []
+
+    def write(batch):
+        gate.wait(5)
+        lines.extend(batch)
+
+    w = OutputWriter(write, max_pending=2, policy="block")
+    done = threading.Event()
+
+    def produce():
+        for i in range(5):
+            w.write(str(i))
+        done.set()
+
+    threading.Thread(target=produce).start()
+    assert not done.wait(0.1)
+    gate.set()
+    assert done.wait(5)
+
+    async def main():
+        await w.drain()
+
+    asyncio.run(main())
+    assert lines == [str(i) for i in range(5)]
+    assert w.dropped == 0
+    w.close()
+
+
+def test_write_error():
+    """Test a failing write closes the writer instead of killing the thread."""
+
+    def write(batch):
+        raise UnicodeEncodeError("ascii", "é", 0, 1, "bogus")
+
+    w = OutputWriter(write)
+    w.write("é")
+    assert w.flush(5)
+    assert w.closed
+    w.write("ignored")
+    assert w.pending == 0
+    w.close()
+
+
+def test_block_loop():
+    """Test the blocking policy never blocks the loop, nor drops lines."""
+    gate = threading.Event()
+    lines = []
+
+    def write(batch):
+        gate.wait(5)
+        lines.extend(batch)
+
+    w = OutputWriter(write, max_pending=1, policy="block")
+
+    async def main():
+        w.write("first")
+        while w.pending:
+            await asyncio.sleep(0.001)
+        w.write("queued")
+        w.write("over")
+        assert w.pending == 2
+        room = asyncio.ensure_future(w.wait_room())
+        await asyncio.sleep(0.05)
+        assert not room.done()
+        gate.set()
+        await asyncio.wait_for(room, 5)
+        await w.drain()
+
+    asyncio.run(main())
+    assert lines == ["first", "queued", "over"]
+    assert w.dropped == 0
+    w.close()
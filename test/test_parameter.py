@@ -53,3 +53,76 @@ def test_parameter_enum():
     with pytest.raises(Exception):
         assert par.cast("OPT_Z")
 
+
+def test_parameter_optional():
+    """Test method for an optional parameter."""
+    par = Parameter("options", int | None, None)
+    assert par.options == []
+    assert par.cast("10") == 10
+
+
+def test_parameter_default_type():
+    """Test method for a parameter without annotation."""
+    par = Parameter("options", None, 1.5)
+    assert par.cast("2") == 2.0
+
+    par = Parameter("options")
+    assert par.cast("2") == "2"
+
+
+def test_parameter_match():
+    """Test method for fuzzy matching options."""
+    options = ["alpha", "beta"]
+    par = Parameter("options", str)
+    par.set_dynamic_options(lambda: options, ttl=0)
+    assert par.match("a") == ["alpha", "beta"]
+    assert par.match("bt") == ["beta"]
+
+    options = ["gamma"]
+    assert par.match("a") == ["gamma"]
+
+    # The index is kept while the options snapshot is fresh
+    par.set_dynamic_options(lambda: options, ttl=60)
+    assert par.match("g") == ["gamma"]
+    index = par._index
+    assert par.match("m") == ["gamma"]
+    assert par._index is index
+
+
+def test_parameter_collection(tmp_path):
+    """Test method for collection parameters."""
+
+    class Color(Enum):
+        RED = 0
+        BLUE = 1
+
+    assert Parameter("ids", list[int]).cast("1,2,3") == [1, 2, 3]
+    assert Parameter("ids", list[int]).cast("") == []
+    assert Parameter("x", tuple[float, ...]).cast("1.5,2") == (1.5, 2.0)
+    assert Parameter("x", tuple[str, int]).cast("a,2") == ("a", 2)
+    assert Parameter("x", set[Color]).cast("RED,RED") == {Color.RED}
+    assert Parameter("x", list[bool] | None).cast("yes,0") == [True, False]
+    assert Parameter("x", list).cast("a,b") == ["a", "b"]
+    assert Parameter("x", None, ["a"]).cast("b,c") == ["b", "c"]
+    assert Parameter("x", list[str]).cast("@@a,b") == ["@a", "b"]
+
+    with pytest.raises(ValueError):
+        Parameter("x", tuple[str, int]).cast("a")
+    with pytest.raises(ValueError):
+        Parameter("x", list[int]).cast("1,a")
+
+    path = tmp_path / "ids.txt"
+    path.write_text("1,2\n3 4\n")
+    par = Parameter("ids", list[int])
+    assert par.cast(f"@{path}") == [1, 2, 3, 4]
+    par.set_compact()
+    assert par.compact
+    values = par.cast("1,2,3")
+    assert values.typecode == "q" and list(values) == [1, 2, 3]
+    assert par.cast(f"1,{2**64}") == [1, 2**64]
+    par = Parameter("x", tuple[float, ...])
+    par.set_compact()
+    assert par.cast(f"@{path}").typecode == "d"
+    par = Parameter("x", set[int])
+    par.set_compact()
+    assert par.cast("1,2") == {1, 2}
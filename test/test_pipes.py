@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""Test cmdcraft.pipes module."""
+
+import asyncio
+
+from cmdcraft.pipes import Pipe
+
+
+def test_pipe():
+    """Test pipe iteration and backpressure."""
+
+    async def produce(pipe: Pipe) -> None:
+        for i in range(5):
+            await pipe.put(i)
+            sizes.append(pipe._queue.qsize())
+        pipe.close()
+
+    async def main():
+        pipe = Pipe(2)
+        task = asyncio.ensure_future(produce(pipe))
+        items = [x async for x in pipe]
+        await task
+        assert items == [0, 1, 2, 3, 4]
+        assert pipe.closed
+        assert max(sizes) <= 2
+        assert [x async for x in pipe] == []
+
+    sizes = []
+    asyncio.run(main())
+
+
+def test_pipe_close_full():
+    """Test closing a full pipe keeps its items."""
+
+    async def main():
+        pipe = Pipe(1)
+        await pipe.put("a")
+        pipe.close()
+        assert [x async for x in pipe] == ["a"]
+
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+import pytest
+
+from cmdcraft.command import Command
+from cmdcraft.registry import CommandRegistry
+
+
+async def cmd_a() -> None:
+    """Command A."""
+
+
+async def cmd_b() -> None:
+    """Command B."""
+
+
+def test_add_remove():
+    """Test registry add and remove methods."""
+    reg = CommandRegistry()
+    assert len(reg) == 0
+    assert reg.version == 0
+
+    a = Command(cmd_a)
+    reg.add(a)
+    assert reg["cmd_a"] is a
+    assert list(reg) == ["cmd_a"]
+    assert reg.version == 1
+
+    assert reg.remove("cmd_a") is a
+    assert "cmd_a" not in reg
+    assert reg.version == 2
+
+    with pytest.raises(KeyError):
+        reg.remove("cmd_a")
+
+
+def test_listeners():
+    """Test registry change notifications."""
+    reg = CommandRegistry()
+    changes = []
+
+    def listener(alias, command):
+        changes.append((alias, command))
+
+    reg.subscribe(listener)
+    a = Command(cmd_a)
+    b = Command(cmd_b, "b")
+    reg.add(a)
+    reg.add(b)
+    reg.remove("b")
+    assert changes == [("cmd_a", a), ("b", b), ("b", None)]
+
+    reg.unsubscribe(listener)
+    reg.remove("cmd_a")
+    assert len(changes) == 3
+
+
+def test_complete():
+    """Test prefix completion."""
+    reg = CommandRegistry()
+    for alias in ("history", "help", "hist", "load", "h"):
+        reg.add(Command(cmd_a, alias))
+    assert reg.complete("h") == ["h", "help", "hist", "history"]
+    assert reg.complete("hi") == ["hist", "history"]
+    assert reg.complete("h", 2) == ["h", "help"]
+    assert reg.complete("x") == []
+    assert reg.complete("") == ["h", "help", "hist", "history", "load"]
+
+    reg.remove("hist")
+    assert reg.complete("hi") == ["history"]
+    reg.remove("history")
+    assert reg.complete("hi") == []
+    assert reg.complete("h") == ["h", "help"]
+
+
+def test_resolve():
+    """Test abbreviation resolution."""
+    reg = CommandRegistry()
+    for alias in ("history", "help", "load"):
+        reg.add(Command(cmd_a, alias))
+    assert reg.resolve("history").alias == "history"
+    assert reg.resolve("hi").alias == "history"
+    assert reg.resolve("l").alias == "load"
+    assert reg.resolve("h") is None
+    assert reg.resolve("x") is None
+
+    reg.add(Command(cmd_a, "h"))
+    assert reg.resolve("h").alias == "h"
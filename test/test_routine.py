@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+import os
+
+from cmdcraft.routine import Routine, RoutineLine
+
+
+def resolve(name: str) -> str | None:
+    """Resolve abbreviations of a single `wait` command."""
+    return "wait" if "wait".startswith(name) else None
+
+
+def test_compile():
+    """Test routine compilation."""
+    source = 'w 1\n\n# comment\nhelp wait\nwork "a b" &\nwork "a\n'
+    routine = Routine.compile(source, resolve)
+    assert routine.lines == [
+        RoutineLine(1, "w 1", ["wait", "1"], False, None),
+        RoutineLine(5, 'work "a b" &', ["work", "a b"], True, None),
+        RoutineLine(6, 'work "a', [], False, "Unterminated quote or escape"),
+    ]
+
+
+def test_cache(tmp_path, monkeypatch):
+    """Test compiled routine cache."""
+    path = tmp_path / "routine"
+    path.write_text("w 1\n")
+    cache = tmp_path / ".routine.cmdc"
+
+    routine = Routine.load(str(path), resolve)
+    assert routine.lines[0].tokens == ["wait", "1"]
+    assert cache.exists()
+
+    calls = []
+    compile = Routine.compile.__func__
+
+    def counted(cls, source, resolve=None):
+        calls.append(source)
+        return compile(cls, source, resolve)
+
+    monkeypatch.setattr(Routine, "compile", classmethod(counted))
+
+    # Valid cache
+    assert Routine.load(str(path), resolve).lines == routine.lines
+    assert calls == []
+
+    # Same content, new modification time
+    os.utime(path, ns=(0, 0))
+    assert Routine.load(str(path), resolve).lines == routine.lines
+    assert calls == []
+
+    # Stale cache
+    path.write_text("w 2\n")
+    assert Routine.load(str(path), resolve).lines[0].tokens == ["wait", "2"]
+    assert len(calls) == 1
+
+    # Incompatible cache
+    cache.write_bytes(b"garbage")
+    assert Routine.load(str(path), resolve).lines[0].tokens == ["wait", "2"]
+    assert len(calls) == 2
+    assert Routine.load(str(path), resolve, cache=False).lines[0].text == "w 2"
+    assert len(calls) == 3
+
+
+def test_cache_resolution(tmp_path):
+    """Test cached routines resolve command names when loaded."""
+    path = tmp_path / "routine"
+    path.write_text("hist\n")
+    commands = ["history"]
+
+    def resolve(name: str) -> str | None:
+        matches = [x for x in commands if x.startswith(name)]
+        return matches[0] if len(matches) == 1 else None
+
+    assert Routine.load(str(path), resolve).lines[0].tokens == ["history"]
+    commands.append("histogram")
+    assert Routine.load(str(path), resolve).lines[0].tokens == ["hist"]
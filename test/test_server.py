@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""Test cmdcraft.server and cmdcraft.client modules."""
+
+import asyncio
+import io
+import os
+
+import pytest
+
+from cmdcraft.base import BasePrompter
+from cmdcraft.client import connect, run_client
+from cmdcraft.server import END, PromptServer
+
+
+class Prompter(BasePrompter):
+    """Test prompter."""
+
+    def __init__(self, **kwargs):
+        """Construct prompter."""
+        super().__init__(**kwargs)
+        self.lines = []
+
+    def write(self, *args):
+        """Store output lines."""
+        self.lines.append(" ".join(str(x) for x in args))
+
+
+async def echo(*text: str):
+    """Echo text."""
+    p.output(" ".join(text))
+
+
+def secho(*text: str):
+    """Echo text from a worker thread."""
+    p.output(" ".join(text))
+
+
+p = Prompter()
+p.register_command(echo)
+p.register_command(secho)
+
+
+async def command(reader, writer, cmdline):
+    """Send a command, returning its output and status."""
+    writer.write(f"{cmdline}\n".encode())
+    lines = []
+    while True:
+        line = (await reader.readline()).decode()
+        if line.startswith(END):
+            return lines, line[1:].strip() == "1"
+        lines.append(line.rstrip("\n"))
+
+
+def test_sessions():
+    """Test concurrent sessions output and history."""
+
+    async def main():
+        server = PromptServer(p)
+        await server.start_tcp(token="secret")
+        host, port = server.addresses[0][:2]
+        a = await asyncio.open_connection(host, port)
+        b = await asyncio.open_connection(host, port)
+        for reader, writer in (a, b):
+            writer.write(b"secret\n")
+            assert await reader.readline() == f"{END}1\n".encode()
+        assert len(server.sessions) == 2
+
+        # A slow command in a session doesn't block the other one
+        slow = asyncio.create_task(command(*a, "wait 0.5"))
+        await asyncio.sleep(0.05)
+        result = await asyncio.wait_for(command(*b, "echo hi b"), 0.3)
+        assert result == (["hi b"], True)
+        assert not slow.done()
+        assert await slow == ([], True)
+
+        assert await command(*a, "echo hi a") == (["hi a"], True)
+        assert await command(*b, "secho from thread") == (["from thread"], True)
+        assert (await command(*a, "bogus"))[1] is False
+        history = ["wait 0.5", "echo hi a", "bogus", "history"]
+        assert await command(*a, "history") == (history, True)
+        history = ["history --limit=1"]
+        assert await command(*b, "history --limit=1") == (history, True)
+        assert p.lines == []
+
+        # quit closes the session only, even from a job
+        p._is_running = True
+        assert await command(*a, "spawn quit") == (["[1] quit"], True)
+        assert await a[0].read() == b""
+        await asyncio.sleep(0)
+        assert len(server.sessions) == 1
+        assert p.is_running
+        assert await command(*b, "echo still") == (["still"], True)
+        p._is_running = False
+
+        # Closing the server ends the commands still running
+        b[1].write(b"wait 10\n")
+        await asyncio.sleep(0.05)
+        await asyncio.wait_for(server.close(), 1)
+        assert await b[0].read() == b""
+        assert server.sessions == []
+
+    asyncio.run(main())
+
+
+def test_client(tmp_path):
+    """Test client over a Unix domain socket."""
+
+    async def main():
+        path = os.fspath(tmp_path / "cmdcraft.sock")
+        server = PromptServer(p)
+        await server.start_unix(path)
+        assert os.stat(path).st_mode & 0o777 == 0o600
+        output = io.StringIO()
+        failures = await run_client(
+            *await connect(unix=path),
+            input=io.StringIO("echo one\nbogus\necho two\n"),
+            output=output,
+        )
+        assert failures == 1
+        assert output.getvalue() == "one\nUnknown command: bogus\ntwo\n"
+        await server.close()
+
+    asyncio.run(main())
+
+
+def test_tcp_authentication():
+    """Test TCP clients must send the token first."""
+
+    async def main():
+        server = PromptServer(p)
+        with pytest.raises(ValueError):
+            await server.start_tcp(token="")
+        await server.start_tcp(token="secret")
+        address = "{}:{}".format(*server.addresses[0][:2])
+        output = io.StringIO()
+        failures = await run_client(
+            *await connect(tcp=address, token="wrong"),
+            input=io.StringIO("echo one\n"),
+            output=output,
+        )
+        assert failures == 1
+        assert output.getvalue() == "Authentication failed\n"
+        assert server.sessions == []
+
+        output = io.StringIO()
+        failures = await run_client(
+            *await connect(tcp=address, token="secret"),
+            input=io.StringIO("echo one\n"),
+            output=output,
+        )
+        assert (failures, output.getvalue()) == (0, "one\n")
+        await server.close()
+
+    asyncio.run(main())
+
+
+def test_long_line(tmp_path):
+    """Test lines over the stream limit are rejected, keeping the session."""
+
+    async def main():
+        path = os.fspath(tmp_path / "cmdcraft.sock")
+        server = PromptServer(p)
+        await server.start_unix(path)
+        reader, writer = await asyncio.open_unix_connection(path)
+        assert await reader.readline() == f"{END}1\n".encode()
+        assert await command(reader, writer, "echo " + "x" * 200000) == (
+            ["Line too long"],
+            False,
+        )
+        assert await command(reader, writer, "echo ok") == (["ok"], True)
+        writer.close()
+        await server.close()
+
+    asyncio.run(main())
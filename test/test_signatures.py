@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Test cmdcraft.signatures module."""
+
+import asyncio
+import importlib
+import json
+import sys
+
+import cmdcraft.command
+from cmdcraft import HeadlessPrompter
+from cmdcraft.command import Command
+from cmdcraft.signatures import SignatureCache
+
+SOURCE = """
+from __future__ import annotations
+
+from enum import Enum
+
+
+class Color(Enum):
+    RED = 1
+    GREEN = 2
+
+
+def paint(a: int, b: Color = Color.RED, *args, c: float | None = None, **kw):
+    return (a, b, args, c, kw)
+
+
+def split(items: list[int], sep: str = ","):
+    return items
+
+
+def scale(d: tuple[float, ...] = (), n: list[int] = [1, 2]):
+    return d
+
+
+def custom(a: int, b: object = object()):
+    return a
+
+
+class Service:
+    def ping(self, n: int):
+        return n
+"""
+
+
+def load(tmp_path, monkeypatch, source=SOURCE):
+    """Write and import the test module."""
+    (tmp_path / "sigmod.py").write_text(source)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    sys.modules.pop("sigmod", None)
+    return importlib.import_module("sigmod")
+
+
+def test_roundtrip(tmp_path, monkeypatch):
+    """Test signatures are rehydrated from the cache."""
+    mod = load(tmp_path, monkeypatch)
+    path = str(tmp_path / "signatures.json")
+    cache = SignatureCache(path)
+    for cb in (mod.paint, mod.split, mod.scale, mod.Service().ping):
+        Command(cb, cache=cache).process()
+    assert cache.dirty
+    cache.save()
+    assert not cache.dirty
+
+    def fail(*args, **kwargs):
+        raise AssertionError("introspected")
+
+    monkeypatch.setattr(cmdcraft.command, "get_type_hints", fail)
+    cache = SignatureCache(path)
+    cmd = Command(mod.paint, cache=cache)
+    cmd.process()
+    assert list(cmd.positional_parameters) == ["a", "b"]
+    assert list(cmd.keyword_parameters) == ["c"]
+    assert cmd.has_args and cmd.has_kwargs
+    assert cmd.bind("1", "GREEN", "x", "--c=0.5") == (
+        [1, mod.Color.GREEN, "x"],
+        {"c": 0.5},
+    )
+    assert cmd.parameter("b").options == ["RED", "GREEN"]
+    assert cmd.parameter("b").default is mod.Color.RED
+
+    cmd = Command(mod.scale, cache=cache)
+    cmd.process()
+    assert cmd.bind("1,2.5", "3") == ([(1.0, 2.5), [3]], {})
+    assert cmd.parameter("d").default == ()
+    assert cmd.parameter("n").default == [1, 2]
+
+    cmd = Command(mod.Service().ping, cache=cache)
+    cmd.process()
+    assert cmd.bind("2") == ([2], {})
+    assert not cache.dirty
+
+    # Unbound functions are cached apart from bound methods
+    assert cache.get(mod.Service.ping) is None
+
+
+def test_invalidation(tmp_path, monkeypatch):
+    """Test stale and uncacheable signatures."""
+    mod = load(tmp_path, monkeypatch)
+    path = str(tmp_path / "signatures.json")
+    cache = SignatureCache(path)
+    assert not cache.put(mod.custom, Command(mod.custom)._introspect())
+    assert cache.put(mod.split, Command(mod.split)._introspect())
+    assert cache.get(mod.split)[0][2] == list[int]
+    cache.save()
+
+    # Changed module
+    mod = load(tmp_path, monkeypatch, SOURCE + "\n# changed\n")
+    assert SignatureCache(path).get(mod.split) is None
+
+    # Other cmdcraft version
+    with open(path) as f:
+        data = json.load(f)
+    data["version"] = "0.0.0"
+    with open(path, "w") as f:
+        json.dump(data, f)
+    mod = load(tmp_path, monkeypatch)
+    assert SignatureCache(path).get(mod.split) is None
+
+
+def test_prompter(tmp_path):
+    """Test the prompter saves its signature cache on quit."""
+    path = tmp_path / "signatures.json"
+    p = HeadlessPrompter(signature_cache=str(path))
+    asyncio.run(p.quit())
+    data = json.loads(path.read_text())
+    assert "BasePrompter.load()" in data["modules"]["cmdcraft.base"]["commands"]
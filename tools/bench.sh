@@ -0,0 +1,14 @@
+#!/bin/sh
+# *****************************************************************************
+# Copyright (c) 2024, Antonio Mario Weinsen Junior
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+# *****************************************************************************
+
+
+# Run the benchmark suite, forwarding options, e.g.:
+#   ./tools/bench.sh --save=benchmarks/baseline.json
+#   ./tools/bench.sh --compare=benchmarks/baseline.json
+python3 benchmarks/bench.py "$@"